@@ -1,8 +1,62 @@
 import unittest
 import json
 import os
+import tempfile
+import gzip
+import zlib
+import threading
+import time
+import subprocess
+import sys
+import requests
+import io
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
 from click.testing import CliRunner
-from vapi_vct import cli, decompose_assistant, recompose_assistant
+import vapi_vct
+from vapi_vct import (
+    np,
+    compile_replacements,
+    load_config,
+    update_config,
+    CallWriter,
+    cli,
+    read_call_columns,
+    record_history,
+    estimate_tokens,
+    decompose_assistant,
+    recompose_assistant,
+    decompose_resource,
+    recompose_data,
+    write_decomposed,
+    iter_json_body,
+    plan_rate_limits,
+    RateLimiter,
+    complete_from_index,
+    resolve_resource_ref,
+    update_index,
+    create_resource,
+    fetch_resource,
+    vapi_request,
+    FakeTransport,
+    RecordingTransport,
+    ReplayTransport,
+    set_transport,
+    RecomposeError,
+    ARCHIVE_MAGIC,
+    ARCHIVE_TRAILER,
+    create_daemon_server,
+    daemon_call,
+    serve_daemon,
+    diff_payloads,
+    merkle_tree,
+    get_validator,
+    validate_assistant_data,
+    get_dirty_directories,
+    mark_clean,
+    GitSnapshot,
+)
 from unittest.mock import patch, MagicMock, mock_open
 
 
@@ -14,6 +68,11 @@ class TestVapiVCTConfig(unittest.TestCase):
     def tearDown(self):
         if os.path.exists(self.config_file):
             os.remove(self.config_file)
+        lock_file = os.path.join(".vapi_vct", f"{self.config_file}.lock")
+        if os.path.exists(lock_file):
+            os.remove(lock_file)
+            if not os.listdir(".vapi_vct"):
+                os.rmdir(".vapi_vct")
 
     @patch("vapi_vct.load_config")
     def test_assistants_add(self, mock_load_config):
@@ -199,6 +258,73 @@ class TestVapiVCTConfig(unittest.TestCase):
         self.assertIn("No API key found in the configuration", result.output)
 
 
+class TestVapiVCTConfigMerge(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.config_file = "vapi_config.json"
+        with open(self.config_file, "w") as f:
+            json.dump({"api_key": "project_key", "assistant_ids": ["a1", "a2"]}, f)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def read_config(self):
+        with open(self.config_file) as f:
+            return json.load(f)
+
+    def test_concurrent_changes_are_merged(self):
+        first = load_config(self.config_file, project_specific=True)
+        second = load_config(self.config_file, project_specific=True)
+
+        first["assistant_ids"].append("a3")
+        first["assistant_directories"]["a3"] = "dir3"
+        update_config(self.config_file, first)
+
+        second["assistant_ids"].remove("a1")
+        second["assistant_directories"]["a2"] = "dir2"
+        update_config(self.config_file, second)
+
+        config = self.read_config()
+        self.assertEqual(config["assistant_ids"], ["a2", "a3"])
+        self.assertEqual(config["assistant_directories"], {"a3": "dir3", "a2": "dir2"})
+        self.assertEqual(config["api_key"], "project_key")
+        # The caller's copy reflects what was written
+        self.assertEqual(second, config)
+
+    def test_parallel_writers(self):
+        def add(assistant_id):
+            config = load_config(self.config_file, project_specific=True)
+            config["assistant_ids"].append(assistant_id)
+            update_config(self.config_file, config)
+
+        threads = [threading.Thread(target=add, args=(f"new{i}",)) for i in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(
+            sorted(self.read_config()["assistant_ids"]),
+            ["a1", "a2"] + [f"new{i}" for i in range(8)],
+        )
+
+    @patch("vapi_vct.os.path.expanduser")
+    def test_default_config_is_not_copied(self, mock_expanduser):
+        with open("default_config.json", "w") as f:
+            json.dump({"api_key": "default_key", "default_only": True}, f)
+        mock_expanduser.return_value = "default_config.json"
+        os.remove(self.config_file)
+
+        config = load_config(self.config_file)
+        config["assistant_ids"] = ["a9"]
+        update_config(self.config_file, config)
+
+        self.assertEqual(self.read_config(), {"assistant_ids": ["a9"]})
+
+
 class TestVapiVCTFetchUpdate(unittest.TestCase):
     def setUp(self):
         self.runner = CliRunner()
@@ -223,7 +349,11 @@ class TestVapiVCTFetchUpdate(unittest.TestCase):
     @patch("vapi_vct.requests.get")
     @patch("vapi_vct.load_config")
     @patch("vapi_vct.decompose_assistant")
-    def test_fetch(self, mock_decompose, mock_load_config, mock_get):
+    @patch("vapi_vct.record_history", return_value=None)
+    @patch("vapi_vct.update_index")
+    def test_fetch(
+        self, mock_index, mock_history, mock_decompose, mock_load_config, mock_get
+    ):
         mock_config = {
             "api_key": self.mock_api_key,
             "assistant_ids": [self.mock_assistant_id],
@@ -268,6 +398,7 @@ class TestVapiVCTFetchUpdate(unittest.TestCase):
             result.output,
         )
         mock_decompose.assert_called_once()
+        mock_history.assert_called_once()
 
     @patch("vapi_vct.requests.patch")
     @patch("vapi_vct.load_config")
@@ -291,7 +422,9 @@ class TestVapiVCTFetchUpdate(unittest.TestCase):
         mock_patch.return_value = mock_response
 
         with patch("builtins.open", mock_open(read_data='{"id": "asst_mock123456"}')):
-            result = self.runner.invoke(cli, ["update", "--config", self.config_file])
+            result = self.runner.invoke(
+                cli, ["update", "--config", self.config_file, "--no-validate"]
+            )
 
         self.assertEqual(result.exit_code, 0)
         self.assertIn(
@@ -303,7 +436,11 @@ class TestVapiVCTFetchUpdate(unittest.TestCase):
     @patch("vapi_vct.requests.get")
     @patch("vapi_vct.load_config")
     @patch("vapi_vct.decompose_assistant")
-    def test_project_specific_config(self, mock_decompose, mock_load_config, mock_get):
+    @patch("vapi_vct.record_history", return_value=None)
+    @patch("vapi_vct.update_index")
+    def test_project_specific_config(
+        self, mock_index, mock_history, mock_decompose, mock_load_config, mock_get
+    ):
         mock_config = {
             "api_key": "vapi_project_specific_mock_api_key_789012",
             "assistant_ids": [self.mock_assistant_id],
@@ -376,10 +513,16 @@ class TestVapiVCTDecompositionRecomposition(unittest.TestCase):
 
     @patch("vapi_vct.os.makedirs")
     @patch("vapi_vct.json.dump")
+    @patch("vapi_vct.update_config")
     @patch("vapi_vct.load_config")
     @patch("builtins.open", new_callable=mock_open)
     def test_decompose_assistant_creates_empty_files(
-        self, mock_open, mock_load_config, mock_json_dump, mock_makedirs
+        self,
+        mock_open,
+        mock_load_config,
+        mock_update_config,
+        mock_json_dump,
+        mock_makedirs,
     ):
         mock_data = {
             "id": self.mock_assistant_id,
@@ -457,5 +600,1699 @@ class TestVapiVCTDecompositionRecomposition(unittest.TestCase):
         self.assertNotIn("structuredDataSchema", final_data["analysisPlan"])
 
 
+class TestVapiVCTResources(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.tool = {
+            "id": "tool_lookup1234",
+            "orgId": "org_1",
+            "type": "function",
+            "function": {
+                "name": "Lookup Order",
+                "description": "Look up an order by number.",
+                "parameters": {
+                    "type": "object",
+                    "properties": {"number": {"type": "string"}},
+                },
+            },
+        }
+        self.assistant = {
+            "id": "asst_mock123456",
+            "name": "Mock Assistant",
+            "model": {
+                "provider": "openai",
+                "model": "gpt-4o",
+                "messages": [
+                    {"role": "user", "content": "Hi"},
+                    {"role": "system", "content": "Be helpful."},
+                ],
+            },
+        }
+        with open("vapi_config.json", "w") as f:
+            json.dump(
+                {
+                    "api_key": "vapi_mock_api_key_123456",
+                    "assistant_ids": [self.assistant["id"]],
+                    "tool_ids": [self.tool["id"]],
+                },
+                f,
+            )
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def response(self, url, headers=None):
+        mock_response = MagicMock()
+        resource = self.tool if url.endswith(self.tool["id"]) else self.assistant
+        mock_response.json.return_value = json.loads(json.dumps(resource))
+        return mock_response
+
+    def test_tool_round_trip(self):
+        with open("tool.json", "w") as f:
+            json.dump(self.tool, f)
+
+        directory = decompose_resource("tool", "tool.json", "vapi_config.json")
+
+        self.assertEqual(directory, "lookup_order--tool_loo")
+        with open(os.path.join(directory, "description.txt")) as f:
+            self.assertEqual(f.read(), "Look up an order by number.")
+        with open(os.path.join(directory, "tool_config.json")) as f:
+            self.assertEqual(
+                json.load(f)["function"]["parameters"], "file:///parameters.json"
+            )
+        self.assertEqual(recompose_data("tool", directory), self.tool)
+
+    def test_system_prompt_stays_in_place(self):
+        with open("assistant.json", "w") as f:
+            json.dump(self.assistant, f)
+
+        directory = decompose_resource(
+            "assistant", "assistant.json", "vapi_config.json"
+        )
+        recomposed = recompose_data("assistant", directory)
+
+        self.assertEqual(recomposed, self.assistant)
+
+    def test_messages_and_tools_round_trip(self):
+        tools = [
+            {"type": "function", "function": {"name": "lookupOrder"}},
+            {"type": "endCall"},
+        ]
+        self.assistant["model"]["messages"].append({"role": "user", "content": None})
+        self.assistant["model"]["tools"] = tools
+        self.assistant["firstMessage"] = "Hello!"
+        with open("assistant.json", "w") as f:
+            json.dump(self.assistant, f)
+
+        directory = decompose_resource(
+            "assistant", "assistant.json", "vapi_config.json"
+        )
+
+        self.assertEqual(
+            sorted(os.listdir(directory)),
+            [
+                "assistant_config.json",
+                "first_message.txt",
+                "messages",
+                "metadata.json",
+                "structured_data_prompt.txt",
+                "structured_data_schema.json",
+                "success_evaluation_prompt.txt",
+                "summary_prompt.txt",
+                "system_prompt.txt",
+                "tools",
+            ],
+        )
+        self.assertEqual(
+            os.listdir(os.path.join(directory, "messages")), ["00_user.txt"]
+        )
+        self.assertEqual(
+            sorted(os.listdir(os.path.join(directory, "tools"))),
+            ["00_lookuporder.json", "01_endcall.json"],
+        )
+        self.assertEqual(recompose_data("assistant", directory), self.assistant)
+
+        # Items removed upstream leave no stale files behind
+        self.assistant["model"]["tools"] = tools[1:]
+        with open("assistant.json", "w") as f:
+            json.dump(self.assistant, f)
+        decompose_resource("assistant", "assistant.json", "vapi_config.json")
+        self.assertEqual(
+            os.listdir(os.path.join(directory, "tools")), ["00_endcall.json"]
+        )
+
+    @patch("vapi_vct.record_history", return_value=None)
+    @patch("vapi_vct.requests.get")
+    def test_sync_fetches_every_type(self, mock_get, mock_history):
+        mock_get.side_effect = self.response
+
+        result = self.runner.invoke(cli, ["sync"])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(
+            sorted(call.args[0] for call in mock_get.call_args_list),
+            [
+                "https://api.vapi.ai/assistant/asst_mock123456",
+                "https://api.vapi.ai/tool/tool_lookup1234",
+            ],
+        )
+        self.assertTrue(os.path.isdir("mock_assistant--asst_moc"))
+        self.assertTrue(os.path.isdir("lookup_order--tool_loo"))
+        with open("vapi_config.json") as f:
+            self.assertEqual(
+                json.load(f)["tool_directories"],
+                {"tool_lookup1234": "lookup_order--tool_loo"},
+            )
+
+    @patch("vapi_vct.requests.patch")
+    def test_sync_push(self, mock_patch):
+        with open("tool.json", "w") as f:
+            json.dump(self.tool, f)
+        directory = decompose_resource("tool", "tool.json", "vapi_config.json")
+        with open(os.path.join(directory, "description.txt"), "w") as f:
+            f.write("Find an order.")
+
+        result = self.runner.invoke(cli, ["sync", "--push", "--type", "tool"])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        mock_patch.assert_called_once()
+        self.assertEqual(
+            mock_patch.call_args.args[0], "https://api.vapi.ai/tool/tool_lookup1234"
+        )
+        payload = mock_patch.call_args.kwargs["json"]
+        self.assertEqual(payload["function"]["description"], "Find an order.")
+        self.assertNotIn("orgId", payload)
+
+    def test_iter_json_body(self):
+        payload = {"prompt": "é" * 200000, "items": list(range(1000))}
+
+        chunks = list(iter_json_body(payload))
+        compressed = b"".join(iter_json_body(payload, compress=True))
+
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(json.loads(b"".join(chunks)), payload)
+        self.assertEqual(json.loads(gzip.decompress(compressed)), payload)
+
+    @patch("vapi_vct.requests.patch")
+    def test_large_payload_is_streamed(self, mock_patch):
+        with open("vapi_config.json") as f:
+            config = json.load(f)
+        config.update(stream_threshold=1024, gzip_requests=True)
+        with open("vapi_config.json", "w") as f:
+            json.dump(config, f)
+        with open("tool.json", "w") as f:
+            json.dump(self.tool, f)
+        directory = decompose_resource("tool", "tool.json", "vapi_config.json")
+        with open(os.path.join(directory, "description.txt"), "w") as f:
+            f.write("Look up an order. " * 100)
+
+        mock_patch.side_effect = lambda url, headers, data: MagicMock(
+            body=gzip.decompress(b"".join(data))
+        )
+        result = self.runner.invoke(cli, ["sync", "--push", "--type", "tool"])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(
+            mock_patch.call_args.kwargs["headers"]["Content-Encoding"], "gzip"
+        )
+        self.assertNotIn("json", mock_patch.call_args.kwargs)
+
+        # Small payloads are still sent with json=
+        with open(os.path.join(directory, "description.txt"), "w") as f:
+            f.write("Look up an order.")
+        mock_patch.side_effect = None
+        self.runner.invoke(cli, ["sync", "--push", "--type", "tool"])
+        self.assertIn("json", mock_patch.call_args.kwargs)
+
+    def test_update_loads_payloads_per_request(self):
+        files = []
+        for i in range(8):
+            files.append(("tool", f"tool_{i}.json"))
+            with open(f"tool_{i}.json", "w") as f:
+                json.dump(dict(self.tool, id=f"tool_{i}"), f)
+
+        lock = threading.Lock()
+        held = {"now": 0, "max": 0}
+        load = vapi_vct.load_assistant_data
+        update = vapi_vct.update_resource
+
+        def counting_load(json_file):
+            with lock:
+                held["now"] += 1
+                held["max"] = max(held["max"], held["now"])
+            return load(json_file)
+
+        def slow_update(*args):
+            time.sleep(0.02)
+            update(*args)
+            with lock:
+                held["now"] -= 1
+
+        fake = FakeTransport({"/tool": {f"tool_{i}": {} for i in range(8)}})
+        previous = set_transport(fake)
+        self.addCleanup(set_transport, previous)
+        with patch("vapi_vct.load_assistant_data", counting_load), patch(
+            "vapi_vct.update_resource", slow_update
+        ):
+            vapi_vct.update_resources_from_files(files, "k", concurrency=2)
+
+        self.assertEqual(len(fake.requests), 8)
+        self.assertLessEqual(held["max"], 2)
+
+
+class TestVapiVCTWorkspace(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        for project, api_key in [
+            ("acme", "shared_key"),
+            ("acme-eu", "shared_key"),
+            ("globex", "globex_key"),
+        ]:
+            os.makedirs(project)
+            with open(f"{project}/vapi_config.json", "w") as f:
+                json.dump(
+                    {
+                        "api_key": api_key,
+                        "assistant_ids": [f"asst_{project}"],
+                        "assistant_directories": {f"asst_{project}": "support"},
+                    },
+                    f,
+                )
+        os.makedirs("acme/support")
+        with open("acme/support/assistant_config.json", "w") as f:
+            json.dump({"name": "Support"}, f)
+        with open("vapi_workspace.json", "w") as f:
+            json.dump(
+                {
+                    "projects": {
+                        "acme": "acme/vapi_config.json",
+                        "acme-eu": "acme-eu/vapi_config.json",
+                        "globex": "globex/vapi_config.json",
+                    },
+                    "rate_limit": {"requests_per_second": 10, "concurrency": 4},
+                },
+                f,
+            )
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_rate_limits_are_split_per_api_key(self):
+        with open("vapi_workspace.json") as f:
+            workspace = json.load(f)
+        projects = {
+            name: os.path.abspath(path) for name, path in workspace["projects"].items()
+        }
+
+        shares = plan_rate_limits(workspace, projects)
+
+        self.assertEqual(shares["acme"], {"requests_per_second": 5.0, "concurrency": 2})
+        self.assertEqual(shares["acme-eu"], shares["acme"])
+        self.assertEqual(
+            shares["globex"], {"requests_per_second": 10, "concurrency": 4}
+        )
+
+    def test_rate_limiter_spaces_requests(self):
+        limiter = RateLimiter(requests_per_second=50, concurrency=2)
+        started = time.monotonic()
+        for _ in range(6):
+            with limiter:
+                pass
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+    def test_workspace_status(self):
+        result = self.runner.invoke(cli, ["workspace", "status"])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("== acme (ok", result.output)
+        self.assertIn(
+            "changed         assistant     support (asst_acme)", result.output
+        )
+        self.assertIn(
+            "not decomposed  assistant     support (asst_globex)", result.output
+        )
+        self.assertIn("status: 3 of 3 project(s) succeeded", result.output)
+
+
+class TestVapiVCTIndex(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        update_index(
+            "assistant",
+            {"id": "asst_abc123", "name": "Support Bot"},
+            "support_bot--asst_abc",
+        )
+        update_index(
+            "assistant", {"id": "asst_abd456", "name": "Sales"}, "sales--asst_abd"
+        )
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_resolve_names_and_prefixes(self):
+        self.assertEqual(resolve_resource_ref("asst_abd456"), "asst_abd456")
+        self.assertEqual(resolve_resource_ref("Support Bot"), "asst_abc123")
+        self.assertEqual(resolve_resource_ref("sales"), "asst_abd456")
+        self.assertEqual(resolve_resource_ref("support_bot--asst_abc"), "asst_abc123")
+        self.assertEqual(resolve_resource_ref("asst_abc"), "asst_abc123")
+        self.assertEqual(resolve_resource_ref("asst_unknown"), "asst_unknown")
+        with self.assertRaises(SystemExit):
+            resolve_resource_ref("asst_ab")
+
+    def test_completion(self):
+        environ = {"_VAPI_VCT_COMPLETE": "zsh_complete", "COMP_CWORD": "2"}
+
+        environ["COMP_WORDS"] = "vapi_vct show asst_ab"
+        self.assertEqual(
+            complete_from_index(environ),
+            "plain\nasst_abd456\nSales\nplain\nasst_abc123\nSupport Bot",
+        )
+        # The version argument isn't a reference
+        environ.update(COMP_WORDS="vapi_vct show sales ", COMP_CWORD="3")
+        self.assertIsNone(complete_from_index(environ))
+        environ.update(COMP_WORDS="vapi_vct validate ", COMP_CWORD="2")
+        self.assertIsNone(complete_from_index(environ))
+
+    def test_completion_skips_heavy_imports(self):
+        script = os.path.join(self.cwd, "vapi_vct.py")
+        environ = dict(
+            os.environ,
+            _VAPI_VCT_COMPLETE="bash_complete",
+            COMP_WORDS="vapi_vct history --config vapi_config.json s",
+            COMP_CWORD="4",
+        )
+
+        result = subprocess.run(
+            [sys.executable, "-X", "importtime", script],
+            env=environ,
+            capture_output=True,
+            text=True,
+        )
+
+        self.assertEqual(result.stdout, "plain,sales\nplain,support_bot\n")
+        self.assertNotIn("requests", result.stderr)
+        self.assertNotIn("click", result.stderr)
+
+
+class TestVapiVCTHook(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.git("init", "-q")
+        config = {
+            "api_key": "vapi_mock_api_key_123456",
+            "assistant_ids": ["asst_alpha", "asst_beta"],
+            "assistant_directories": {"asst_alpha": "alpha", "asst_beta": "beta"},
+        }
+        with open("vapi_config.json", "w") as f:
+            json.dump(config, f)
+        os.makedirs("shared")
+        with open("shared/policy.txt", "w") as f:
+            f.write("Never share card numbers.")
+        for name, prompt in [
+            ("alpha", "Hi. <<include ../shared/policy.txt>>"),
+            ("beta", "Bye."),
+        ]:
+            os.makedirs(name)
+            with open(f"{name}/assistant_config.json", "w") as f:
+                json.dump(
+                    {
+                        "model": {
+                            "provider": "openai",
+                            "model": "gpt-4o",
+                            "messages": [
+                                {
+                                    "role": "system",
+                                    "content": "file:///system_prompt.txt",
+                                }
+                            ],
+                        }
+                    },
+                    f,
+                )
+            with open(f"{name}/system_prompt.txt", "w") as f:
+                f.write(prompt)
+            with open(f"{name}/metadata.json", "w") as f:
+                json.dump({"id": f"asst_{name}"}, f)
+        self.git("add", ".")
+        self.git("commit", "-q", "-m", "Initial")
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def git(self, *args):
+        return subprocess.run(
+            ["git", "-c", "user.name=Test", "-c", "user.email=test@example.com", *args],
+            check=True,
+            capture_output=True,
+            text=True,
+        ).stdout.strip()
+
+    def test_pre_commit_checks_only_staged(self):
+        with open("beta/system_prompt.txt", "w") as f:
+            f.write("Goodbye.")
+        self.git("add", "beta/system_prompt.txt")
+
+        result = self.runner.invoke(cli, ["hook", "pre-commit"])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual(result.output, "ok beta\n")
+
+    def test_pre_commit_fragment_and_broken_json(self):
+        with open("shared/policy.txt", "w") as f:
+            f.write("Never read card numbers back.")
+        with open("beta/assistant_config.json", "w") as f:
+            f.write("{")
+        self.git("add", ".")
+
+        result = self.runner.invoke(cli, ["hook", "pre-commit"])
+
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("ok alpha", result.output)
+        self.assertIn("Validation failed for beta:", result.output)
+
+    def test_pre_commit_checks_staged_content(self):
+        original = self.git("show", "HEAD:beta/assistant_config.json")
+        with open("beta/assistant_config.json", "w") as f:
+            f.write("{")
+        self.git("add", "beta/assistant_config.json")
+        # Fixed in the working tree, but the broken file is what gets committed
+        with open("beta/assistant_config.json", "w") as f:
+            f.write(original)
+
+        result = self.runner.invoke(cli, ["hook", "pre-commit"])
+
+        self.assertEqual(result.exit_code, 1, result.output)
+        self.assertIn("Validation failed for beta:", result.output)
+
+    def test_pre_commit_reports_include_cycle(self):
+        with open("shared/policy.txt", "w") as f:
+            f.write("<<include loop.txt>>")
+        with open("shared/loop.txt", "w") as f:
+            f.write("<<include policy.txt>>")
+        self.git("add", ".")
+
+        result = self.runner.invoke(cli, ["hook", "pre-commit"])
+
+        self.assertEqual(result.exit_code, 1, result.output)
+        self.assertIsInstance(result.exception, SystemExit)
+        self.assertIn("Validation failed for alpha:", result.output)
+        self.assertIn("Include cycle detected", result.output)
+
+    def test_snapshot_checks_out_only_what_is_needed(self):
+        with open("unrelated.bin", "wb") as f:
+            f.write(b"\0" * 1024)
+        self.git("add", "unrelated.bin")
+
+        with tempfile.TemporaryDirectory() as scratch:
+            snapshot = GitSnapshot(None, scratch)
+            self.assertEqual(snapshot.checkout_resource("assistant", "alpha"), [])
+            self.assertEqual(
+                sorted(snapshot.checked_out),
+                [
+                    "alpha/assistant_config.json",
+                    "alpha/metadata.json",
+                    "alpha/system_prompt.txt",
+                    "shared/policy.txt",
+                ],
+            )
+            self.assertFalse(os.path.exists(os.path.join(snapshot.root, "beta")))
+
+    def test_pre_commit_reports_ignored_metadata(self):
+        self.git("rm", "-q", "--cached", "beta/metadata.json")
+        with open(".gitignore", "w") as f:
+            f.write("metadata.json\n")
+        with open("beta/system_prompt.txt", "w") as f:
+            f.write("Goodbye.")
+        self.git("add", ".")
+
+        result = self.runner.invoke(cli, ["hook", "pre-commit"])
+
+        self.assertEqual(result.exit_code, 1, result.output)
+        self.assertIn("Validation failed for beta:", result.output)
+        self.assertIn("beta/metadata.json is not in the index", result.output)
+
+    @patch("vapi_vct.requests.patch")
+    def test_pre_push_updates_pushed_changes(self, mock_patch):
+        base = self.git("rev-parse", "HEAD")
+        with open("alpha/system_prompt.txt", "w") as f:
+            f.write("Hello.")
+        self.git("commit", "-q", "-am", "Change alpha")
+        head = self.git("rev-parse", "HEAD")
+
+        result = self.runner.invoke(
+            cli,
+            ["hook", "pre-push", "--push", "origin", "git@example.com:repo.git"],
+            input=f"refs/heads/main {head} refs/heads/main {base}\n",
+        )
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        mock_patch.assert_called_once()
+        self.assertEqual(
+            mock_patch.call_args.args[0], "https://api.vapi.ai/assistant/asst_alpha"
+        )
+        payload = mock_patch.call_args.kwargs["json"]
+        self.assertEqual(payload["model"]["messages"][0]["content"], "Hello.")
+        self.assertNotIn("id", payload)
+
+
+class TestVapiVCTDiff(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.remote = {
+            "asst_alpha": {
+                "id": "asst_alpha",
+                "updatedAt": "2024-06-01T00:00:00.000Z",
+                "name": "Alpha",
+                "model": {
+                    "provider": "openai",
+                    "model": "gpt-4o",
+                    "temperature": 0.7,
+                    "messages": [
+                        {"role": "system", "content": "Be brief.\nBe kind.\nBe quick."}
+                    ],
+                },
+                "voice": {"provider": "11labs", "voiceId": "rachel"},
+            },
+        }
+        self.remote["asst_beta"] = dict(
+            json.loads(json.dumps(self.remote["asst_alpha"])),
+            id="asst_beta",
+            name="Beta",
+        )
+        with open("vapi_config.json", "w") as f:
+            json.dump(
+                {
+                    "api_key": "vapi_mock_api_key_123456",
+                    "assistant_ids": ["asst_alpha", "asst_beta"],
+                    "assistant_directories": {
+                        "asst_alpha": "alpha",
+                        "asst_beta": "beta",
+                    },
+                },
+                f,
+            )
+        for resource_id, directory in [("asst_alpha", "alpha"), ("asst_beta", "beta")]:
+            local = json.loads(json.dumps(self.remote[resource_id]))
+            if directory == "alpha":
+                local["model"]["temperature"] = 0.5
+                local["model"]["messages"][0][
+                    "content"
+                ] = "Be brief.\nBe warm.\nBe quick."
+            write_decomposed("assistant", local, directory)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_identical_subtrees_share_digests(self):
+        first = merkle_tree(self.remote["asst_alpha"])
+        second = merkle_tree(self.remote["asst_beta"])
+
+        self.assertNotEqual(first[0], second[0])
+        self.assertEqual(first[1]["voice"][0], second[1]["voice"][0])
+        self.assertEqual(first[1]["model"][0], second[1]["model"][0])
+        self.assertEqual(
+            diff_payloads(self.remote["asst_alpha"], self.remote["asst_alpha"]), []
+        )
+
+    @patch("vapi_vct.requests.get")
+    def test_diff_against_remote(self, mock_get):
+        mock_get.side_effect = lambda url, headers: MagicMock(
+            json=lambda: self.remote[url.rsplit("/", 1)[1]]
+        )
+
+        result = self.runner.invoke(cli, ["diff", "--exit-code"])
+
+        self.assertEqual(result.exit_code, 1, result.output)
+        self.assertIn("changed   alpha (asst_alpha)", result.output)
+        self.assertIn("~ model.temperature: 0.7 → 0.5", result.output)
+        self.assertIn("    -Be kind.\n    +Be warm.\n", result.output)
+        self.assertNotIn("voice", result.output)
+        self.assertIn("unchanged beta (asst_beta)", result.output)
+        self.assertIn("1 of 2 assistant(s) would change.", result.output)
+
+
+class TestVapiVCTValidation(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.config_file = "test_vapi_config.json"
+        self.mock_assistant_id = "asst_mock123456"
+        self.valid_assistant = {
+            "id": self.mock_assistant_id,
+            "name": "Mock Assistant",
+            "model": {
+                "provider": "openai",
+                "model": "gpt-4o",
+                "temperature": 0.7,
+                "messages": [{"role": "system", "content": "Be helpful."}],
+            },
+            "firstMessage": "Hello!",
+            "analysisPlan": {
+                "summaryPrompt": "",
+                "structuredDataSchema": {"type": "object", "properties": {}},
+            },
+        }
+
+    def tearDown(self):
+        if os.path.exists("mock_assistant_recomposed.json"):
+            os.remove("mock_assistant_recomposed.json")
+
+    def test_valid_assistant(self):
+        self.assertEqual(validate_assistant_data(self.valid_assistant, "update"), [])
+
+    def test_invalid_assistant(self):
+        invalid = json.loads(json.dumps(self.valid_assistant))
+        del invalid["model"]["provider"]
+        invalid["model"]["temperature"] = 5
+        invalid["model"]["messages"][0]["role"] = "narrator"
+        invalid["analysisPlan"]["structuredDataSchema"] = {"properties": {}}
+
+        errors = validate_assistant_data(invalid, "update")
+
+        self.assertIn("model: missing required property 'provider'", errors)
+        self.assertIn("model.temperature: 5 is greater than 2", errors)
+        self.assertTrue(any(e.startswith("model.messages[0].role") for e in errors))
+        self.assertIn(
+            "analysisPlan.structuredDataSchema: missing required property 'type'",
+            errors,
+        )
+
+    def test_validator_compiled_once(self):
+        self.assertIs(get_validator("update"), get_validator("update"))
+
+    @patch("vapi_vct.requests.patch")
+    @patch("vapi_vct.recompose_assistant")
+    @patch("vapi_vct.load_config")
+    @patch("os.path.isdir", return_value=True)
+    def test_update_aborts_before_request(
+        self, mock_isdir, mock_load_config, mock_recompose, mock_patch
+    ):
+        mock_load_config.return_value = {
+            "api_key": "vapi_mock_api_key_123456",
+            "assistant_ids": [self.mock_assistant_id],
+            "assistant_directories": {self.mock_assistant_id: "mock_assistant"},
+        }
+        mock_recompose.return_value = "mock_assistant_recomposed.json"
+        invalid = dict(self.valid_assistant, model={"messages": []})
+        with open("mock_assistant_recomposed.json", "w") as f:
+            json.dump(invalid, f)
+
+        result = self.runner.invoke(cli, ["update", "--config", self.config_file])
+
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("missing required property 'provider'", result.output)
+        mock_patch.assert_not_called()
+
+    def test_validate_command(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                invalid = json.loads(json.dumps(self.valid_assistant))
+                invalid["id"] = "asst_invalid"
+                invalid["model"]["temperature"] = 5
+                write_decomposed("assistant", self.valid_assistant, "valid")
+                write_decomposed("assistant", invalid, "invalid")
+                write_decomposed("tool", {"id": "tool_1", "type": "function"}, "tool")
+                with open("vapi_config.json", "w") as f:
+                    json.dump(
+                        {
+                            "assistant_ids": [self.mock_assistant_id],
+                            "assistant_directories": {self.mock_assistant_id: "valid"},
+                            "tool_ids": ["tool_1"],
+                            "tool_directories": {"tool_1": "tool"},
+                        },
+                        f,
+                    )
+
+                result = self.runner.invoke(cli, ["validate"])
+                self.assertEqual(result.exit_code, 0, result.output)
+                self.assertIn("All 1 assistant(s) are valid.", result.output)
+
+                result = self.runner.invoke(cli, ["validate", "valid", "invalid"])
+                self.assertEqual(result.exit_code, 1, result.output)
+                self.assertIn("Validation failed for invalid", result.output)
+                self.assertIn("model.temperature: 5 is greater than 2", result.output)
+
+                result = self.runner.invoke(cli, ["validate", "--type", "tool"])
+                self.assertEqual(result.exit_code, 0, result.output)
+                self.assertIn("All 1 tool(s) are valid.", result.output)
+            finally:
+                os.chdir(cwd)
+
+
+class TestVapiVCTTemplates(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        os.makedirs("shared")
+        self.write("shared/compliance.txt", "Never share <<company>> secrets.")
+        self.write("shared/tone.txt", "Be warm.")
+        for name, prompt in [
+            (
+                "alpha",
+                "You work for <<company>>.\n<<include ../shared/compliance.txt>>",
+            ),
+            ("beta", "<<include ../shared/tone.txt>> Ask for {{customer.name}}."),
+        ]:
+            os.makedirs(name)
+            self.write(
+                f"{name}/assistant_config.json",
+                json.dumps(
+                    {
+                        "model": {
+                            "messages": [
+                                {
+                                    "role": "system",
+                                    "content": "file:///system_prompt.txt",
+                                }
+                            ]
+                        }
+                    }
+                ),
+            )
+            self.write(f"{name}/system_prompt.txt", prompt)
+        self.write("alpha/variables.json", json.dumps({"company": "Acme"}))
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def write(self, path, content):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def recomposed_prompt(self, directory):
+        with open(recompose_assistant(directory), "r", encoding="utf-8") as f:
+            return json.load(f)["model"]["messages"][0]["content"]
+
+    def test_includes_and_variables(self):
+        self.assertEqual(
+            self.recomposed_prompt("alpha"),
+            "You work for Acme.\nNever share Acme secrets.",
+        )
+        # Unknown variables and Vapi's own template syntax are left alone
+        self.assertEqual(
+            self.recomposed_prompt("beta"), "Be warm. Ask for {{customer.name}}."
+        )
+
+    def test_include_cycle(self):
+        self.write("shared/tone.txt", "<<include loop.txt>>")
+        self.write("shared/loop.txt", "<<include tone.txt>>")
+        with self.assertRaisesRegex(ValueError, "Include cycle detected"):
+            recompose_assistant("beta")
+
+    def test_fragment_edit_marks_dependents_dirty(self):
+        mark_clean(["alpha", "beta"])
+        self.assertEqual(get_dirty_directories(["alpha", "beta"]), [])
+
+        self.write("shared/compliance.txt", "Never share anything.")
+
+        self.assertEqual(get_dirty_directories(["alpha", "beta"]), ["alpha"])
+
+    def test_broken_include_is_reported_by_commands(self):
+        self.write(
+            "vapi_config.json",
+            json.dumps(
+                {
+                    "api_key": "k",
+                    "assistant_ids": ["asst_alpha", "asst_beta"],
+                    "assistant_directories": {
+                        "asst_alpha": "alpha",
+                        "asst_beta": "beta",
+                    },
+                }
+            ),
+        )
+        os.remove("shared/tone.txt")
+        runner = CliRunner()
+        for args in [["update", "--changed-only"], ["status"], ["stats"]]:
+            result = runner.invoke(cli, args)
+            self.assertEqual(result.exit_code, 1, result.output)
+            self.assertNotIsInstance(result.exception, RecomposeError)
+            self.assertIn("Error: Included file not found", result.output)
+
+
+tokenized_texts = []
+
+
+def recording_tokenizer(text):
+    tokenized_texts.append(text)
+    return text.split()
+
+
+class TestVapiVCTStats(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        for name, prompt in [
+            ("alpha", "You are a helpful assistant."),
+            ("beta", "Answer questions about billing, politely."),
+        ]:
+            os.makedirs(name)
+            with open(f"{name}/system_prompt.txt", "w") as f:
+                f.write(prompt)
+            with open(f"{name}/first_message.txt", "w") as f:
+                f.write("Hello!")
+        tokenized_texts.clear()
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("Hello, world!"), 6)
+        self.assertEqual(estimate_tokens("internationalization"), 5)
+
+    def test_stats_report_and_delta(self):
+        result = self.runner.invoke(cli, ["stats", "alpha", "beta"])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("beta   system_prompt.txt", result.output)
+        self.assertIn("Total: 4 prompt(s), 81 characters", result.output)
+
+        with open("alpha/system_prompt.txt", "a") as f:
+            f.write(" Keep answers short.")
+        result = self.runner.invoke(cli, ["stats", "alpha", "beta", "--sort", "delta"])
+
+        first_row = result.output.splitlines()[1]
+        self.assertIn("alpha  system_prompt.txt", first_row)
+        self.assertIn("+6", first_row)
+
+    def test_stats_only_retokenizes_changed_files(self):
+        args = [
+            "stats",
+            "alpha",
+            "beta",
+            "--tokenizer",
+            "test_vapi_vct:recording_tokenizer",
+        ]
+        self.runner.invoke(cli, args)
+        self.assertEqual(len(tokenized_texts), 4)
+
+        with open("beta/first_message.txt", "w") as f:
+            f.write("Hi there!")
+        result = self.runner.invoke(cli, args)
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertEqual(tokenized_texts[4:], ["Hi there!"])
+
+    def test_stats_keeps_other_baselines_and_prunes(self):
+        self.runner.invoke(cli, ["stats", "alpha", "beta"])
+        with open("beta/system_prompt.txt", "a") as f:
+            f.write(" Be brief.")
+        self.runner.invoke(cli, ["stats", "alpha"])
+        os.remove("alpha/first_message.txt")
+
+        result = self.runner.invoke(cli, ["stats", "alpha", "beta"])
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        beta_row = next(
+            line
+            for line in result.output.splitlines()
+            if line.startswith("beta   system_prompt.txt")
+        )
+        self.assertIn("+4", beta_row)
+        with open(os.path.join(".vapi_vct", "stats_cache.json")) as f:
+            cache = json.load(f)
+        self.assertNotIn(os.path.join("alpha", "first_message.txt"), cache["files"])
+        self.assertNotIn(os.path.join("alpha", "first_message.txt"), cache["snapshot"])
+
+
+class TestVapiVCTHistory(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.assistant_id = "asst_mock123456"
+        self.paragraphs = [
+            f"Rule {i}: handle request type {i} carefully and confirm details."
+            for i in range(300)
+        ]
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def assistant_version(self, version):
+        paragraphs = list(self.paragraphs)
+        paragraphs[version % len(paragraphs)] = f"Revised in version {version}."
+        return {
+            "id": self.assistant_id,
+            "name": "Mock Assistant",
+            "updatedAt": f"2024-01-01T00:{version // 60:02d}:{version % 60:02d}.000Z",
+            "model": {
+                "provider": "openai",
+                "model": "gpt-4o",
+                "messages": [{"role": "system", "content": "\n".join(paragraphs)}],
+            },
+        }
+
+    def test_versions_round_trip_compactly(self):
+        for version in range(200):
+            self.assertEqual(
+                record_history(self.assistant_version(version)), version + 1
+            )
+        # Unchanged data is not stored again
+        self.assertIsNone(record_history(self.assistant_version(199)))
+
+        size = os.path.getsize(
+            os.path.join(".vapi_vct", "history", f"{self.assistant_id}.dat")
+        )
+        full_size = sum(len(json.dumps(self.assistant_version(v))) for v in range(200))
+        self.assertLess(size, full_size / 100)
+
+        for version in [1, 2, 64, 65, 130, 200]:
+            result = self.runner.invoke(cli, ["show", self.assistant_id, str(version)])
+            self.assertEqual(result.exit_code, 0)
+            self.assertEqual(
+                json.loads(result.output), self.assistant_version(version - 1)
+            )
+
+    def test_recording_does_not_replay_deltas(self):
+        for version in range(10):
+            record_history(self.assistant_version(version))
+
+        with patch("vapi_vct.read_history_text", side_effect=AssertionError):
+            self.assertEqual(record_history(self.assistant_version(10)), 11)
+        # Without the latest copy, the history is replayed instead
+        os.remove(os.path.join(".vapi_vct", "history", f"{self.assistant_id}.latest"))
+        self.assertEqual(record_history(self.assistant_version(11)), 12)
+
+        for version in [11, 12]:
+            result = self.runner.invoke(cli, ["show", self.assistant_id, str(version)])
+            self.assertEqual(
+                json.loads(result.output), self.assistant_version(version - 1)
+            )
+
+    def test_show_at_timestamp_and_restore(self):
+        for version in range(3):
+            record_history(self.assistant_version(version))
+
+        result = self.runner.invoke(
+            cli, ["show", self.assistant_id, "--at", "2024-01-01T00:00:01.500Z"]
+        )
+        self.assertEqual(json.loads(result.output), self.assistant_version(1))
+
+        result = self.runner.invoke(
+            cli, ["restore", self.assistant_id, "1", "--no-decompose"]
+        )
+        self.assertEqual(result.exit_code, 0)
+        with open("mock_assistant--asst_moc_fetched.json") as f:
+            self.assertEqual(json.load(f), self.assistant_version(0))
+
+        result = self.runner.invoke(cli, ["history", self.assistant_id])
+        self.assertIn("3 version(s)", result.output)
+
+
+class TestVapiVCTArchive(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.makedirs(os.path.join(self.tmp.name, "source", "shared"))
+        os.makedirs(os.path.join(self.tmp.name, "target"))
+        os.chdir(os.path.join(self.tmp.name, "source"))
+        self.write("shared/tone.txt", "Be warm.")
+        config = {
+            "api_key": "vapi_mock_api_key_123456",
+            "assistant_ids": ["asst_alpha", "asst_beta"],
+            "assistant_directories": {"asst_alpha": "alpha", "asst_beta": "beta"},
+        }
+        self.write("vapi_config.json", json.dumps(config))
+        for name in ["alpha", "beta"]:
+            os.makedirs(name)
+            self.write(f"{name}/assistant_config.json", json.dumps({"name": name}))
+            self.write(
+                f"{name}/system_prompt.txt",
+                f"I am {name}. <<include ../shared/tone.txt>>",
+            )
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def write(self, path, content):
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+
+    def read(self, path):
+        with open(path, "r", encoding="utf-8") as f:
+            return f.read()
+
+    def test_export_and_import(self):
+        archive = os.path.join(self.tmp.name, "project.vct")
+        result = self.runner.invoke(cli, ["export", archive])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("Exported 2 assistant(s) (4 files)", result.output)
+
+        os.chdir(os.path.join(self.tmp.name, "target"))
+        result = self.runner.invoke(
+            cli, ["import", archive, "--assistant", "asst_beta"]
+        )
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertFalse(os.path.exists("alpha"))
+        self.assertEqual(
+            self.read("beta/system_prompt.txt"),
+            "I am beta. <<include ../shared/tone.txt>>",
+        )
+        self.assertEqual(self.read("shared/tone.txt"), "Be warm.")
+        config = json.loads(self.read("vapi_config.json"))
+        self.assertEqual(config["assistant_ids"], ["asst_beta"])
+        self.assertEqual(config["assistant_directories"], {"asst_beta": "beta"})
+        self.assertNotIn("api_key", config)
+
+        # Existing directories are left alone unless --force is given
+        self.write("beta/system_prompt.txt", "Local edit")
+        result = self.runner.invoke(cli, ["import", archive])
+        self.assertIn("Skipping beta as it already exists", result.output)
+        self.assertEqual(self.read("beta/system_prompt.txt"), "Local edit")
+        self.assertEqual(self.read("alpha/assistant_config.json"), '{"name": "alpha"}')
+
+    def test_import_rejects_paths_outside_project(self):
+        for directory, files in [
+            ("alpha", [["../../escaped.txt", 5]]),
+            ("../escaped", [["prompt.txt", 5]]),
+            ("alpha", [[os.path.join(self.tmp.name, "escaped.txt"), 5]]),
+        ]:
+            archive = os.path.join(self.tmp.name, "evil.vct")
+            blob = zlib.compress(b"owned")
+            index = {
+                "config": {},
+                "assistants": {
+                    "asst_evil": {
+                        "offset": len(ARCHIVE_MAGIC),
+                        "length": len(blob),
+                        "files": files,
+                        "directory": directory,
+                    }
+                },
+                "shared": {"offset": 0, "length": 0, "files": []},
+            }
+            with open(archive, "wb") as f:
+                f.write(ARCHIVE_MAGIC + blob)
+                index_offset = f.tell()
+                f.write(json.dumps(index).encode("utf-8"))
+                f.write(ARCHIVE_TRAILER.pack(index_offset, ARCHIVE_MAGIC))
+
+            os.chdir(os.path.join(self.tmp.name, "target"))
+            result = self.runner.invoke(cli, ["import", archive])
+            self.assertEqual(result.exit_code, 1, result.output)
+            self.assertIn("paths outside the project", result.output)
+            self.assertEqual(
+                sorted(os.listdir(self.tmp.name)), ["evil.vct", "source", "target"]
+            )
+            self.assertEqual(os.listdir("."), [])
+
+    def test_import_rejects_damaged_archives(self):
+        archive = os.path.join(self.tmp.name, "project.vct")
+        self.runner.invoke(cli, ["export", archive])
+        with open(archive, "rb") as f:
+            content = f.read()
+        os.chdir(os.path.join(self.tmp.name, "target"))
+
+        for damaged in [
+            b"",
+            content[:4],
+            content[:-3],
+            content[: len(ARCHIVE_MAGIC) + 10] + content[-ARCHIVE_TRAILER.size :],
+        ]:
+            with open(archive, "wb") as f:
+                f.write(damaged)
+            result = self.runner.invoke(cli, ["import", archive])
+            self.assertEqual(result.exit_code, 1, result.output)
+            self.assertIn(f"Error: {archive} is not a vapi_vct archive", result.output)
+            self.assertEqual(os.listdir("."), [])
+
+
+class StubVapiHandler(BaseHTTPRequestHandler):
+    """Serves GET /call from ``server.calls`` the way the Vapi API pages it."""
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = {key: values[0] for key, values in parse_qs(url.query).items()}
+        self.server.requests.append(query)
+        if (
+            self.server.fail_after is not None
+            and len(self.server.requests) > self.server.fail_after
+        ):
+            self.send_response(500)
+            self.end_headers()
+            self.wfile.write(b"boom")
+            return
+        calls = [
+            call
+            for call in self.server.calls
+            if call["assistantId"] == query["assistantId"]
+            and ("createdAtLt" not in query or call["createdAt"] < query["createdAtLt"])
+            and (
+                "createdAtLe" not in query or call["createdAt"] <= query["createdAtLe"]
+            )
+            and (
+                "createdAtGe" not in query or call["createdAt"] >= query["createdAtGe"]
+            )
+        ]
+        calls.sort(key=lambda call: call["createdAt"], reverse=True)
+        body = json.dumps(calls[: int(query["limit"])]).encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class TestVapiVCTCallExport(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), StubVapiHandler)
+        self.server.requests = []
+        self.server.fail_after = None
+        self.server.calls = [
+            {
+                "id": f"call_{assistant}_{i}",
+                "assistantId": f"asst_{assistant}",
+                "createdAt": f"2024-05-0{1 + i % 3}T10:00:0{i}.000Z",
+                "startedAt": f"2024-05-0{1 + i % 3}T10:00:0{i}.000Z",
+                "endedAt": f"2024-05-0{1 + i % 3}T10:01:0{i}.000Z",
+                "cost": 0.1 * i,
+                "endedReason": "customer-ended-call",
+                "analysis": {"successEvaluation": "true"},
+            }
+            for assistant in ["alpha", "beta"]
+            for i in range(7)
+        ]
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        with open("vapi_config.json", "w") as f:
+            json.dump(
+                {
+                    "api_key": "vapi_mock_api_key_123456",
+                    "api_base_url": f"http://127.0.0.1:{self.server.server_port}",
+                    "assistant_ids": ["asst_alpha", "asst_beta"],
+                },
+                f,
+            )
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def exported_ids(self, path):
+        with gzip.open(path, "rt") as f:
+            return [json.loads(line)["id"] for line in f]
+
+    def test_export_jsonl(self):
+        result = self.runner.invoke(cli, ["calls", "export", "--page-size", "3"])
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("Exported 14 call(s) to calls.jsonl.gz", result.output)
+        self.assertEqual(
+            sorted(self.exported_ids("calls.jsonl.gz")),
+            sorted(call["id"] for call in self.server.calls),
+        )
+
+        # A finished export has nothing left to fetch
+        requests_made = len(self.server.requests)
+        result = self.runner.invoke(cli, ["calls", "export"])
+        self.assertIn("Exported 0 call(s)", result.output)
+        self.assertEqual(len(self.server.requests), requests_made)
+
+    def test_export_columnar_by_day(self):
+        result = self.runner.invoke(
+            cli,
+            [
+                "calls",
+                "export",
+                "--format",
+                "columnar",
+                "--since",
+                "2024-05-01T00:00:00Z",
+                "--until",
+                "2024-05-04T00:00:00Z",
+            ],
+        )
+
+        self.assertEqual(result.exit_code, 0)
+        groups = list(read_call_columns("calls.columnar.gz"))
+        self.assertEqual(sum(group["rows"] for group in groups), 14)
+        self.assertEqual(len(self.server.requests), 6)
+        self.assertEqual(set(groups[0]["columns"]["durationSeconds"]), {60.0})
+        self.assertEqual(set(groups[0]["columns"]["successEvaluation"]), {"true"})
+
+    def test_export_resumes_after_failure(self):
+        self.server.fail_after = 3
+        result = self.runner.invoke(
+            cli, ["calls", "export", "--page-size", "2", "--concurrency", "1"]
+        )
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("Error fetching calls", result.output)
+
+        self.server.fail_after = None
+        result = self.runner.invoke(cli, ["calls", "export", "--page-size", "2"])
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("Resuming export", result.output)
+        self.assertEqual(
+            sorted(self.exported_ids("calls.jsonl.gz")),
+            sorted(call["id"] for call in self.server.calls),
+        )
+
+    def test_export_keeps_calls_sharing_page_boundary_timestamp(self):
+        for i, call in enumerate(self.server.calls):
+            call["createdAt"] = f"2024-05-01T10:00:0{i // 2}.000Z"
+        result = self.runner.invoke(
+            cli, ["calls", "export", "--page-size", "3", "--concurrency", "1"]
+        )
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        exported = self.exported_ids("calls.jsonl.gz")
+        self.assertEqual(len(exported), len(set(exported)))
+        self.assertEqual(
+            sorted(exported), sorted(call["id"] for call in self.server.calls)
+        )
+
+    def test_export_stops_on_malformed_call(self):
+        calls = {call["id"]: dict(call) for call in self.server.calls}
+        del calls["call_alpha_3"]["createdAt"]
+        previous = set_transport(FakeTransport({"/call": calls}))
+        self.addCleanup(set_transport, previous)
+        outcome = {}
+        thread = threading.Thread(
+            target=lambda: outcome.update(
+                result=self.runner.invoke(
+                    cli, ["calls", "export", "--page-size", "1", "--concurrency", "1"]
+                )
+            ),
+            daemon=True,
+        )
+        thread.start()
+        thread.join(10)
+
+        self.assertFalse(thread.is_alive(), "export did not return")
+        self.assertEqual(outcome["result"].exit_code, 1)
+        self.assertIn("Error fetching calls: 'createdAt'", outcome["result"].output)
+
+
+@unittest.skipIf(np is None, "NumPy is not installed")
+class TestVapiVCTCallStats(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def assistant(self, prompt, updated_at, voice="v1"):
+        return {
+            "id": "asst_alpha",
+            "updatedAt": updated_at,
+            "model": {"messages": [{"role": "system", "content": prompt}]},
+            "voice": {"voiceId": voice},
+        }
+
+    def call(self, i, created_at, seconds, reason):
+        return {
+            "id": f"call_{i}",
+            "assistantId": "asst_alpha",
+            "createdAt": created_at,
+            "startedAt": "2024-05-01T00:00:00.000Z",
+            "endedAt": f"2024-05-01T00:{seconds // 60:02d}:{seconds % 60:02d}.000Z",
+            "cost": 0.5,
+            "endedReason": reason,
+            "analysis": {"successEvaluation": "true" if seconds < 100 else "false"},
+        }
+
+    def test_stats_per_prompt_version(self):
+        record_history(self.assistant("Version one", "2024-05-01T00:00:00.000Z"))
+        # A change outside the prompts doesn't start a new prompt version
+        record_history(self.assistant("Version one", "2024-05-02T00:00:00.000Z", "v2"))
+        record_history(self.assistant("Version two", "2024-05-03T00:00:00.000Z"))
+
+        writer = CallWriter("calls.columnar.gz", "columnar")
+        writer.write(
+            [
+                self.call(0, "2024-04-30T12:00:00.000Z", 30, "customer-ended-call"),
+                self.call(1, "2024-05-01T12:00:00.000Z", 120, "customer-ended-call"),
+                self.call(2, "2024-05-02T12:00:00.000Z", 180, "silence-timed-out"),
+            ]
+        )
+        writer.write(
+            [
+                self.call(3, "2024-05-03T12:00:00.000Z", 60, "customer-ended-call"),
+                self.call(4, "2024-05-04T12:00:00.000Z", 40, "customer-ended-call"),
+            ]
+        )
+        writer.close()
+
+        with open("vapi_config.json", "w") as f:
+            json.dump({"assistant_directories": {"asst_alpha": "alpha"}}, f)
+
+        result = self.runner.invoke(cli, ["calls", "stats"])
+
+        self.assertEqual(result.exit_code, 0)
+        lines = result.output.splitlines()
+        self.assertEqual(lines[0], "asst_alpha (alpha)")
+        self.assertEqual(lines[1], "  Prompt version unknown")
+        self.assertIn("Calls: 1 ", lines[2])
+        self.assertTrue(lines[5].endswith("since 2024-05-01T00:00:00.000Z"))
+        self.assertIn("Calls: 2  Duration p50/p90/p99: 150.0s", lines[6])
+        self.assertIn("Cost: 1.00 total, 0.5000 per call", lines[6])
+        self.assertIn("customer-ended-call 1, silence-timed-out 1", lines[7])
+        self.assertIn("Success evaluations: false 2", lines[8])
+        self.assertTrue(lines[9].endswith("since 2024-05-03T00:00:00.000Z"))
+        self.assertIn("Calls: 2  Duration p50/p90/p99: 50.0s", lines[10])
+
+    def test_stats_reads_default_export(self):
+        result = self.runner.invoke(cli, ["calls", "stats"])
+        self.assertEqual(result.exit_code, 1)
+        self.assertIn("No call export found", result.output)
+
+        # `calls export` writes JSON lines by default
+        writer = CallWriter("calls.jsonl.gz", "jsonl")
+        writer.write([self.call(0, "2024-05-01T12:00:00.000Z", 30, "pipeline-error")])
+        writer.close()
+
+        result = self.runner.invoke(cli, ["calls", "stats"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("pipeline-error 1", result.output)
+
+
+class TestVapiVCTBulkEdit(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        config = {
+            "api_key": "vapi_mock_api_key_123456",
+            "assistant_ids": ["asst_alpha", "asst_beta", "asst_gamma"],
+            "assistant_directories": {
+                "asst_alpha": "alpha",
+                "asst_beta": "beta",
+                "asst_gamma": "gamma",
+            },
+        }
+        with open("vapi_config.json", "w") as f:
+            json.dump(config, f)
+        for name, prompt, temperature in [
+            ("alpha", "Welcome to Acme Corp.", 0.7),
+            ("beta", "Acme Corp support. Email help@acme.com.", 0.5),
+            ("gamma", "Unrelated prompt.", 0.5),
+        ]:
+            os.makedirs(name)
+            with open(f"{name}/assistant_config.json", "w") as f:
+                json.dump(
+                    {
+                        "model": {
+                            "provider": "openai",
+                            "model": "gpt-4o",
+                            "temperature": temperature,
+                            "messages": [
+                                {
+                                    "role": "system",
+                                    "content": "file:///system_prompt.txt",
+                                }
+                            ],
+                        }
+                    },
+                    f,
+                    indent=2,
+                )
+            with open(f"{name}/system_prompt.txt", "w") as f:
+                f.write(prompt)
+            with open(f"{name}/metadata.json", "w") as f:
+                json.dump({"id": f"asst_{name}"}, f)
+
+    def tearDown(self):
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def read(self, path):
+        with open(path) as f:
+            return f.read()
+
+    def test_compile_replacements(self):
+        substitute = compile_replacements(
+            [
+                (r"(\w+)@acme\.com", r"\1@acme.io"),
+                ("Acme Corp", "Acme Inc"),
+                ("Acme", "ACME"),
+            ]
+        )
+        self.assertEqual(
+            substitute("Acme Corp: help@acme.com, Acme"),
+            ("Acme Inc: help@acme.io, ACME", 3),
+        )
+
+    def test_compile_replacements_with_numbered_or_duplicate_groups(self):
+        # Numeric backreferences keep their meaning in any position
+        substitute = compile_replacements([("x", "y"), (r"(b)\1", "Z")])
+        self.assertEqual(substitute("bb x"), ("Z y", 2))
+        substitute = compile_replacements([(r"(\w)\1", r"<\1>"), ("o", "0")])
+        self.assertEqual(substitute("book"), ("b<o>k", 1))
+        # The first pattern matching at a position still wins
+        substitute = compile_replacements([("(?P<x>a)", "1"), ("(?P<x>b)a", "2")])
+        self.assertEqual(substitute("ba a"), ("2 1", 2))
+
+    def test_dry_run(self):
+        result = self.runner.invoke(
+            cli, ["bulk-edit", "--replace", "Acme Corp", "Acme Inc", "--dry-run"]
+        )
+
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn("-Welcome to Acme Corp.", result.output)
+        self.assertIn("+Welcome to Acme Inc.", result.output)
+        self.assertIn("2 file(s) in 2 assistant(s) would change.", result.output)
+        self.assertEqual(self.read("alpha/system_prompt.txt"), "Welcome to Acme Corp.")
+
+    @patch("vapi_vct.requests.patch")
+    def test_edit_and_push_affected(self, mock_patch):
+        result = self.runner.invoke(
+            cli,
+            [
+                "bulk-edit",
+                "--replace",
+                "Acme Corp",
+                "Acme Inc",
+                "--set",
+                "model.temperature",
+                "0.5",
+                "--yes",
+            ],
+        )
+
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("3 file(s) in 2 assistant(s) would change.", result.output)
+        self.assertEqual(self.read("alpha/system_prompt.txt"), "Welcome to Acme Inc.")
+        self.assertEqual(
+            json.loads(self.read("alpha/assistant_config.json"))["model"][
+                "temperature"
+            ],
+            0.5,
+        )
+        # gamma needed no change and beta's temperature was already 0.5
+        self.assertEqual(
+            sorted(call.args[0] for call in mock_patch.call_args_list),
+            [
+                "https://api.vapi.ai/assistant/asst_alpha",
+                "https://api.vapi.ai/assistant/asst_beta",
+            ],
+        )
+        pushed = [call.kwargs["json"] for call in mock_patch.call_args_list]
+        self.assertIn(
+            "Acme Inc support. Email help@acme.com.",
+            [p["model"]["messages"][0]["content"] for p in pushed],
+        )
+
+
+class TestVapiVCTDaemon(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        with open("vapi_config.json", "w") as f:
+            json.dump({"api_key": "k", "assistant_ids": ["asst_1"]}, f)
+        self.transport = vapi_vct.get_transport()
+        self.server = create_daemon_server()
+        self.thread = threading.Thread(target=serve_daemon, args=(self.server, 3600))
+        self.thread.start()
+
+    def tearDown(self):
+        daemon_call({"control": "stop"})
+        self.thread.join(5)
+        vapi_vct.set_transport(self.transport)
+        vapi_vct._config_cache = None
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def run_command(self, *argv):
+        return daemon_call({"argv": list(argv), "cwd": self.tmp.name})
+
+    def test_runs_commands_and_reloads_changed_config(self):
+        reply = self.run_command("config", "assistants", "ids")
+        self.assertEqual(reply["exit_code"], 0)
+        self.assertIn("- asst_1", reply["stdout"])
+
+        with open("vapi_config.json", "w") as f:
+            json.dump({"api_key": "k", "assistant_ids": ["asst_1", "asst_2"]}, f)
+        reply = self.run_command("config", "assistants", "ids")
+        self.assertIn("- asst_2", reply["stdout"])
+
+        reply = self.run_command("show", "--no-such-option")
+        self.assertEqual(reply["exit_code"], 2)
+        self.assertIn("No such option", reply["stderr"])
+
+        status = daemon_call({"control": "status"})
+        self.assertEqual(status["commands"], 3)
+        self.assertEqual(status["pid"], os.getpid())
+
+    def test_request_environment_runs_locally(self):
+        argv = ["config", "assistants", "ids"]
+        with patch.dict(os.environ, {"VAPI_VCT_NO_DAEMON": ""}):
+            for name in vapi_vct.DAEMON_LOCAL_ENV:
+                with patch.dict(os.environ, {name: "value"}):
+                    self.assertIsNone(vapi_vct.run_in_daemon(argv))
+            with redirect_stdout(io.StringIO()) as output:
+                self.assertEqual(vapi_vct.run_in_daemon(argv), 0)
+        self.assertIn("- asst_1", output.getvalue())
+
+    def test_global_options_run_locally(self):
+        with patch.dict(os.environ, {"VAPI_VCT_NO_DAEMON": ""}):
+            for argv in [
+                ["--record", "cassette.json", "config", "assistants", "ids"],
+                ["--replay", "cassette.json", "publish"],
+                ["--replay-speed", "instant", "hook", "pre-commit"],
+                ["--help"],
+            ]:
+                self.assertIsNone(vapi_vct.run_in_daemon(argv))
+
+    def test_client_falls_back_without_daemon(self):
+        daemon_call({"control": "stop"})
+        self.thread.join(5)
+        self.assertFalse(os.path.exists(vapi_vct.DAEMON_SOCKET))
+        self.assertIsNone(daemon_call({"control": "status"}))
+        self.assertIsNone(vapi_vct.run_in_daemon(["config", "assistants", "ids"]))
+
+
+class TestVapiVCTTransport(unittest.TestCase):
+    def setUp(self):
+        self.runner = CliRunner()
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        with open("vapi_config.json", "w") as f:
+            json.dump({"api_key": "k", "assistant_ids": ["asst_1"]}, f)
+        self.assistant = {
+            "id": "asst_1",
+            "name": "Support",
+            "model": {
+                "provider": "openai",
+                "model": "gpt-4o",
+                "messages": [{"role": "system", "content": "Be helpful."}],
+            },
+        }
+        self.fake = FakeTransport({"/assistant": {"asst_1": self.assistant}})
+        self.transport = set_transport(self.fake)
+
+    def tearDown(self):
+        set_transport(self.transport)
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def test_fetch_and_update_against_fake_api(self):
+        result = self.runner.invoke(cli, ["fetch"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        with open("support--asst_1/system_prompt.txt", "w") as f:
+            f.write("Be brief.")
+
+        result = self.runner.invoke(cli, ["update"])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertEqual([r[0] for r in self.fake.requests], ["GET", "PATCH"])
+        updated = self.fake.resources["/assistant"]["asst_1"]
+        self.assertEqual(updated["model"]["messages"][0]["content"], "Be brief.")
+
+    def test_fake_api_resources_and_paging(self):
+        tool = create_resource("tool", {"type": "function"}, "k")
+        self.assertEqual(fetch_resource("tool", tool["id"], "k"), tool)
+        with self.assertRaises(requests.exceptions.HTTPError) as error:
+            fetch_resource("assistant", "asst_missing", "k")
+        self.assertEqual(error.exception.response.status_code, 404)
+
+        self.fake.resources["/call"] = {
+            f"call_{i}": {"assistantId": "asst_1", "createdAt": f"2024-01-0{i}"}
+            for i in range(1, 4)
+        }
+        url = "https://api.vapi.ai/call"
+        page = vapi_request(
+            "GET", url, "k", params={"assistantId": "asst_1", "limit": 2}
+        ).json()
+        self.assertEqual(
+            [call["createdAt"] for call in page], ["2024-01-03", "2024-01-02"]
+        )
+        page = vapi_request(
+            "GET", url, "k", params={"limit": 2, "createdAtLt": "2024-01-02"}
+        ).json()
+        self.assertEqual([call["createdAt"] for call in page], ["2024-01-01"])
+
+    def test_record_and_replay_with_timings(self):
+        self.fake.latency = 0.05
+        recorder = RecordingTransport("cassette.json", self.fake)
+        set_transport(recorder)
+        fetched = fetch_resource("assistant", "asst_1", "k")
+        url = "https://api.vapi.ai/assistant/asst_1"
+        vapi_request("PATCH", url, "k", stream_json={"name": "Renamed"}, compress=True)
+        with self.assertRaises(requests.exceptions.HTTPError):
+            fetch_resource("assistant", "asst_missing", "k")
+        self.assertFalse(os.path.exists("cassette.json"))
+        recorder.save()
+
+        with open("cassette.json") as f:
+            interactions = json.load(f)["interactions"]
+        self.assertEqual([i["method"] for i in interactions], ["GET", "PATCH", "GET"])
+        self.assertEqual(interactions[1]["body"], {"name": "Renamed"})
+        self.assertTrue(all(i["elapsed"] >= 0.05 for i in interactions))
+
+        set_transport(ReplayTransport("cassette.json"))
+        started = time.perf_counter()
+        self.assertEqual(fetch_resource("assistant", "asst_1", "k"), fetched)
+        self.assertGreaterEqual(time.perf_counter() - started, 0.05)
+        response = vapi_request("PATCH", url, "k", json={"name": "Renamed"})
+        self.assertEqual(response.json()["name"], "Renamed")
+        with self.assertRaises(requests.exceptions.HTTPError):
+            fetch_resource("assistant", "asst_missing", "k")
+        # Each recorded interaction answers one request
+        with self.assertRaises(requests.exceptions.ConnectionError):
+            fetch_resource("assistant", "asst_1", "k")
+
+    def test_cli_record_and_replay(self):
+        result = self.runner.invoke(cli, ["--record", "cassette.json", "fetch"])
+        self.assertEqual(result.exit_code, 0, result.output)
+
+        set_transport(FakeTransport())  # The replay must not reach this API
+        result = self.runner.invoke(
+            cli, ["--replay", "cassette.json", "--replay-speed", "instant", "fetch"]
+        )
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("Decomposed support--asst_1_fetched.json", result.output)
+
+        result = self.runner.invoke(
+            cli, ["--record", "a.json", "--replay", "cassette.json", "fetch"]
+        )
+        self.assertEqual(result.exit_code, 2)
+
+
 if __name__ == "__main__":
     unittest.main()
@@ -1,13 +1,227 @@
 #!/usr/bin/env python3
 
-import click
 import os
+import sys
 import json
+
+# Project-local working state (caches, indexes), kept in the project directory
+STATE_DIR = ".vapi_vct"
+# Names and directories of fetched resources, by type and ID
+INDEX_PATH = os.path.join(STATE_DIR, "index.json")
+
+
+# Shell completion
+# Completing resource names and IDs is answered straight from the local index,
+# before the imports below, so it needs no network access and doesn't pay for
+# importing click, requests or NumPy. Anything else falls through to click.
+COMPLETE_VAR = "_VAPI_VCT_COMPLETE"
+# Commands taking resource references: (type, number of such arguments)
+REFERENCE_COMMANDS = {
+    ("history",): ("assistant", 1),
+    ("show",): ("assistant", 1),
+    ("restore",): ("assistant", 1),
+    ("config", "assistants", "add"): ("assistant", None),
+    ("config", "assistants", "del"): ("assistant", None),
+    ("calls", "export"): ("assistant", None),
+}
+# Options of those commands that take a value
+REFERENCE_VALUE_OPTIONS = {
+    "--config",
+    "--at",
+    "--output",
+    "--format",
+    "--since",
+    "--until",
+    "--page-size",
+    "--concurrency",
+}
+
+
+def load_index():
+    try:
+        with open(INDEX_PATH, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (FileNotFoundError, ValueError):
+        return {}
+
+
+def index_completions(kind, incomplete):
+    """Return ``(value, help)`` pairs for names and IDs starting with ``incomplete``."""
+    entries = sorted(load_index().get(kind, {}).items(), key=lambda e: e[1]["handle"])
+    completions = [
+        (entry["handle"], resource_id)
+        for resource_id, entry in entries
+        if entry["handle"].startswith(incomplete)
+    ]
+    if incomplete:
+        completions.extend(
+            (resource_id, entry["name"])
+            for resource_id, entry in entries
+            if resource_id.startswith(incomplete)
+        )
+    return completions
+
+
+def complete_from_index(environ):
+    """Answer a click completion request from the index, or return None."""
+    shell, _, action = environ.get(COMPLETE_VAR, "").partition("_")
+    if action != "complete" or shell not in ("bash", "zsh", "fish"):
+        return None
+
+    words = environ.get("COMP_WORDS", "").split()
+    if shell == "fish":
+        incomplete = environ.get("COMP_CWORD", "")
+        args = words[1:]
+        if incomplete and args and args[-1] == incomplete:
+            args.pop()
+    else:
+        cword = int(environ.get("COMP_CWORD", "0"))
+        args = words[1:cword]
+        incomplete = words[cword] if cword < len(words) else ""
+
+    if incomplete.startswith("-") or (args and args[-1] in REFERENCE_VALUE_OPTIONS):
+        return None
+    for command, (kind, limit) in REFERENCE_COMMANDS.items():
+        if tuple(args[: len(command)]) == command:
+            break
+    else:
+        return None
+
+    positionals = 0
+    option_value = False
+    for arg in args[len(command) :]:
+        if option_value or arg.startswith("-"):
+            option_value = arg in REFERENCE_VALUE_OPTIONS
+        else:
+            positionals += 1
+    if limit is not None and positionals >= limit:
+        return None
+
+    lines = []
+    for value, help_text in index_completions(kind, incomplete):
+        if shell == "zsh":
+            lines.append(f"plain\n{value}\n{help_text or '_'}")
+        elif shell == "fish" and help_text:
+            lines.append(f"plain,{value}\t{help_text}")
+        else:
+            lines.append(f"plain,{value}")
+    return "\n".join(lines)
+
+
+# Daemon client
+# When a daemon is running for the project (`vapi_vct daemon start`), commands
+# are sent to it over a Unix socket instead of being run here, again before
+# the heavy imports. Interactive commands and those that read stdin or manage
+# the daemon always run locally, as does everything with VAPI_VCT_NO_DAEMON set,
+# with global options such as --record, or with environment variables that
+# change how requests are made, which the daemon can't see.
+DAEMON_SOCKET = os.path.join(STATE_DIR, "daemon.sock")
+DAEMON_LOCAL_COMMANDS = {"daemon", "publish", "bulk-edit", "hook", "workspace"}
+DAEMON_LOCAL_ENV = ["VAPI_VCT_RECORD", "VAPI_VCT_REPLAY", "VAPI_VCT_RATE_LIMIT"]
+
+
+def daemon_call(request, socket_path=DAEMON_SOCKET):
+    """Send ``request`` to the daemon and return its reply, or None if not running."""
+    import socket
+
+    if not hasattr(socket, "AF_UNIX") or not os.path.exists(socket_path):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(socket_path)
+            client.sendall(json.dumps(request).encode("utf-8"))
+            client.shutdown(socket.SHUT_WR)
+            chunks = []
+            while True:
+                chunk = client.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+    except OSError:
+        return None  # A stale socket left by a daemon that didn't stop cleanly
+    return json.loads(b"".join(chunks))
+
+
+def run_in_daemon(argv):
+    """Run a command in the project's daemon and return its exit code, or None."""
+    if (
+        os.environ.get("VAPI_VCT_NO_DAEMON")
+        or any(os.environ.get(name) for name in DAEMON_LOCAL_ENV)
+        or (argv and argv[0] in DAEMON_LOCAL_COMMANDS)
+        # Global options come before the command, and all change how it runs
+        or (argv and argv[0].startswith("-"))
+    ):
+        return None
+    reply = daemon_call({"argv": argv, "cwd": os.getcwd()})
+    if reply is None:
+        return None
+    sys.stdout.write(reply["stdout"])
+    sys.stderr.write(reply["stderr"])
+    return reply["exit_code"]
+
+
+if __name__ == "__main__":
+    if os.environ.get(COMPLETE_VAR):
+        completions = complete_from_index(os.environ)
+        if completions is not None:
+            print(completions)
+            sys.exit(0)
+    else:
+        exit_code = run_in_daemon(sys.argv[1:])
+        if exit_code is not None:
+            sys.exit(exit_code)
+
+import click
 import requests
-import sys
+from click.shell_completion import CompletionItem
 import re
+import hashlib
+import functools
+import importlib
+import statistics
+import difflib
+import zlib
+import mmap
+import struct
+import glob
+import gzip
+import queue
+import threading
+import subprocess
+import time
+import tempfile
+import shlex
+import io
+import socketserver
+import traceback
+from collections import deque
+from urllib.parse import urlparse
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import datetime, timedelta, timezone
 import random
 import string
+import copy
+from contextlib import contextmanager, redirect_stderr, redirect_stdout
+
+try:
+    import fcntl
+except ImportError:  # Windows: config writes are still atomic, just not locked
+    fcntl = None
+
+try:
+    import numpy as np
+except ImportError:  # Only needed by `calls stats`
+    np = None
+
+# Properties returned by the API that must not be sent back on create/update
+READ_ONLY_KEYS = ["id", "orgId", "createdAt", "updatedAt", "isServerUrlSecretSet"]
+
+API_BASE_URL = "https://api.vapi.ai"
+
+# Payloads whose recomposed file is at least this large are encoded straight
+# into the request body instead of being serialised up front
+STREAM_THRESHOLD = 1024 * 1024
+STREAM_CHUNK_SIZE = 64 * 1024
 
 
 # Helpers
@@ -19,14 +233,12 @@ def load_config(config_file, project_specific=False):
 
         # Load default config if it exists
         if os.path.exists(default_config_path):
-            with open(default_config_path, "r") as f:
-                config = json.load(f)
+            config = read_config_file(default_config_path)
 
     # Load and merge project-specific config
     try:
-        with open(config_file, "r") as f:
-            project_config = json.load(f)
-            config.update(project_config)
+        project_config = read_config_file(config_file)
+        config.update(project_config)
     except FileNotFoundError:
         click.echo(
             f"Warning: Project configuration file '{config_file}' not found.{' Using default configuration.' if not project_specific else ''}",
@@ -41,14 +253,115 @@ def load_config(config_file, project_specific=False):
     if "assistant_directories" not in config:
         config["assistant_directories"] = {}
 
+    remember_config_base(config_file, config)
     return config
 
 
+# Parsed config files keyed by path, reused while the file is unchanged. Only
+# enabled in the daemon, where they outlive a single command.
+_config_cache = None
+
+
+def read_config_file(path):
+    if _config_cache is None:
+        with open(path, "r") as f:
+            return json.load(f)
+
+    stat = os.stat(path)
+    signature = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+    cached = _config_cache.get(os.path.abspath(path))
+    if not cached or cached[0] != signature:
+        with open(path, "r") as f:
+            cached = (signature, json.load(f))
+        _config_cache[os.path.abspath(path)] = cached
+    return copy.deepcopy(cached[1])
+
+
+# The content of each loaded config as it was when loaded, keyed by file. When
+# a config is written back, update_config merges the caller's changes relative
+# to this base into whatever is on disk by then, so concurrent invocations
+# don't overwrite each other's assistant IDs or directory mappings.
+_config_bases = {}
+_config_bases_lock = threading.Lock()
+CONFIG_BASES_PER_FILE = 64
+
+
+def remember_config_base(config_file, config):
+    base = copy.deepcopy(config)
+    with _config_bases_lock:
+        bases = _config_bases.setdefault(os.path.abspath(config_file), [])
+        bases[:] = [entry for entry in bases if entry[0] is not config]
+        bases.append((config, base))
+        del bases[:-CONFIG_BASES_PER_FILE]
+
+
+def find_config_base(config_file, config):
+    with _config_bases_lock:
+        for loaded, base in _config_bases.get(os.path.abspath(config_file), []):
+            if loaded is config:
+                return base
+    return None
+
+
+@contextmanager
+def config_lock(config_file):
+    """Hold an exclusive advisory lock on ``config_file`` while writing it."""
+    lock_directory = os.path.join(os.path.dirname(config_file) or ".", STATE_DIR)
+    os.makedirs(lock_directory, exist_ok=True)
+    lock_path = os.path.join(lock_directory, f"{os.path.basename(config_file)}.lock")
+    with open(lock_path, "a") as lock_file:
+        if fcntl:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl:
+                fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def merge_lists(base, ours, theirs):
+    removed = [item for item in base if item not in ours]
+    added = [item for item in ours if item not in base and item not in theirs]
+    return [item for item in theirs if item not in removed] + added
+
+
+def merge_config(base, ours, theirs):
+    """Three-way merge: apply the changes from ``base`` to ``ours`` onto ``theirs``.
+
+    Lists are merged as sets, so additions and removals made by either side
+    are kept. For other values changed on both sides, ours wins.
+    """
+    merged = dict(theirs)
+    for key in list(base) + [key for key in ours if key not in base]:
+        if key not in ours:
+            merged.pop(key, None)
+        elif key in base and ours[key] == base[key]:
+            continue
+        elif all(
+            isinstance(v, dict) for v in [base.get(key), ours[key], theirs.get(key)]
+        ):
+            merged[key] = merge_config(base[key], ours[key], theirs[key])
+        elif all(
+            isinstance(v, list) for v in [base.get(key), ours[key], theirs.get(key)]
+        ):
+            merged[key] = merge_lists(base[key], ours[key], theirs[key])
+        else:
+            merged[key] = ours[key]
+    return merged
+
+
 def get_api_key(config):
     api_key = config.get("api_key")
     if not api_key:
         click.echo("Error: API key not found in configuration file.", err=True)
         raise SystemExit(1)
+
+    # A workspace run hands each project its share of the key's budget
+    rate_limit = config.get("rate_limit")
+    if os.environ.get(RATE_LIMIT_ENV):
+        rate_limit = json.loads(os.environ[RATE_LIMIT_ENV])
+    if rate_limit:
+        set_rate_limit(api_key, rate_limit)
     return api_key
 
 
@@ -59,141 +372,817 @@ def get_assistant_ids(config):
     return assistant_ids
 
 
-# Fetching
-def fetch_assistant_and_save(assistant_ids, api_key):
-    filenames = []
-    for assistant_id in assistant_ids:
-        # API endpoint
-        url = f"https://api.vapi.ai/assistant/{assistant_id}"
+def get_assistant_directories(config):
+    assistant_directories = config.get("assistant_directories", {})
+    directories = [
+        assistant_directories.get(assistant_id, assistant_id)
+        for assistant_id in get_assistant_ids(config)
+    ]
+    return [directory for directory in directories if os.path.isdir(directory)]
 
-        # Headers
-        headers = {
-            "Authorization": f"Bearer {api_key}",
-            "Content-Type": "application/json",
-        }
 
+def get_api_base_url(config):
+    return config.get("api_base_url", API_BASE_URL).rstrip("/")
+
+
+def get_body_options(config):
+    """Return the request body options of ``config`` for the update functions."""
+    return {
+        "stream_threshold": config.get("stream_threshold", STREAM_THRESHOLD),
+        "compress": config.get("gzip_requests", False),
+    }
+
+
+def iter_json_body(data, compress=False):
+    """Encode ``data`` as JSON incrementally, yielding request body chunks.
+
+    Only about STREAM_CHUNK_SIZE bytes of the encoded payload are held in
+    memory at a time, gzip-compressed on the fly if ``compress`` is set.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+    pending = []
+    pending_size = 0
+    for piece in json.JSONEncoder(ensure_ascii=False, allow_nan=False).iterencode(data):
+        pending.append(piece)
+        pending_size += len(piece)
+        if pending_size >= STREAM_CHUNK_SIZE:
+            chunk = "".join(pending).encode("utf-8")
+            pending = []
+            pending_size = 0
+            chunk = compressor.compress(chunk) if compressor else chunk
+            if chunk:
+                yield chunk
+    chunk = "".join(pending).encode("utf-8")
+    if compressor:
+        chunk = compressor.compress(chunk) + compressor.flush()
+    if chunk:
+        yield chunk
+
+
+# Request budgets keyed by API key, set from the config's "rate_limit"
+RATE_LIMIT_ENV = "VAPI_VCT_RATE_LIMIT"
+_rate_limiters = {}
+
+
+class RateLimiter:
+    """Spaces requests to ``requests_per_second`` and caps those in flight."""
+
+    def __init__(self, requests_per_second=None, concurrency=None):
+        self.interval = 1.0 / requests_per_second if requests_per_second else 0
+        self.slots = threading.BoundedSemaphore(concurrency) if concurrency else None
+        self.lock = threading.Lock()
+        self.next_start = 0.0
+
+    def __enter__(self):
+        if self.slots:
+            self.slots.acquire()
+        if self.interval:
+            with self.lock:
+                now = time.monotonic()
+                start = max(now, self.next_start)
+                self.next_start = start + self.interval
+            time.sleep(start - now)
+        return self
+
+    def __exit__(self, *exc_info):
+        if self.slots:
+            self.slots.release()
+
+
+def set_rate_limit(api_key, rate_limit):
+    _rate_limiters[api_key] = RateLimiter(
+        rate_limit.get("requests_per_second"), rate_limit.get("concurrency")
+    )
+
+
+# Transports
+# Every HTTP request goes through the current transport: an object with a
+# request(method, url, **kwargs) method that takes requests-style arguments
+# and returns a requests-style response. RequestsTransport is the default and
+# the daemon uses PooledTransport. FakeTransport is an in-memory Vapi API for
+# tests and offline runs. RecordingTransport saves every exchange with its
+# timing to a cassette file, and ReplayTransport answers from one with the
+# recorded latency.
+class RequestsTransport:
+    def __init__(self, session=None):
+        self.session = session
+
+    def request(self, method, url, **kwargs):
+        return getattr(self.session or requests, method.lower())(url, **kwargs)
+
+
+class PooledTransport(RequestsTransport):
+    """Keep-alive connections shared by all threads, up to ``pool_size`` at once."""
+
+    def __init__(self, pool_size=32):
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=4, pool_maxsize=pool_size
+        )
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        super().__init__(session)
+
+
+class TransportResponse:
+    """A response held in memory, with the parts of requests.Response used here."""
+
+    def __init__(self, status_code, body, url, headers=None):
+        self.status_code = status_code
+        self.url = url
+        self.headers = requests.structures.CaseInsensitiveDict(
+            headers or {"Content-Type": "application/json"}
+        )
+        self.text = body if isinstance(body, str) else json.dumps(body)
+        self.content = self.text.encode("utf-8")
+
+    @property
+    def ok(self):
+        return self.status_code < 400
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if not self.ok:
+            raise requests.exceptions.HTTPError(
+                f"{self.status_code} Error for url: {self.url}", response=self
+            )
+
+
+def request_url(url, params=None):
+    """The full URL of a request, with its query parameters encoded."""
+    prepared = requests.models.PreparedRequest()
+    prepared.prepare_url(url, params)
+    return prepared.url
+
+
+def read_request_body(kwargs):
+    """Replace a streamed ``data`` body in ``kwargs`` with its bytes."""
+    data = kwargs.get("data")
+    if data is not None and not isinstance(data, (bytes, str)):
+        kwargs["data"] = b"".join(data)
+    return kwargs
+
+
+def decode_request_body(kwargs):
+    """The JSON payload of a request, whether sent as ``json=`` or as (gzipped) data."""
+    if "json" in kwargs:
+        return kwargs["json"]
+    data = read_request_body(kwargs).get("data")
+    if data is None:
+        return None
+    if isinstance(data, str):
+        data = data.encode("utf-8")
+    if data[:2] == b"\x1f\x8b":
+        data = gzip.decompress(data)
+    return json.loads(data)
+
+
+class FakeTransport:
+    """An in-memory Vapi API.
+
+    ``resources`` maps endpoints such as "/assistant" to resources by ID.
+    Resources can be listed, fetched, created, updated and deleted, and lists
+    support the ``limit``, ``createdAtGe``, ``createdAtLe``, ``createdAtLt`` and equality
+    filters used for paging. Each request is appended to ``requests`` as
+    ``(method, url, body)``, and takes ``latency`` seconds.
+    """
+
+    def __init__(self, resources=None, latency=0):
+        self.resources = {spec["endpoint"]: {} for spec in RESOURCE_TYPES.values()}
+        self.resources["/call"] = {}
+        for endpoint, items in (resources or {}).items():
+            self.resources[endpoint] = copy.deepcopy(items)
+        self.requests = []
+        self.latency = latency
+        self.lock = threading.Lock()
+
+    def request(self, method, url, params=None, **kwargs):
+        method = method.upper()
+        body = decode_request_body(kwargs)
+        with self.lock:
+            self.requests.append((method, request_url(url, params), body))
+            status_code, payload = self.handle(
+                method, urlparse(url).path.rstrip("/"), params or {}, body
+            )
+        if self.latency:
+            time.sleep(self.latency)
+        return TransportResponse(status_code, copy.deepcopy(payload), url)
+
+    def handle(self, method, path, params, body):
+        now = format_timestamp(datetime.now(timezone.utc))
+        if path in self.resources:
+            items = self.resources[path]
+            if method == "GET":
+                return 200, self.list_items(items.values(), params)
+            if method == "POST":
+                resource_id = f"{path.strip('/')}_" + "".join(
+                    random.choices(string.ascii_lowercase + string.digits, k=12)
+                )
+                items[resource_id] = dict(
+                    body, id=resource_id, createdAt=now, updatedAt=now
+                )
+                return 201, items[resource_id]
+        else:
+            endpoint, _, resource_id = path.rpartition("/")
+            items = self.resources.get(endpoint, {})
+            if resource_id in items:
+                if method == "GET":
+                    return 200, items[resource_id]
+                if method == "PATCH":
+                    items[resource_id].update(body, updatedAt=now)
+                    return 200, items[resource_id]
+                if method == "DELETE":
+                    return 200, items.pop(resource_id)
+        return 404, {"message": f"Cannot {method} {path}", "statusCode": 404}
+
+    @staticmethod
+    def list_items(items, params):
+        items = sorted(items, key=lambda item: item.get("createdAt", ""), reverse=True)
+        for key, value in params.items():
+            if key == "createdAtGe":
+                items = [item for item in items if item["createdAt"] >= value]
+            elif key == "createdAtLe":
+                items = [item for item in items if item["createdAt"] <= value]
+            elif key == "createdAtLt":
+                items = [item for item in items if item["createdAt"] < value]
+            elif key != "limit":
+                items = [item for item in items if item.get(key) == value]
+        return items[: int(params.get("limit", 100))]
+
+
+class RecordingTransport:
+    """Send requests through ``transport``, recording each exchange.
+
+    Each interaction holds the request, its start ``offset`` from the first
+    request and its ``elapsed`` seconds, and the response, or the error if
+    the request failed. Streamed bodies are read into memory first.
+    Interactions are kept in memory, so that writing them doesn't slow the
+    requests being measured, until save() writes them to ``cassette``.
+    """
+
+    def __init__(self, cassette, transport=None):
+        self.cassette = cassette
+        self.transport = transport or RequestsTransport()
+        self.interactions = []
+        self.started = None
+        self.lock = threading.Lock()
+
+    def request(self, method, url, **kwargs):
+        kwargs = read_request_body(kwargs)
+        interaction = {
+            "method": method.upper(),
+            "url": request_url(url, kwargs.get("params")),
+            "body": decode_request_body(kwargs),
+        }
+        started = time.perf_counter()
         try:
-            # Make the GET request
-            response = requests.get(url, headers=headers)
-            response.raise_for_status()  # Raise an exception for bad status codes
+            response = self.transport.request(method, url, **kwargs)
+            interaction["response"] = {
+                "status": response.status_code,
+                "headers": {
+                    "Content-Type": response.headers.get(
+                        "Content-Type", "application/json"
+                    )
+                },
+                "body": response.text,
+            }
+        except requests.exceptions.RequestException as e:
+            interaction["error"] = str(e)
+            raise
+        finally:
+            finished = time.perf_counter()
+            with self.lock:
+                if self.started is None:
+                    self.started = started
+                interaction["offset"] = round(started - self.started, 6)
+                interaction["elapsed"] = round(finished - started, 6)
+                self.interactions.append(interaction)
+        return response
+
+    def save(self):
+        with self.lock:
+            interactions = list(self.interactions)
+        temporary_path = f"{self.cassette}.tmp"
+        with open(temporary_path, "w", encoding="utf-8") as f:
+            json.dump({"interactions": interactions}, f, indent=2)
+        os.replace(temporary_path, self.cassette)
+
+
+class ReplayTransport:
+    """Answer requests from a cassette saved by RecordingTransport.
 
-            # Parse the JSON response
-            assistant_data = response.json()
+    Requests are matched on method and URL, each recorded interaction once,
+    in recorded order. Each response takes as long as the recorded request
+    did unless ``realtime`` is false. Unmatched requests raise
+    ConnectionError, as if the API were unreachable.
+    """
 
-            # Save to a local JSON file
-            assistant_name = sanitize_assistant_name(
-                assistant_data.get("name", assistant_id)
+    def __init__(self, cassette, realtime=True):
+        with open(cassette, "r", encoding="utf-8") as f:
+            interactions = json.load(f)["interactions"]
+        self.realtime = realtime
+        self.lock = threading.Lock()
+        self.queues = {}
+        for interaction in interactions:
+            key = (interaction["method"], interaction["url"])
+            self.queues.setdefault(key, deque()).append(interaction)
+
+    def request(self, method, url, params=None, **kwargs):
+        key = (method.upper(), request_url(url, params))
+        with self.lock:
+            pending = self.queues.get(key)
+            interaction = pending.popleft() if pending else None
+        if interaction is None:
+            raise requests.exceptions.ConnectionError(
+                f"No recorded response for {key[0]} {key[1]}"
             )
-            filename = f"{assistant_name}--{assistant_id[:8]}_fetched.json"
-            with open(filename, "w") as f:
-                json.dump(assistant_data, f, indent=2)
+        if self.realtime:
+            time.sleep(interaction["elapsed"])
+        if "error" in interaction:
+            raise requests.exceptions.ConnectionError(interaction["error"])
+        response = interaction["response"]
+        return TransportResponse(
+            response["status"], response["body"], key[1], response["headers"]
+        )
+
+
+_transport = RequestsTransport()
+
+
+def get_transport():
+    return _transport
+
+
+def set_transport(transport):
+    """Send all requests through ``transport``, returning the previous one."""
+    global _transport
+    previous = _transport
+    _transport = transport
+    return previous
+
+
+def vapi_request(method, url, api_key, stream_json=None, compress=False, **kwargs):
+    """Make an API request, raising for error responses.
+
+    With ``stream_json``, that payload is sent as a chunked, incrementally
+    encoded body (see iter_json_body) rather than via ``json=``.
+    """
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    if stream_json is not None:
+        kwargs["data"] = iter_json_body(stream_json, compress)
+        if compress:
+            headers["Content-Encoding"] = "gzip"
+    limiter = _rate_limiters.get(api_key)
+    if limiter:
+        with limiter:
+            response = _transport.request(method, url, headers=headers, **kwargs)
+    else:
+        response = _transport.request(method, url, headers=headers, **kwargs)
+    response.raise_for_status()
+    return response
+
+
+# Resources
+# Every Vapi resource type the tool manages is described by a declarative spec:
+# its API endpoint, where its IDs and directories live in the config, and which
+# fields are decomposed into which files. Field paths use dots for keys, [n]
+# for list indexes, [key=value] for the first list item with that property and
+# [*] for every list item not already addressed by an earlier field. Files of
+# [*] fields are named from the item's {index} and {key}, the first of the
+# field's "key" paths the item has. Text fields only take string values.
+# Fields marked "always" get an empty placeholder file when absent from the
+# payload, and are set from it on recompose once it has content.
+RESOURCE_TYPES = {
+    "assistant": {
+        "endpoint": "/assistant",
+        "ids_key": "assistant_ids",
+        "directories_key": "assistant_directories",
+        "config_file": "assistant_config.json",
+        "name_path": "name",
+        "schema": {"create": "CreateAssistantDTO", "update": "UpdateAssistantDTO"},
+        "fields": [
+            {
+                "path": "model.messages[role=system].content",
+                "file": "system_prompt.txt",
+            },
+            {
+                "path": "model.messages[*].content",
+                "file": "messages/{index:02d}_{key}.txt",
+                "key": ["role"],
+            },
+            {
+                "path": "model.tools[*]",
+                "file": "tools/{index:02d}_{key}.json",
+                "key": ["function.name", "type"],
+            },
+            {
+                "path": "model.functions[*]",
+                "file": "functions/{index:02d}_{key}.json",
+                "key": ["name"],
+            },
+            {"path": "firstMessage", "file": "first_message.txt", "always": True},
+            {
+                "path": "analysisPlan.summaryPrompt",
+                "file": "summary_prompt.txt",
+                "always": True,
+            },
+            {
+                "path": "analysisPlan.structuredDataPrompt",
+                "file": "structured_data_prompt.txt",
+                "always": True,
+            },
+            {
+                "path": "analysisPlan.structuredDataSchema",
+                "file": "structured_data_schema.json",
+                "always": True,
+                "empty": {"type": "object", "properties": {}},
+            },
+            {
+                "path": "analysisPlan.successEvaluationPrompt",
+                "file": "success_evaluation_prompt.txt",
+                "always": True,
+            },
+        ],
+    },
+    "tool": {
+        "endpoint": "/tool",
+        "ids_key": "tool_ids",
+        "directories_key": "tool_directories",
+        "config_file": "tool_config.json",
+        "name_path": "function.name",
+        "fields": [
+            {"path": "function.description", "file": "description.txt"},
+            {"path": "function.parameters", "file": "parameters.json"},
+        ],
+    },
+    "squad": {
+        "endpoint": "/squad",
+        "ids_key": "squad_ids",
+        "directories_key": "squad_directories",
+        "config_file": "squad_config.json",
+        "name_path": "name",
+        "fields": [],
+    },
+    "phone-number": {
+        "endpoint": "/phone-number",
+        "ids_key": "phone_number_ids",
+        "directories_key": "phone_number_directories",
+        "config_file": "phone_number_config.json",
+        "name_path": "name",
+        "fields": [],
+    },
+}
+RESOURCE_PATH_TOKEN = re.compile(r"([^.\[\]]+)|\[(\d+)\]|\[(\w+)=([^\]]*)\]|\[(\*)\]")
+
+# Field specs compiled into a path trie, keyed by resource type
+_compiled_specs = {}
+
+
+def parse_resource_path(path):
+    tokens = []
+    for key, index, match_key, match_value, each in RESOURCE_PATH_TOKEN.findall(path):
+        if each:
+            tokens.append(("each",))
+        elif index:
+            tokens.append(("index", int(index)))
+        elif match_key:
+            tokens.append(("match", match_key, match_value))
+        else:
+            tokens.append(("key", key))
+    return tokens
+
+
+def compile_resource_spec(kind):
+    """Compile the field spec of ``kind`` into a trie of path tokens.
+
+    Fields sharing a prefix (such as the analysisPlan prompts) share a branch,
+    so decomposing or recomposing visits each container in the payload once.
+    """
+    if kind not in _compiled_specs:
+        root = {"children": {}, "field": None}
+        for field in RESOURCE_TYPES[kind]["fields"]:
+            node = root
+            field = dict(field, tokens=parse_resource_path(field["path"]))
+            for token in field["tokens"]:
+                node = node["children"].setdefault(
+                    token, {"children": {}, "field": None}
+                )
+            node["field"] = field
+        _compiled_specs[kind] = root
+    return _compiled_specs[kind]
+
+
+def child_slots(container, token):
+    """Yield the keys or indexes of ``container`` addressed by ``token``."""
+    if token[0] == "key":
+        if isinstance(container, dict) and token[1] in container:
+            yield token[1]
+    elif not isinstance(container, list):
+        return
+    elif token[0] == "index":
+        if token[1] < len(container):
+            yield token[1]
+    elif token[0] == "each":
+        yield from range(len(container))
+    else:
+        for index, item in enumerate(container):
+            if isinstance(item, dict) and str(item.get(token[1])) == token[2]:
+                yield index
+                return
+
+
+def walk_fields(node, container, visit, item=None):
+    """Replace every value matched by the compiled spec with ``visit``.
+
+    ``visit(field, value, item)`` gets the ``(index, value)`` of the list item
+    the innermost [*] of the path matched, or None.
+    """
+    claimed = set()
+    for token, child in node["children"].items():
+        for slot in child_slots(container, token):
+            if token[0] == "each":
+                if slot in claimed:
+                    continue
+                child_item = (slot, container[slot])
+            else:
+                child_item = item
+            claimed.add(slot)
+            if child["field"]:
+                container[slot] = visit(child["field"], container[slot], child_item)
+            if child["children"]:
+                walk_fields(child, container[slot], visit, child_item)
+
+
+def get_field_path(data, path):
+    for token in parse_resource_path(path):
+        data = data.get(token[1]) if isinstance(data, dict) else None
+    return data
+
+
+def field_filename(field, item):
+    """Return the file a field's value is stored in, for the list item ``item``."""
+    if item is None:
+        return field["file"]
+    index, value = item
+    key = next(
+        (
+            get_field_path(value, path)
+            for path in field.get("key", [])
+            if get_field_path(value, path)
+        ),
+        "item",
+    )
+    return field["file"].format(index=index, key=sanitize_assistant_name(str(key)))
+
+
+def set_field_path(data, tokens, value):
+    """Set a key-only field path in ``data``, creating missing parents."""
+    if any(token[0] != "key" for token in tokens):
+        return
+    for token in tokens[:-1]:
+        if not isinstance(data.get(token[1]), dict):
+            data[token[1]] = {}
+        data = data[token[1]]
+    data[tokens[-1][1]] = value
+
+
+def resource_label(kind):
+    return kind.replace("-", " ").capitalize()
+
+
+def get_resource_name(kind, data):
+    return get_field_path(data, RESOURCE_TYPES[kind]["name_path"]) or data["id"]
+
+
+def resource_directory_name(kind, data):
+    name = sanitize_assistant_name(get_resource_name(kind, data))
+    return f"{name}--{data['id'][:8]}"
+
+
+def get_resource_ids(config, kind):
+    return config.get(RESOURCE_TYPES[kind]["ids_key"], [])
+
+
+def get_resource_directories(config, kind):
+    resource_directories = config.get(RESOURCE_TYPES[kind]["directories_key"], {})
+    directories = [
+        resource_directories.get(resource_id, resource_id)
+        for resource_id in get_resource_ids(config, kind)
+    ]
+    return [directory for directory in directories if os.path.isdir(directory)]
+
+
+def update_index(kind, data, directory):
+    """Record the name and directory of a fetched or created resource."""
+    index = load_index()
+    name = get_resource_name(kind, data)
+    index.setdefault(kind, {})[data["id"]] = {
+        "name": name,
+        "handle": sanitize_assistant_name(name),
+        "directory": directory,
+    }
+    os.makedirs(STATE_DIR, exist_ok=True)
+    temporary_path = f"{INDEX_PATH}.{os.getpid()}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    os.replace(temporary_path, INDEX_PATH)
+
+
+def resolve_resource_ref(ref, kind="assistant"):
+    """Return the ID for ``ref``: an ID, name, directory or unique ID prefix.
+
+    References the index doesn't know are returned unchanged.
+    """
+    entries = load_index().get(kind, {})
+    if ref in entries:
+        return ref
+    lowered = ref.lower()
+    matches = [
+        resource_id
+        for resource_id, entry in entries.items()
+        if lowered in (entry["handle"], entry["name"].lower(), entry["directory"])
+    ]
+    if not matches:
+        matches = [
+            resource_id for resource_id in entries if resource_id.startswith(ref)
+        ]
+    if len(matches) > 1:
+        click.echo(
+            f"Error: '{ref}' matches several {kind}s: {', '.join(sorted(matches))}",
+            err=True,
+        )
+        raise SystemExit(1)
+    return matches[0] if matches else ref
+
+
+def complete_resource_ref(ctx, param, incomplete):
+    return [
+        CompletionItem(value, help=help_text)
+        for value, help_text in index_completions("assistant", incomplete)
+    ]
+
 
-            print(f"Assistant data saved to {filename}")
-            filenames.append(filename)
+def error_details(e):
+    response = getattr(e, "response", None)
+    return response.text if response is not None else "no response"
+
+
+# Fetching
+def fetch_resource(kind, resource_id, api_key, base_url=API_BASE_URL):
+    url = f"{base_url}{RESOURCE_TYPES[kind]['endpoint']}/{resource_id}"
+    return vapi_request("GET", url, api_key).json()
+
+
+def fetch_resources(tasks, api_key, base_url=API_BASE_URL, concurrency=8):
+    """Fetch ``(kind, id)`` pairs concurrently, returning ``(kind, data)`` in order."""
+
+    def fetch_one(task):
+        kind, resource_id = task
+        try:
+            return kind, fetch_resource(kind, resource_id, api_key, base_url)
         except requests.exceptions.RequestException as e:
-            print(f"Error fetching assistant: {e}\nResponse details: {e.response.text}")
+            print(
+                f"Error fetching {kind} {resource_id}: {e}\nResponse details: {error_details(e)}"
+            )
             raise SystemExit(1)
-    return filenames
+
+    if concurrency == 1 or len(tasks) < 2:
+        return [fetch_one(task) for task in tasks]
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        return list(executor.map(fetch_one, tasks))
+
+
+def save_fetched_resource(kind, data):
+    directory = resource_directory_name(kind, data)
+    filename = f"{directory}_fetched.json"
+    with open(filename, "w") as f:
+        json.dump(data, f, indent=2)
+    print(f"{resource_label(kind)} data saved to {filename}")
+    update_index(kind, data, directory)
+
+    version = record_history(data)
+    if version:
+        print(f"Saved version {version} of {data['id']} to local history")
+    return filename
+
+
+def fetch_resources_and_save(
+    kind, resource_ids, api_key, base_url=API_BASE_URL, concurrency=8
+):
+    tasks = [(kind, resource_id) for resource_id in resource_ids]
+    return [
+        save_fetched_resource(kind, data)
+        for kind, data in fetch_resources(tasks, api_key, base_url, concurrency)
+    ]
+
+
+def fetch_assistant_and_save(assistant_ids, api_key, base_url=API_BASE_URL):
+    return fetch_resources_and_save("assistant", assistant_ids, api_key, base_url)
 
 
 # Decomposition
 def extract_and_save(content, filename, directory):
+    if os.path.dirname(filename):
+        os.makedirs(os.path.join(directory, os.path.dirname(filename)), exist_ok=True)
     with open(os.path.join(directory, filename), "w", encoding="utf-8") as f:
         f.write(content or "")
     return f"file:///{filename}"
 
 
+def extract_json_and_save(content, filename, directory):
+    if os.path.dirname(filename):
+        os.makedirs(os.path.join(directory, os.path.dirname(filename)), exist_ok=True)
+    with open(os.path.join(directory, filename), "w", encoding="utf-8") as f:
+        json.dump(content, f, indent=2)
+    return f"file:///{filename}"
+
+
 def sanitize_assistant_name(name):
     return re.sub(r"[^\w\-]", "_", name.lower())
 
 
-def decompose_assistant(file_path, config_file):
+def decompose_data(kind, data, directory):
+    """Move the spec's fields of ``data`` into files under ``directory``, in place."""
+    seen = set()
+    written = set()
+
+    def extract(field, value, item):
+        seen.add(field["file"])
+        filename = field_filename(field, item)
+        if field["file"].endswith(".json"):
+            written.add(filename)
+            return extract_json_and_save(value, filename, directory)
+        if not isinstance(value, str):
+            return value
+        written.add(filename)
+        return extract_and_save(value, filename, directory)
+
+    walk_fields(compile_resource_spec(kind), data, extract)
+
+    for field in RESOURCE_TYPES[kind]["fields"]:
+        # Create empty placeholder files for fields the payload doesn't have
+        if field.get("always") and field["file"] not in seen:
+            if field["file"].endswith(".json"):
+                extract_json_and_save({}, field["file"], directory)
+            else:
+                extract_and_save(None, field["file"], directory)
+
+        # Remove files left over from list items that no longer exist
+        subdirectory = os.path.dirname(field["file"])
+        if "{" in field["file"] and os.path.isdir(
+            os.path.join(directory, subdirectory)
+        ):
+            extension = os.path.splitext(field["file"])[1]
+            for filename in os.listdir(os.path.join(directory, subdirectory)):
+                path = os.path.join(subdirectory, filename)
+                if filename.endswith(extension) and path not in written:
+                    os.remove(os.path.join(directory, path))
+    return data
+
+
+def decompose_resource(kind, file_path, config_file):
     with open(file_path, "r", encoding="utf-8") as f:
         data = json.load(f)
 
-    assistant_id = data["id"]
-    assistant_name = sanitize_assistant_name(data.get("name", assistant_id))
-    directory = f"{assistant_name}--{assistant_id[:8]}"
+    resource_id = data["id"]
+    directory = resource_directory_name(kind, data)
 
     # Update the configuration with the new mapping
     config = load_config(config_file, project_specific=True)
-    config["assistant_directories"][assistant_id] = directory
+    config.setdefault(RESOURCE_TYPES[kind]["directories_key"], {})[
+        resource_id
+    ] = directory
     update_config(config_file, config)
 
+    write_decomposed(kind, data, directory)
+
+    print(f"Extraction complete for {file_path}. Files saved in directory: {directory}")
+    return directory
+
+
+def write_decomposed(kind, data, directory):
+    """Write ``data`` to ``directory`` as metadata, field files and config."""
     if not os.path.exists(directory):
         os.makedirs(directory)
 
     # Extract metadata
-    metadata = {
-        key: data.pop(key)
-        for key in ["id", "orgId", "createdAt", "updatedAt", "isServerUrlSecretSet"]
-        if key in data
-    }
+    metadata = {key: data.pop(key) for key in READ_ONLY_KEYS if key in data}
 
     with open(os.path.join(directory, "metadata.json"), "w", encoding="utf-8") as f:
         json.dump(metadata, f, indent=2)
 
-    # Extract system prompt
-    system_message = next(
-        (msg for msg in data["model"]["messages"] if msg["role"] == "system"), None
-    )
-    data["model"]["messages"][0]["content"] = extract_and_save(
-        system_message["content"] if system_message else None,
-        "system_prompt.txt",
-        directory,
-    )
-
-    # Extract firstMessage
-    data["firstMessage"] = extract_and_save(
-        data.get("firstMessage"), "first_message.txt", directory
-    )
-
-    # Extract analysisPlan components
-    if "analysisPlan" in data:
-        analysis_plan = data["analysisPlan"]
-
-        analysis_plan["summaryPrompt"] = extract_and_save(
-            analysis_plan.get("summaryPrompt"), "summary_prompt.txt", directory
-        )
-
-        analysis_plan["structuredDataPrompt"] = extract_and_save(
-            analysis_plan.get("structuredDataPrompt"),
-            "structured_data_prompt.txt",
-            directory,
-        )
-
-        schema_path = os.path.join(directory, "structured_data_schema.json")
-        with open(schema_path, "w", encoding="utf-8") as f:
-            json.dump(analysis_plan.get("structuredDataSchema", {}), f, indent=2)
-        analysis_plan["structuredDataSchema"] = "file:///structured_data_schema.json"
-
-        analysis_plan["successEvaluationPrompt"] = extract_and_save(
-            analysis_plan.get("successEvaluationPrompt"),
-            "success_evaluation_prompt.txt",
-            directory,
-        )
-    else:
-        # Create empty placeholder files if analysisPlan doesn't exist
-        for filename in [
-            "summary_prompt.txt",
-            "structured_data_prompt.txt",
-            "success_evaluation_prompt.txt",
-        ]:
-            extract_and_save(None, filename, directory)
-        with open(
-            os.path.join(directory, "structured_data_schema.json"),
-            "w",
-            encoding="utf-8",
-        ) as f:
-            json.dump({}, f)
+    decompose_data(kind, data, directory)
 
     # Save the modified JSON
-    with open(
-        os.path.join(directory, "assistant_config.json"), "w", encoding="utf-8"
-    ) as f:
+    config_path = os.path.join(directory, RESOURCE_TYPES[kind]["config_file"])
+    with open(config_path, "w", encoding="utf-8") as f:
         json.dump(data, f, indent=2)
 
-    print(f"Extraction complete for {file_path}. Files saved in directory: {directory}")
+
+def decompose_assistant(file_path, config_file):
+    return decompose_resource("assistant", file_path, config_file)
 
 
 # Recomposition
@@ -214,311 +1203,3530 @@ def read_file_if_exists(file_path):
     return ""
 
 
-def recompose_assistant(directory):
-    config_path = os.path.join(directory, "assistant_config.json")
-    metadata_path = os.path.join(directory, "metadata.json")
+# Templates
+# Prompt files may pull in shared fragments with <<include path>> (relative to
+# the including file) and substitute per-assistant values from the directory's
+# variables.json with <<name>>. Undefined variables are left untouched, and the
+# syntax does not collide with Vapi's own {{liquid}} variables.
+TEMPLATE_TAG = re.compile(
+    r"<<\s*(?:include\s+(?P<include>[^\s>]+)|(?P<var>[A-Za-z_]\w*))\s*>>"
+)
+TEMPLATE_VARIABLES_FILE = "variables.json"
 
-    if not os.path.exists(config_path):
-        raise FileNotFoundError(f"assistant_config.json not found in {directory}")
+# Parsed templates keyed by real path: (stat signature, nodes). Each template is
+# parsed once per run no matter how many assistants include it.
+_template_cache = {}
+# Rendered output keyed by (real path, variables), validated against the stat
+# signatures of every file it was built from.
+_render_cache = {}
 
-    with open(config_path, "r", encoding="utf-8") as f:
-        data = json.load(f)
 
-    # Reincorporate metadata
-    if os.path.exists(metadata_path):
-        with open(metadata_path, "r", encoding="utf-8") as f:
-            metadata = json.load(f)
-        data.update(metadata)
+def file_signature(path):
+    stat = os.stat(path)
+    return (stat.st_mtime_ns, stat.st_size)
 
-    # Recompose system prompt
-    system_message = next(
-        (msg for msg in data["model"]["messages"] if msg["role"] == "system"), None
-    )
-    if system_message:
-        content = read_file_if_exists(
-            resolve_file_path(system_message["content"], directory)
-        )
-        system_message["content"] = content
 
-    # Recompose firstMessage
-    first_message_content = read_file_if_exists(
-        resolve_file_path("file:///first_message.txt", directory)
+def parse_template(path):
+    path = os.path.realpath(path)
+    signature = file_signature(path)
+    cached = _template_cache.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+
+    text = read_file(path)
+    base_directory = os.path.dirname(path)
+    nodes = []
+    position = 0
+    for match in TEMPLATE_TAG.finditer(text):
+        if match.start() > position:
+            nodes.append(("text", text[position : match.start()]))
+        if match.group("include"):
+            include = os.path.join(base_directory, match.group("include"))
+            nodes.append(("include", os.path.realpath(include)))
+        else:
+            nodes.append(("var", match.group("var"), match.group(0)))
+        position = match.end()
+    if position < len(text):
+        nodes.append(("text", text[position:]))
+
+    _template_cache[path] = (signature, nodes)
+    return nodes
+
+
+class RecomposeError(ValueError):
+    """A decomposed resource can't be rebuilt from its files."""
+
+
+def report_recompose_errors(command):
+    """Report a RecomposeError raised by ``command`` as an error, not a traceback."""
+
+    @functools.wraps(command)
+    def wrapper(*args, **kwargs):
+        try:
+            return command(*args, **kwargs)
+        except RecomposeError as e:
+            click.echo(f"Error: {e}", err=True)
+            raise SystemExit(1)
+
+    return wrapper
+
+
+def template_dependencies(path, _stack=()):
+    """Return the real paths of every fragment ``path`` includes, transitively."""
+    path = os.path.realpath(path)
+    if path in _stack:
+        cycle = " -> ".join(_stack[_stack.index(path) :] + (path,))
+        raise RecomposeError(f"Include cycle detected: {cycle}")
+    dependencies = set()
+    for node in parse_template(path):
+        if node[0] == "include":
+            if not os.path.exists(node[1]):
+                raise RecomposeError(f"Included file not found: {node[1]}")
+            dependencies.add(node[1])
+            dependencies |= template_dependencies(node[1], _stack + (path,))
+    return dependencies
+
+
+def render_template(path, variables, _stack=()):
+    path = os.path.realpath(path)
+    if path in _stack:
+        cycle = " -> ".join(_stack[_stack.index(path) :] + (path,))
+        raise RecomposeError(f"Include cycle detected: {cycle}")
+
+    key = (path, json.dumps(variables, sort_keys=True))
+    cached = _render_cache.get(key)
+    if cached and all(
+        os.path.exists(p) and file_signature(p) == sig for p, sig in cached[0]
+    ):
+        return cached[1]
+
+    sources = [(path, file_signature(path))]
+    parts = []
+    for node in parse_template(path):
+        if node[0] == "text":
+            parts.append(node[1])
+        elif node[0] == "include":
+            if not os.path.exists(node[1]):
+                raise RecomposeError(f"Included file not found: {node[1]}")
+            parts.append(render_template(node[1], variables, _stack + (path,)))
+            sources.extend(_render_cache[(node[1], key[1])][0])
+        elif node[1] in variables:
+            parts.append(str(variables[node[1]]))
+        else:
+            parts.append(node[2])
+
+    rendered = "".join(parts)
+    _render_cache[key] = (sources, rendered)
+    return rendered
+
+
+def load_template_variables(directory):
+    variables_path = os.path.join(directory, TEMPLATE_VARIABLES_FILE)
+    if not os.path.exists(variables_path):
+        return {}
+    with open(variables_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def render_prompt_file(file_path, variables):
+    if os.path.exists(file_path):
+        return render_template(file_path, variables)
+    return ""
+
+
+def load_field_file(field, path, variables):
+    if field["file"].endswith(".json"):
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    return render_prompt_file(path, variables)
+
+
+def recompose_data(kind, directory):
+    """Rebuild the API payload of the resource decomposed into ``directory``."""
+    spec = RESOURCE_TYPES[kind]
+    config_path = os.path.join(directory, spec["config_file"])
+    metadata_path = os.path.join(directory, "metadata.json")
+
+    if not os.path.exists(config_path):
+        raise RecomposeError(f"{spec['config_file']} not found in {directory}")
+
+    with open(config_path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+
+    # Reincorporate metadata
+    if os.path.exists(metadata_path):
+        with open(metadata_path, "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        data.update(metadata)
+
+    variables = load_template_variables(directory)
+    seen = set()
+
+    def load(field, value, item):
+        seen.add(field["file"])
+        if not (isinstance(value, str) and value.startswith("file:///")):
+            return value
+        content = load_field_file(field, resolve_file_path(value, directory), variables)
+        return content or field.get("empty", content)
+
+    walk_fields(compile_resource_spec(kind), data, load)
+
+    # Placeholders only make it into the payload once they have content
+    for field in spec["fields"]:
+        if field.get("always") and field["file"] not in seen:
+            path = os.path.join(directory, field["file"])
+            content = load_field_file(field, path, variables)
+            if content:
+                set_field_path(data, parse_resource_path(field["path"]), content)
+    return data
+
+
+def recompose_resource(kind, directory):
+    data = recompose_data(kind, directory)
+
+    # Save the recomposed JSON
+    directory_name = os.path.basename(os.path.normpath(directory))
+    output_filename = f"{directory_name}_recomposed.json"
+
+    with open(output_filename, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2)
+
+    print(f"Recomposition complete for {directory}. Output saved as: {output_filename}")
+    return output_filename
+
+
+def recompose_assistant(directory):
+    return recompose_resource("assistant", directory)
+
+
+# Change tracking
+BUILD_STATE_PATH = os.path.join(STATE_DIR, "build_state.json")
+
+# sha256 digests keyed by path, reused while the file's stat signature holds
+_hash_cache = {}
+
+
+def hash_file(path):
+    signature = file_signature(path)
+    cached = _hash_cache.get(path)
+    if cached and cached[0] == signature:
+        return cached[1]
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()
+    _hash_cache[path] = (signature, digest)
+    return digest
+
+
+def collect_inputs(directory):
+    """Hash every file an assistant is recomposed from.
+
+    This covers the files in its directory plus every fragment its prompt
+    templates include, so editing a shared fragment changes the inputs of
+    exactly the assistants that depend on it.
+    """
+    paths = set()
+    for root, _, files in os.walk(directory):
+        for filename in files:
+            path = os.path.join(root, filename)
+            paths.add(os.path.normpath(path))
+            if filename.endswith(".txt"):
+                paths.update(os.path.relpath(p) for p in template_dependencies(path))
+    return {path: hash_file(path) for path in sorted(paths)}
+
+
+def load_build_state():
+    if not os.path.exists(BUILD_STATE_PATH):
+        return {}
+    with open(BUILD_STATE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def mark_clean(directories):
+    directories = [d for d in directories if os.path.exists(d)]
+    if not directories:
+        return
+    state = load_build_state()
+    for directory in directories:
+        state[os.path.normpath(directory)] = collect_inputs(directory)
+    os.makedirs(STATE_DIR, exist_ok=True)
+    with open(BUILD_STATE_PATH, "w", encoding="utf-8") as f:
+        json.dump(state, f, indent=2)
+
+
+def get_dirty_directories(directories):
+    state = load_build_state()
+    return [
+        directory
+        for directory in directories
+        if state.get(os.path.normpath(directory)) != collect_inputs(directory)
+    ]
+
+
+# Updating
+def load_assistant_data(filename):
+    try:
+        with open(filename, "r") as f:
+            data = json.load(f)
+            assistant_id = data.get("id")
+            if not assistant_id:
+                print(f"Error: No 'id' field found in {filename}")
+                return None, None
+            return assistant_id, data
+    except FileNotFoundError:
+        print(f"File {filename} not found. Skipping this file.")
+        return None, None
+    except json.JSONDecodeError:
+        print(f"Error decoding JSON from {filename}. Skipping this file.")
+        return None, None
+
+
+def body_kwargs(data, stream, compress):
+    if stream:
+        return {"stream_json": data, "compress": compress}
+    return {"json": data}
+
+
+def is_large_payload(json_file, stream_threshold):
+    return (
+        stream_threshold is not None
+        and os.path.exists(json_file)
+        and os.path.getsize(json_file) >= stream_threshold
+    )
+
+
+def update_resource(
+    kind,
+    resource_id,
+    data,
+    api_key,
+    base_url=API_BASE_URL,
+    stream=False,
+    compress=False,
+):
+    url = f"{base_url}{RESOURCE_TYPES[kind]['endpoint']}/{resource_id}"
+    try:
+        response = vapi_request(
+            "PATCH", url, api_key, **body_kwargs(data, stream, compress)
+        )
+        print(f"{resource_label(kind)} {resource_id} updated successfully")
+        return response.json()
+    except requests.exceptions.RequestException as e:
+        print(
+            f"Error updating {kind} {resource_id}: {e}\nResponse details: {error_details(e)}"
+        )
+        raise SystemExit(1)
+
+
+def update_assistant(assistant_id, assistant_data, api_key, base_url=API_BASE_URL):
+    return update_resource("assistant", assistant_id, assistant_data, api_key, base_url)
+
+
+def update_resources_from_files(
+    files,
+    api_key,
+    concurrency=1,
+    base_url=API_BASE_URL,
+    stream_threshold=None,
+    compress=False,
+):
+    """Update ``(kind, json_file)`` pairs, ``concurrency`` requests at a time.
+
+    Files of at least ``stream_threshold`` bytes are sent as streamed bodies,
+    gzip-compressed if ``compress`` is set.
+    """
+
+    def update_file(task):
+        # Each payload is loaded by its own request, so only the payloads of
+        # requests in flight are held in memory
+        kind, json_file = task
+        resource_id, data = load_assistant_data(json_file)
+        if not (resource_id and data):
+            return
+        # Remove properties that should not be included in the update
+        for key in READ_ONLY_KEYS:
+            data.pop(key, None)
+        stream = is_large_payload(json_file, stream_threshold)
+        update_resource(kind, resource_id, data, api_key, base_url, stream, compress)
+
+    if concurrency == 1:
+        for task in files:
+            update_file(task)
+        return
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(update_file, task) for task in files]
+        for future in futures:
+            future.result()
+
+
+def update_assistants_from_files(
+    json_files,
+    api_key,
+    concurrency=1,
+    base_url=API_BASE_URL,
+    stream_threshold=None,
+    compress=False,
+):
+    files = [("assistant", json_file) for json_file in json_files]
+    update_resources_from_files(
+        files, api_key, concurrency, base_url, stream_threshold, compress
+    )
+
+
+# Validation
+API_SCHEMA_URL = "https://api.vapi.ai/api-json"
+SCHEMA_CACHE_PATH = os.path.expanduser("~/.vapi_vct/openapi.json")
+BUNDLED_SCHEMA_PATH = os.path.join(
+    os.path.dirname(os.path.realpath(__file__)), "vapi_openapi.json"
+)
+JSON_TYPES = {
+    "object": dict,
+    "array": list,
+    "string": str,
+    "number": (int, float),
+    "integer": int,
+    "boolean": bool,
+}
+
+# Compiled validators, keyed by schema component name. Compiling walks the
+# whole schema once; every assistant validated afterwards reuses the result.
+_validators = {}
+
+
+def load_api_schema():
+    path = (
+        SCHEMA_CACHE_PATH if os.path.exists(SCHEMA_CACHE_PATH) else BUNDLED_SCHEMA_PATH
+    )
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def refresh_api_schema():
+    try:
+        response = _transport.request("GET", API_SCHEMA_URL)
+        response.raise_for_status()
+        schema = response.json()
+    except requests.exceptions.RequestException as e:
+        click.echo(f"Error downloading API schema: {e}", err=True)
+        raise SystemExit(1)
+
+    os.makedirs(os.path.dirname(SCHEMA_CACHE_PATH), exist_ok=True)
+    with open(SCHEMA_CACHE_PATH, "w", encoding="utf-8") as f:
+        json.dump(schema, f)
+    _validators.clear()
+    click.echo(f"API schema saved to {SCHEMA_CACHE_PATH}")
+
+
+def resolve_schema_ref(root, ref):
+    node = root
+    for part in ref.lstrip("#/").split("/"):
+        node = node[part]
+    return node
+
+
+def compile_schema(schema, root, compiled=None):
+    """Compile an OpenAPI schema node into a checker.
+
+    The checker is called as ``checker(value, path)`` and returns a list of
+    error strings. Each ``$ref`` target is compiled only once and shared,
+    which also keeps recursive schemas from looping.
+    """
+    if compiled is None:
+        compiled = {}
+
+    if "$ref" in schema:
+        ref = schema["$ref"]
+        if ref not in compiled:
+            target = []
+            compiled[ref] = lambda value, path: target[0](value, path)
+            target.append(compile_schema(resolve_schema_ref(root, ref), root, compiled))
+        return compiled[ref]
+
+    checks = []
+    nullable = schema.get("nullable", False)
+
+    if "type" in schema and schema["type"] in JSON_TYPES:
+        expected = schema["type"]
+        python_type = JSON_TYPES[expected]
+
+        def check_type(value, path):
+            if isinstance(value, bool) and expected != "boolean":
+                return [f"{path}: expected {expected}, got boolean"]
+            if not isinstance(value, python_type):
+                return [f"{path}: expected {expected}, got {type(value).__name__}"]
+            return []
+
+        checks.append(check_type)
+
+    if "enum" in schema:
+        allowed = schema["enum"]
+        checks.append(
+            lambda value, path: (
+                []
+                if value in allowed
+                else [f"{path}: {value!r} is not one of {allowed}"]
+            )
+        )
+
+    for keyword, compare, message in [
+        ("minLength", lambda v, n: len(v) >= n, "shorter than"),
+        ("maxLength", lambda v, n: len(v) <= n, "longer than"),
+    ]:
+        if keyword in schema:
+
+            def check_length(
+                value, path, n=schema[keyword], compare=compare, message=message
+            ):
+                if isinstance(value, str) and not compare(value, n):
+                    return [f"{path}: string is {message} {n} characters"]
+                return []
+
+            checks.append(check_length)
+
+    for keyword, compare, message in [
+        ("minimum", lambda v, n: v >= n, "less than"),
+        ("maximum", lambda v, n: v <= n, "greater than"),
+    ]:
+        if keyword in schema:
+
+            def check_bound(
+                value, path, n=schema[keyword], compare=compare, message=message
+            ):
+                if (
+                    isinstance(value, (int, float))
+                    and not isinstance(value, bool)
+                    and not compare(value, n)
+                ):
+                    return [f"{path}: {value} is {message} {n}"]
+                return []
+
+            checks.append(check_bound)
+
+    if (
+        "required" in schema
+        or "properties" in schema
+        or "additionalProperties" in schema
+    ):
+        required = schema.get("required", [])
+        properties = {
+            key: compile_schema(subschema, root, compiled)
+            for key, subschema in schema.get("properties", {}).items()
+        }
+        additional = schema.get("additionalProperties", True)
+        if isinstance(additional, dict):
+            additional = compile_schema(additional, root, compiled)
+
+        def check_object(value, path):
+            if not isinstance(value, dict):
+                return []
+            errors = [
+                f"{path}: missing required property '{key}'"
+                for key in required
+                if key not in value
+            ]
+            for key, item in value.items():
+                item_path = f"{path}.{key}" if path else key
+                if key in properties:
+                    errors.extend(properties[key](item, item_path))
+                elif additional is False:
+                    errors.append(f"{item_path}: property is not allowed")
+                elif callable(additional):
+                    errors.extend(additional(item, item_path))
+            return errors
+
+        checks.append(check_object)
+
+    if "items" in schema:
+        item_checker = compile_schema(schema["items"], root, compiled)
+
+        def check_items(value, path):
+            if not isinstance(value, list):
+                return []
+            errors = []
+            for index, item in enumerate(value):
+                errors.extend(item_checker(item, f"{path}[{index}]"))
+            return errors
+
+        checks.append(check_items)
+
+    for subschema in schema.get("allOf", []):
+        checks.append(compile_schema(subschema, root, compiled))
+
+    # oneOf is treated like anyOf: Vapi's unions overlap, so requiring exactly
+    # one match would reject valid payloads.
+    alternatives = schema.get("anyOf", []) + schema.get("oneOf", [])
+    if alternatives:
+        alternative_checkers = [compile_schema(s, root, compiled) for s in alternatives]
+
+        def check_alternatives(value, path):
+            results = [checker(value, path) for checker in alternative_checkers]
+            if any(not errors for errors in results):
+                return []
+            return min(results, key=len)
+
+        checks.append(check_alternatives)
+
+    def checker(value, path):
+        if value is None and nullable:
+            return []
+        errors = []
+        for check in checks:
+            errors.extend(check(value, path))
+        return errors
+
+    return checker
+
+
+def get_validator(operation, kind="assistant"):
+    components_by_operation = RESOURCE_TYPES[kind].get("schema")
+    if not components_by_operation:
+        # No bundled schema for this resource type: nothing to check
+        return lambda data, path: []
+    component = components_by_operation[operation]
+    if component not in _validators:
+        schema = load_api_schema()
+        components = schema.get("components", {}).get("schemas", {})
+        if component not in components:
+            raise ValueError(f"Schema component '{component}' not found in API schema")
+        _validators[component] = compile_schema(components[component], schema)
+    return _validators[component]
+
+
+def validate_assistant_data(assistant_data, operation, kind="assistant"):
+    payload = {k: v for k, v in assistant_data.items() if k not in READ_ONLY_KEYS}
+    return get_validator(operation, kind)(payload, "")
+
+
+def report_validation_errors(source, errors):
+    if errors:
+        click.echo(f"Validation failed for {source}:", err=True)
+        for error in errors:
+            click.echo(f"  - {error}", err=True)
+    return not errors
+
+
+def validate_recomposed_files(json_files, operation, kind="assistant"):
+    all_valid = True
+    for json_file in json_files:
+        try:
+            with open(json_file, "r", encoding="utf-8") as f:
+                assistant_data = json.load(f)
+        except FileNotFoundError:
+            # Missing files are reported and skipped by the update itself
+            continue
+        except json.JSONDecodeError as e:
+            all_valid = (
+                report_validation_errors(json_file, [f"invalid JSON: {e}"])
+                and all_valid
+            )
+            continue
+
+        errors = validate_assistant_data(assistant_data, operation, kind)
+        all_valid = report_validation_errors(json_file, errors) and all_valid
+    return all_valid
+
+
+# Statistics
+STATS_CACHE_PATH = os.path.join(STATE_DIR, "stats_cache.json")
+PROMPT_FILES = [
+    "system_prompt.txt",
+    "first_message.txt",
+    "summary_prompt.txt",
+    "structured_data_prompt.txt",
+    "success_evaluation_prompt.txt",
+]
+TOKEN_PATTERN = re.compile(r"\w+|[^\w\s]")
+
+
+def estimate_tokens(text):
+    """Approximate a BPE token count without loading a tokenizer.
+
+    Each word counts as one token per four characters (rounded up) and each
+    punctuation mark as one token, which is close enough to GPT-style
+    tokenizers to compare prompts.
+    """
+    return sum(
+        (len(piece) + 3) // 4 if piece[0].isalnum() or piece[0] == "_" else 1
+        for piece in TOKEN_PATTERN.findall(text)
+    )
+
+
+def load_tokenizer(spec):
+    """Return a ``text -> token count`` function for ``module:callable``.
+
+    The callable may return either a count or the tokens themselves.
+    """
+    if not spec:
+        return estimate_tokens
+
+    module_name, _, attribute = spec.partition(":")
+    try:
+        tokenizer = getattr(importlib.import_module(module_name), attribute)
+    except (ImportError, AttributeError, ValueError) as e:
+        click.echo(f"Error: Could not load tokenizer '{spec}': {e}", err=True)
+        raise SystemExit(1)
+
+    def count_tokens(text):
+        tokens = tokenizer(text)
+        return tokens if isinstance(tokens, int) else len(tokens)
+
+    return count_tokens
+
+
+def load_stats_cache():
+    if not os.path.exists(STATS_CACHE_PATH):
+        return {"files": {}, "snapshot": {}}
+    with open(STATS_CACHE_PATH, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_stats_cache(cache):
+    os.makedirs(STATE_DIR, exist_ok=True)
+    with open(STATS_CACHE_PATH, "w", encoding="utf-8") as f:
+        json.dump(cache, f, indent=2)
+
+
+def collect_prompt_stats(directories, tokenizer_spec=None):
+    """Measure every prompt file in ``directories``.
+
+    Prompts are measured after template expansion, since that is what is
+    sent to the model. Token counts are cached by content hash and tokenizer,
+    so only prompts that changed since the last run are re-tokenised.
+    Entries for prompts that no longer exist are dropped from the cache.
+    """
+    count_tokens = load_tokenizer(tokenizer_spec)
+    tokenizer_name = tokenizer_spec or "builtin"
+    cache = load_stats_cache()
+    for key in ["files", "snapshot"]:
+        cache[key] = {
+            path: entry
+            for path, entry in cache.get(key, {}).items()
+            if os.path.exists(path)
+        }
+    cached_files = cache["files"]
+    snapshot = cache["snapshot"]
+
+    rows = []
+    for directory in directories:
+        variables = load_template_variables(directory)
+        for filename in PROMPT_FILES:
+            path = os.path.join(directory, filename)
+            if not os.path.exists(path):
+                continue
+            text = render_template(path, variables)
+            digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+            entry = cached_files.get(path)
+            if (
+                not entry
+                or entry["sha256"] != digest
+                or entry["tokenizer"] != tokenizer_name
+            ):
+                entry = {
+                    "sha256": digest,
+                    "tokenizer": tokenizer_name,
+                    "chars": len(text),
+                    "tokens": count_tokens(text),
+                }
+                cached_files[path] = entry
+            previous = snapshot.get(path)
+            rows.append(
+                {
+                    "directory": directory,
+                    "file": filename,
+                    "path": path,
+                    "chars": entry["chars"],
+                    "tokens": entry["tokens"],
+                    "delta": entry["tokens"] - previous["tokens"] if previous else None,
+                }
+            )
+
+    return rows, cache
+
+
+def flag_outliers(rows, threshold):
+    """Mark prompts far above the fleet average for the same prompt file."""
+    for filename in PROMPT_FILES:
+        tokens = [row["tokens"] for row in rows if row["file"] == filename]
+        if len(tokens) < 3:
+            continue
+        mean = statistics.mean(tokens)
+        stdev = statistics.pstdev(tokens)
+        for row in rows:
+            if row["file"] == filename and stdev:
+                row["outlier"] = (row["tokens"] - mean) / stdev > threshold
+    return rows
+
+
+# History
+# Every fetched version of an assistant is kept under .vapi_vct/history as an
+# append-only data file plus a JSON index. Versions are stored as
+# zlib-compressed deltas against the previous version, with a full copy every
+# HISTORY_KEYFRAME_INTERVAL versions to bound the cost of reconstruction.
+# The latest version is also kept in full, so recording a new version never
+# has to replay the delta chain.
+HISTORY_DIR = os.path.join(STATE_DIR, "history")
+HISTORY_KEYFRAME_INTERVAL = 64
+# Split canonical JSON after newlines and after escaped "\n" inside strings,
+# so an edit to one line of a long prompt only changes one chunk.
+HISTORY_CHUNK = re.compile(r".*?(?:\n|\\n)|.+", re.DOTALL)
+
+
+def canonical_json(data):
+    return json.dumps(data, indent=2, sort_keys=True, ensure_ascii=False)
+
+
+def split_chunks(text):
+    return HISTORY_CHUNK.findall(text)
+
+
+def encode_delta(base_chunks, chunks):
+    """Encode ``chunks`` as copy ranges from ``base_chunks`` and inserted text.
+
+    Versions usually differ in a few lines, so the unchanged head and tail are
+    copied as they are and only the part between them is diffed.
+    """
+    limit = min(len(base_chunks), len(chunks))
+    head = 0
+    while head < limit and base_chunks[head] == chunks[head]:
+        head += 1
+    tail = 0
+    while (
+        tail < limit - head
+        and base_chunks[len(base_chunks) - 1 - tail] == chunks[len(chunks) - 1 - tail]
+    ):
+        tail += 1
+
+    operations = [[0, head]] if head else []
+    matcher = difflib.SequenceMatcher(
+        None,
+        base_chunks[head : len(base_chunks) - tail],
+        chunks[head : len(chunks) - tail],
+        autojunk=False,
+    )
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            operations.append([head + i1, head + i2])
+        elif j2 > j1:
+            operations.append("".join(chunks[head + j1 : head + j2]))
+    if tail:
+        operations.append([len(base_chunks) - tail, len(base_chunks)])
+    return operations
+
+
+def apply_delta(base_chunks, operations):
+    chunks = []
+    for operation in operations:
+        if isinstance(operation, list):
+            chunks.extend(base_chunks[operation[0] : operation[1]])
+        else:
+            chunks.extend(split_chunks(operation))
+    return chunks
+
+
+def history_paths(assistant_id):
+    base = os.path.join(HISTORY_DIR, assistant_id)
+    return f"{base}.idx", f"{base}.dat"
+
+
+def latest_history_path(assistant_id):
+    return os.path.join(HISTORY_DIR, f"{assistant_id}.latest")
+
+
+def read_latest_history_text(assistant_id, index):
+    """Return the text of the latest version, from its full copy when that
+    is current, or else by replaying the history."""
+    try:
+        with open(latest_history_path(assistant_id), "rb") as f:
+            text = zlib.decompress(f.read()).decode("utf-8")
+        if hashlib.sha256(text.encode("utf-8")).hexdigest() == index[-1]["sha256"]:
+            return text
+    except (OSError, zlib.error, UnicodeDecodeError):
+        pass
+    return read_history_text(assistant_id, index, len(index))
+
+
+def load_history_index(assistant_id):
+    index_path, _ = history_paths(assistant_id)
+    if not os.path.exists(index_path):
+        return []
+    with open(index_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def iter_history_texts(assistant_id, index, first=1, last=None):
+    """Yield ``(entry, text)`` for versions ``first``..``last`` (1-based), in
+    order, replaying each delta only once."""
+    _, data_path = history_paths(assistant_id)
+    last = last or len(index)
+    # The first version is always a keyframe
+    keyframe = max(i for i in range(first) if index[i]["type"] == "full")
+
+    chunks = None
+    with open(data_path, "rb") as f:
+        for entry in index[keyframe:last]:
+            f.seek(entry["offset"])
+            payload = zlib.decompress(f.read(entry["length"])).decode("utf-8")
+            if entry["type"] == "full":
+                chunks = split_chunks(payload)
+            else:
+                chunks = apply_delta(chunks, json.loads(payload))
+            if entry["version"] >= first:
+                yield entry, "".join(chunks)
+
+
+def read_history_text(assistant_id, index, version):
+    """Rebuild the canonical JSON text of ``version`` (1-based)."""
+    for _, text in iter_history_texts(assistant_id, index, version, version):
+        return text
+
+
+def record_history(assistant_data):
+    """Store ``assistant_data`` as a new version unless it is unchanged.
+
+    Returns the new version number, or None if the latest stored version is
+    identical.
+    """
+    assistant_id = assistant_data["id"]
+    text = canonical_json(assistant_data)
+    digest = hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    index = load_history_index(assistant_id)
+    if index and index[-1]["sha256"] == digest:
+        return None
+
+    version = len(index) + 1
+    if (version - 1) % HISTORY_KEYFRAME_INTERVAL == 0:
+        entry_type, payload = "full", text
+    else:
+        base_chunks = split_chunks(read_latest_history_text(assistant_id, index))
+        delta = encode_delta(base_chunks, split_chunks(text))
+        entry_type, payload = "delta", json.dumps(delta, separators=(",", ":"))
+    blob = zlib.compress(payload.encode("utf-8"), 9)
+
+    os.makedirs(HISTORY_DIR, exist_ok=True)
+    index_path, data_path = history_paths(assistant_id)
+    with open(data_path, "ab") as f:
+        offset = f.tell()
+        f.write(blob)
+
+    index.append(
+        {
+            "version": version,
+            "updatedAt": assistant_data.get("updatedAt"),
+            "sha256": digest,
+            "type": entry_type,
+            "offset": offset,
+            "length": len(blob),
+        }
+    )
+    with open(index_path, "w", encoding="utf-8") as f:
+        json.dump(index, f, indent=2)
+    with open(latest_history_path(assistant_id), "wb") as f:
+        f.write(zlib.compress(text.encode("utf-8"), 1))
+    return version
+
+
+def select_history_version(index, version=None, at=None):
+    """Pick a version by number, by the latest ``updatedAt`` at or before
+    ``at``, or the latest version if neither is given."""
+    if not index:
+        return None
+    if version is not None:
+        return version if 1 <= version <= len(index) else None
+    if at is not None:
+        candidates = [
+            entry["version"]
+            for entry in index
+            if entry["updatedAt"] and entry["updatedAt"] <= at
+        ]
+        return candidates[-1] if candidates else None
+    return len(index)
+
+
+def load_history_version(assistant_id, version=None, at=None):
+    index = load_history_index(assistant_id)
+    if not index:
+        click.echo(f"Error: No local history for assistant {assistant_id}.", err=True)
+        raise SystemExit(1)
+    selected = select_history_version(index, version, at)
+    if selected is None:
+        click.echo(
+            f"Error: No matching version in the history of {assistant_id}.", err=True
+        )
+        raise SystemExit(1)
+    return selected, json.loads(read_history_text(assistant_id, index, selected))
+
+
+# Archives
+# A project archive is a single file laid out as
+#
+#   magic | member | member | ... | index (JSON) | index offset (8 bytes) | magic
+#
+# Each member is the zlib-compressed concatenation of one assistant's files
+# (shared template fragments form one more member). The index at the end
+# records where every member starts and how to split it back into files, so
+# one assistant can be extracted by mapping the file and reading just its
+# member, and a full import is a single front-to-back pass.
+ARCHIVE_MAGIC = b"VCTARC1\n"
+ARCHIVE_TRAILER = struct.Struct("<Q8s")
+
+
+def pack_member(out, paths, base_directory):
+    files = []
+    contents = []
+    for path in paths:
+        with open(path, "rb") as f:
+            content = f.read()
+        files.append([os.path.relpath(path, base_directory), len(content)])
+        contents.append(content)
+    blob = zlib.compress(b"".join(contents), 9)
+    offset = out.tell()
+    out.write(blob)
+    return {"offset": offset, "length": len(blob), "files": files}
+
+
+def contained_path(base_directory, relative_path):
+    """Join ``relative_path`` to ``base_directory``, or None if it would escape it."""
+    if os.path.isabs(relative_path):
+        return None
+    path = os.path.join(base_directory, relative_path)
+    base = os.path.realpath(base_directory)
+    if os.path.commonpath([base, os.path.realpath(path)]) != base:
+        return None
+    return path
+
+
+def unsafe_archive_paths(members):
+    """The directories and files of ``(member, target directory)`` pairs that
+    would be written outside the project."""
+    unsafe = []
+    for member, target_directory in members:
+        if contained_path(".", target_directory) is None:
+            unsafe.append(target_directory)
+            continue
+        unsafe.extend(
+            relative_path
+            for relative_path, _ in member["files"]
+            if contained_path(target_directory, relative_path) is None
+        )
+    return unsafe
+
+
+def unpack_member(buffer, member, target_directory, overwrite=True):
+    content = zlib.decompress(
+        buffer[member["offset"] : member["offset"] + member["length"]]
+    )
+    position = 0
+    for relative_path, size in member["files"]:
+        path = contained_path(target_directory, relative_path)
+        if path is None:
+            raise ValueError(
+                f"Archive path escapes {target_directory}: {relative_path}"
+            )
+        if overwrite or not os.path.exists(path):
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            with open(path, "wb") as f:
+                f.write(content[position : position + size])
+        position += size
+
+
+def write_archive(archive_path, config, directories):
+    """Pack ``directories`` (assistant ID -> directory) into one archive."""
+    index = {
+        "config": {
+            "assistant_ids": config.get("assistant_ids", []),
+            "assistant_directories": directories,
+        },
+        "assistants": {},
+    }
+    shared = set()
+
+    temporary_path = f"{archive_path}.tmp"
+    with open(temporary_path, "wb") as out:
+        out.write(ARCHIVE_MAGIC)
+        for assistant_id, directory in directories.items():
+            paths = sorted(collect_inputs(directory))
+            own = [
+                p for p in paths if not os.path.relpath(p, directory).startswith("..")
+            ]
+            shared.update(p for p in paths if p not in own)
+            member = pack_member(out, own, directory)
+            member["directory"] = directory
+            index["assistants"][assistant_id] = member
+
+        outside = sorted(p for p in shared if p.startswith(".."))
+        for path in outside:
+            click.echo(
+                f"Warning: Skipping {path} as it is outside the project directory",
+                err=True,
+            )
+        index["shared"] = pack_member(
+            out, sorted(p for p in shared if p not in outside), "."
+        )
+
+        index_offset = out.tell()
+        out.write(json.dumps(index).encode("utf-8"))
+        out.write(ARCHIVE_TRAILER.pack(index_offset, ARCHIVE_MAGIC))
+    os.replace(temporary_path, archive_path)
+    return index
+
+
+def open_archive(archive_path):
+    """Map an archive into memory and return ``(mapping, index)``.
+
+    The trailer, index and member bounds are checked before any offset is
+    trusted, so an empty, truncated or foreign file is reported cleanly.
+    """
+    not_an_archive = click.ClickException(f"{archive_path} is not a vapi_vct archive")
+    with open(archive_path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if size < len(ARCHIVE_MAGIC) + ARCHIVE_TRAILER.size:
+            raise not_an_archive
+        mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    index_offset, trailer_magic = ARCHIVE_TRAILER.unpack(
+        mapping[-ARCHIVE_TRAILER.size :]
+    )
+    try:
+        if (
+            mapping[: len(ARCHIVE_MAGIC)] != ARCHIVE_MAGIC
+            or trailer_magic != ARCHIVE_MAGIC
+            or not len(ARCHIVE_MAGIC) <= index_offset <= size - ARCHIVE_TRAILER.size
+        ):
+            raise ValueError("bad header or trailer")
+        index = json.loads(mapping[index_offset : -ARCHIVE_TRAILER.size])
+        for member in [*index["assistants"].values(), index["shared"]]:
+            if not (
+                0 <= member["offset"]
+                and 0 <= member["length"]
+                and member["offset"] + member["length"] <= index_offset
+            ):
+                raise ValueError("member outside the archive")
+    except (KeyError, TypeError, AttributeError, ValueError):
+        mapping.close()
+        raise not_an_archive
+    return mapping, index
+
+
+# Calls
+# Call logs are paged newest-first with a createdAt cursor. Each assistant
+# (and, with --since, each day) is an independent task run on a thread pool.
+# Pages go through a bounded queue to a single writer, so memory stays flat
+# however many calls are exported, and the cursor of every task is saved after
+# each page so an interrupted export can resume where it stopped.
+CALL_COLUMNS = [
+    "id",
+    "assistantId",
+    "type",
+    "status",
+    "createdAt",
+    "startedAt",
+    "endedAt",
+    "durationSeconds",
+    "cost",
+    "endedReason",
+    "successEvaluation",
+]
+
+
+def parse_timestamp(value):
+    return datetime.fromisoformat(value.replace("Z", "+00:00"))
+
+
+def format_timestamp(value):
+    return (
+        value.astimezone(timezone.utc)
+        .isoformat(timespec="milliseconds")
+        .replace("+00:00", "Z")
+    )
+
+
+def call_to_row(call):
+    duration = None
+    if call.get("startedAt") and call.get("endedAt"):
+        duration = (
+            parse_timestamp(call["endedAt"]) - parse_timestamp(call["startedAt"])
+        ).total_seconds()
+    row = {column: call.get(column) for column in CALL_COLUMNS}
+    row["durationSeconds"] = duration
+    row["successEvaluation"] = (call.get("analysis") or {}).get("successEvaluation")
+    return row
+
+
+class CallWriter:
+    """Append calls to a gzip file as JSON lines or as columnar row groups.
+
+    In the columnar format every line holds one page of calls as
+    ``{"rows": n, "columns": {name: [values]}}``.
+    """
+
+    def __init__(self, path, output_format):
+        self.output_format = output_format
+        self.file = gzip.open(path, "at", encoding="utf-8")
+
+    def write(self, calls):
+        if self.output_format == "jsonl":
+            for call in calls:
+                self.file.write(json.dumps(call) + "\n")
+        elif calls:
+            rows = [call_to_row(call) for call in calls]
+            columns = {column: [row[column] for row in rows] for column in CALL_COLUMNS}
+            self.file.write(json.dumps({"rows": len(rows), "columns": columns}) + "\n")
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+def read_call_columns(path):
+    """Yield the row groups of a columnar call export."""
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            yield json.loads(line)
+
+
+def plan_call_tasks(assistant_ids, since=None, until=None):
+    """Split the export into independent (assistant, window) tasks."""
+    if since is None:
+        return [
+            {
+                "key": assistant_id,
+                "assistant_id": assistant_id,
+                "start": None,
+                "end": until,
+            }
+            for assistant_id in assistant_ids
+        ]
+
+    end = parse_timestamp(until) if until else datetime.now(timezone.utc)
+    windows = []
+    start = parse_timestamp(since)
+    while start < end:
+        window_end = min(start + timedelta(days=1), end)
+        windows.append((format_timestamp(start), format_timestamp(window_end)))
+        start = window_end
+    return [
+        {
+            "key": f"{assistant_id}:{window_start}",
+            "assistant_id": assistant_id,
+            "start": window_start,
+            "end": window_end,
+        }
+        for assistant_id in assistant_ids
+        for window_start, window_end in windows
+    ]
+
+
+def put_page(pages, page, stop):
+    """Put ``page`` on ``pages`` unless the export stops while it is full."""
+    while not stop.is_set():
+        try:
+            pages.put(page, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def fetch_call_pages(base_url, api_key, task, position, page_size, pages, stop):
+    """Page backwards through one task's calls, putting pages on ``pages``.
+
+    ``position`` is the task's cursor: the createdAt of the oldest call
+    fetched so far (``before``) and the IDs of the calls fetched with exactly
+    that timestamp (``seen``). Pages end at that timestamp inclusive, so calls
+    sharing it across a page boundary aren't skipped, and the ones already
+    fetched are dropped. Every outcome, including any error, ends with a final
+    ``done`` page unless ``stop`` is set.
+    """
+    before = position.get("before")
+    seen = set(position.get("seen", []))
+    # Cursors saved before "seen" was recorded ended at "before" exclusive
+    exclusive = before is not None and "seen" not in position
+    try:
+        while not stop.is_set():
+            params = {"assistantId": task["assistant_id"], "limit": page_size}
+            if task["start"]:
+                params["createdAtGe"] = task["start"]
+            if before and exclusive:
+                params["createdAtLt"] = before
+            elif before:
+                params["createdAtLe"] = before
+            elif task["end"]:
+                params["createdAtLt"] = task["end"]
+            page = vapi_request(
+                "GET", f"{base_url}/call", api_key, params=params
+            ).json()
+            if not isinstance(page, list):
+                raise ValueError(f"Expected a list of calls, got: {page!r:.200}")
+
+            calls = [call for call in page if call["id"] not in seen]
+            if calls:
+                oldest = min(call["createdAt"] for call in calls)
+                if oldest != before:
+                    before, seen = oldest, set()
+                seen.update(c["id"] for c in calls if c["createdAt"] == before)
+            # A full page of calls already fetched means more than a page of
+            # calls share one timestamp: skip past it rather than loop forever
+            exclusive = not calls and len(page) == page_size
+            done = len(page) < page_size
+            position = {"before": before, "seen": sorted(seen)}
+            if not put_page(pages, (task["key"], calls, position, done), stop):
+                return
+            if done:
+                return
+    except Exception as e:
+        put_page(pages, (task["key"], e, None, True), stop)
+
+
+def load_call_cursor(cursor_path):
+    if not os.path.exists(cursor_path):
+        return {}
+    with open(cursor_path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def save_call_cursor(cursor_path, cursor):
+    temporary_path = f"{cursor_path}.tmp"
+    with open(temporary_path, "w", encoding="utf-8") as f:
+        json.dump(cursor, f)
+    os.replace(temporary_path, cursor_path)
+
+
+def export_calls(
+    base_url, api_key, tasks, output, output_format, page_size=100, concurrency=4
+):
+    """Export every task's calls to ``output``, resuming from its cursor file.
+
+    Returns the number of calls written in this run.
+    """
+    cursor_path = f"{output}.cursor.json"
+    cursor = load_call_cursor(cursor_path)
+    pending = [task for task in tasks if not cursor.get(task["key"], {}).get("done")]
+    if not pending:
+        return 0
+
+    pages = queue.Queue(maxsize=concurrency * 2)
+    stop = threading.Event()
+    writer = CallWriter(output, output_format)
+    written = 0
+    error = None
+    try:
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            try:
+                for task in pending:
+                    executor.submit(
+                        fetch_call_pages,
+                        base_url,
+                        api_key,
+                        task,
+                        cursor.get(task["key"], {}),
+                        page_size,
+                        pages,
+                        stop,
+                    )
+
+                remaining = len(pending)
+                while remaining:
+                    key, calls, position, done = pages.get()
+                    if isinstance(calls, Exception):
+                        # Progress so far is in the cursor; the rest resumes later
+                        error = calls
+                        break
+                    writer.write(calls)
+                    written += len(calls)
+                    cursor[key] = dict(position, done=done)
+                    save_call_cursor(cursor_path, cursor)
+                    remaining -= done
+            finally:
+                # Unblock producers waiting on a full queue so the pool can shut down
+                stop.set()
+    finally:
+        writer.close()
+
+    if error:
+        click.echo(
+            f"Error fetching calls: {error}\nResponse details: {error_details(error)}",
+            err=True,
+        )
+        raise SystemExit(1)
+    return written
+
+
+def load_call_arrays(path):
+    """Load a call export (columnar or JSON lines) into NumPy column arrays."""
+    columns = {column: [] for column in CALL_COLUMNS}
+    with gzip.open(path, "rt", encoding="utf-8") as f:
+        for line in f:
+            record = json.loads(line)
+            if "columns" in record:
+                for column in CALL_COLUMNS:
+                    columns[column].extend(record["columns"][column])
+            else:
+                row = call_to_row(record)
+                for column in CALL_COLUMNS:
+                    columns[column].append(row[column])
+
+    def as_strings(values):
+        return np.array(["" if v is None else str(v) for v in values], dtype=str)
+
+    created = as_strings(columns["createdAt"])
+    return {
+        "assistantId": as_strings(columns["assistantId"]),
+        "createdAt": np.char.rstrip(created, "Z").astype("datetime64[ms]"),
+        "durationSeconds": np.array(columns["durationSeconds"], dtype=float),
+        "cost": np.array(columns["cost"], dtype=float),
+        "endedReason": as_strings(columns["endedReason"]),
+        "successEvaluation": as_strings(columns["successEvaluation"]),
+    }
+
+
+def prompt_fingerprint(prompts):
+    """Identify a prompt version by the hashes of its decomposed prompt files.
+
+    ``prompts`` maps each of PROMPT_FILES to its content.
+    """
+    digest = hashlib.sha256()
+    for filename in PROMPT_FILES:
+        content = prompts.get(filename) or ""
+        digest.update(hashlib.sha256(content.encode("utf-8")).digest())
+    return digest.hexdigest()[:12]
+
+
+def assistant_prompts(assistant_data):
+    messages = (assistant_data.get("model") or {}).get("messages") or []
+    system_message = next((m for m in messages if m.get("role") == "system"), {})
+    analysis_plan = assistant_data.get("analysisPlan") or {}
+    return {
+        "system_prompt.txt": system_message.get("content"),
+        "first_message.txt": assistant_data.get("firstMessage"),
+        "summary_prompt.txt": analysis_plan.get("summaryPrompt"),
+        "structured_data_prompt.txt": analysis_plan.get("structuredDataPrompt"),
+        "success_evaluation_prompt.txt": analysis_plan.get("successEvaluationPrompt"),
+    }
+
+
+def prompt_version_timeline(assistant_id):
+    """Return ``(start times, fingerprints)`` of the prompt versions recorded
+    in the local history, oldest first."""
+    index = load_history_index(assistant_id)
+    starts, fingerprints = [], []
+    if index:
+        for entry, text in iter_history_texts(assistant_id, index):
+            fingerprint = prompt_fingerprint(assistant_prompts(json.loads(text)))
+            if entry["updatedAt"] and (
+                not fingerprints or fingerprints[-1] != fingerprint
+            ):
+                starts.append(entry["updatedAt"].rstrip("Z"))
+                fingerprints.append(fingerprint)
+    return np.array(starts, dtype="datetime64[ms]"), fingerprints
+
+
+def summarise_calls(arrays):
+    """Aggregate calls per assistant and per prompt version.
+
+    Calls are sorted once by (assistant, version); each group is then a
+    contiguous slice that is summarised with array operations.
+    """
+    assistants, assistant_index = np.unique(arrays["assistantId"], return_inverse=True)
+    version_index = np.full(len(assistant_index), -1)
+    timelines = {}
+    by_assistant = np.argsort(assistant_index, kind="stable")
+    assistant_counts = np.bincount(assistant_index, minlength=len(assistants))
+    for assistant_id, rows in zip(
+        assistants, np.split(by_assistant, np.cumsum(assistant_counts)[:-1])
+    ):
+        starts, fingerprints = prompt_version_timeline(assistant_id)
+        timelines[assistant_id] = (starts, fingerprints)
+        version_index[rows] = (
+            np.searchsorted(starts, arrays["createdAt"][rows], side="right") - 1
+        )
+
+    order = np.lexsort((version_index, assistant_index))
+    group_keys = np.stack([assistant_index[order], version_index[order]], axis=1)
+    boundaries = np.flatnonzero(np.any(np.diff(group_keys, axis=0) != 0, axis=1)) + 1
+    summaries = []
+    for group in np.split(order, boundaries):
+        if not len(group):
+            continue
+        assistant_id = assistants[assistant_index[group[0]]]
+        version = version_index[group[0]]
+        starts, fingerprints = timelines[assistant_id]
+        durations = arrays["durationSeconds"][group]
+        costs = arrays["cost"][group]
+        has_duration = ~np.isnan(durations)
+        percentiles = (
+            np.percentile(durations[has_duration], [50, 90, 99])
+            if has_duration.any()
+            else [np.nan] * 3
+        )
+        reasons, reason_counts = np.unique(
+            arrays["endedReason"][group], return_counts=True
+        )
+        outcomes, outcome_counts = np.unique(
+            arrays["successEvaluation"][group], return_counts=True
+        )
+        summaries.append(
+            {
+                "assistant_id": str(assistant_id),
+                "prompt_version": fingerprints[version] if version >= 0 else None,
+                "since": str(starts[version]) + "Z" if version >= 0 else None,
+                "calls": len(group),
+                "duration_p50": float(percentiles[0]),
+                "duration_p90": float(percentiles[1]),
+                "duration_p99": float(percentiles[2]),
+                "total_cost": float(np.nansum(costs)),
+                "mean_cost": (
+                    float(np.nanmean(costs))
+                    if (~np.isnan(costs)).any()
+                    else float("nan")
+                ),
+                "ended_reasons": dict(
+                    sorted(
+                        zip(reasons.tolist(), reason_counts.tolist()),
+                        key=lambda item: -item[1],
+                    )
+                ),
+                "success_evaluations": dict(
+                    sorted(
+                        zip(outcomes.tolist(), outcome_counts.tolist()),
+                        key=lambda item: -item[1],
+                    )
+                ),
+            }
+        )
+    return summaries
+
+
+# Bulk editing
+JSON_PATH_TOKEN = re.compile(r"([^.\[\]]+)|\[(\d+)\]")
+
+
+# Numeric backreferences (\\1) and conditionals ((?(1)...)) in a pattern
+NUMERIC_GROUP_REFERENCE = re.compile(r"(?<!\\)(?:\\\\)*\\[1-9]|\(\?\(\d")
+
+
+def substitute_separately(patterns, replacements, text):
+    """Substitute as the combined alternation would, searching each pattern
+    separately. The leftmost match wins, and the first pattern given wins a
+    tie. Each pattern's next match is kept until the scan passes it."""
+    parts = []
+    count = 0
+    position = 0
+    after_empty = False
+    upcoming = [None] * len(patterns)
+    while position <= len(text):
+        best = None
+        for i, pattern in enumerate(patterns):
+            match = upcoming[i]
+            if match is None or match.start() < position:
+                match = pattern.search(text, position)
+            # Like re.sub, don't allow a second empty match at one position.
+            # (re.sub would still try the pattern's non-empty matches there.)
+            if after_empty and match and match.start() == match.end() == position:
+                match = (
+                    pattern.search(text, position + 1) if position < len(text) else None
+                )
+            upcoming[i] = match
+            if match and (best is None or match.start() < best.start()):
+                best, best_index = match, i
+        if best is None:
+            break
+        parts.append(text[position : best.start()])
+        parts.append(best.expand(replacements[best_index]))
+        count += 1
+        position = best.end()
+        after_empty = best.start() == best.end()
+    parts.append(text[position:])
+    return "".join(parts), count
+
+
+def compile_replacements(replacements):
+    """Combine ``(pattern, replacement)`` pairs into a single substitution.
+
+    All patterns are joined into one alternation, so each file is scanned
+    once however many patterns are given. At each position the patterns are
+    tried in the order given. Returns a ``text -> (new text, count)`` function.
+    """
+    patterns = [re.compile(pattern) for pattern, _ in replacements]
+    strings = [replacement for _, replacement in replacements]
+
+    def substitute_each(text):
+        return substitute_separately(patterns, strings, text)
+
+    # Wrapping patterns in named groups renumbers their groups, which breaks
+    # numeric references to them
+    if any(NUMERIC_GROUP_REFERENCE.search(pattern) for pattern, _ in replacements):
+        return substitute_each
+    try:
+        combined = re.compile(
+            "|".join(
+                f"(?P<_vct{i}>{pattern})" for i, (pattern, _) in enumerate(replacements)
+            )
+        )
+    except re.error:
+        # Patterns that reuse group names can't be combined either
+        return substitute_each
+
+    def expand(match):
+        i = int(match.lastgroup[4:])
+        # Re-match the original pattern so its own groups and backreferences
+        # expand exactly as they would with re.sub
+        own_match = patterns[i].match(match.string, match.start())
+        return own_match.expand(replacements[i][1])
+
+    return lambda text: combined.subn(expand, text)
+
+
+def parse_json_path(path):
+    tokens = []
+    for key, index in JSON_PATH_TOKEN.findall(path):
+        tokens.append(int(index) if index else key)
+    if not tokens:
+        raise ValueError(f"Invalid JSON path: {path!r}")
+    return tokens
+
+
+def set_json_path(data, tokens, value):
+    node = data
+    for token, next_token in zip(tokens, tokens[1:]):
+        if isinstance(token, int):
+            node = node[token]
+        else:
+            node = node.setdefault(token, [] if isinstance(next_token, int) else {})
+    node[tokens[-1]] = value
+
+
+def parse_json_value(value):
+    try:
+        return json.loads(value)
+    except json.JSONDecodeError:
+        return value
+
+
+def plan_file_edit(path, substitute, assignments):
+    """Return ``(path, old content, new content)``, or None if unchanged."""
+    original = read_file(path)
+    content = original
+    if assignments:
+        data = json.loads(content)
+        for tokens, value in assignments:
+            set_json_path(data, tokens, value)
+        if data != json.loads(original):
+            content = json.dumps(data, indent=2)
+    if substitute:
+        content, _ = substitute(content)
+    return (path, original, content) if content != original else None
+
+
+def plan_bulk_edit(
+    directories, replacements, assignments, file_patterns, concurrency=8
+):
+    """Work out every file change without writing anything.
+
+    Regex replacements apply to files matching ``file_patterns``; JSON path
+    assignments apply to each assistant_config.json. Files are read and
+    edited in parallel.
+    """
+    substitute = compile_replacements(replacements) if replacements else None
+    assignments = [(parse_json_path(path), value) for path, value in assignments]
+
+    targets = {}
+    for directory in directories:
+        if substitute:
+            for pattern in file_patterns:
+                for path in glob.glob(os.path.join(directory, pattern), recursive=True):
+                    if os.path.isfile(path):
+                        targets[path] = (substitute, [])
+        config_path = os.path.join(directory, "assistant_config.json")
+        if assignments and os.path.exists(config_path):
+            targets[config_path] = (targets.get(config_path, (None,))[0], assignments)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        edits = executor.map(
+            lambda path: plan_file_edit(path, *targets[path]), sorted(targets)
+        )
+        return [edit for edit in edits if edit]
+
+
+# Hooks
+# As a git hook, only the resources touched by the commit (or the commits being
+# pushed) are checked: their files, or shared fragments they include, changed.
+# They are checked as committed, not as in the working tree: the index (or
+# each pushed commit) is checked out to a scratch directory first. Each is
+# recomposed, validated, and decomposed and recomposed once more in a scratch
+# directory to prove that the files round-trip to the same payload.
+HOOK_STAGES = ["pre-commit", "pre-push"]
+NULL_SHA = "0" * 40
+
+
+def git_lines(*args):
+    result = subprocess.run(["git", *args], capture_output=True, text=True, check=True)
+    return [line for line in result.stdout.splitlines() if line]
+
+
+def hook_changed_files(stage, push_refs=()):
+    """Return ``(tree, paths)`` pairs: each tree to check (a commit, or None
+    for the index) and its changed paths, relative to the current directory."""
+    if stage == "pre-commit":
+        return [(None, git_lines("diff", "--cached", "--name-only", "--relative"))]
+
+    trees = []
+    for line in push_refs:
+        _, local_sha, _, remote_sha = line.split()
+        if local_sha == NULL_SHA:
+            continue  # Deleting a remote branch
+        if remote_sha == NULL_SHA:
+            # A new branch: everything not on any remote yet
+            lines = git_lines(
+                "log",
+                "--name-only",
+                "--format=",
+                "--relative",
+                local_sha,
+                "--not",
+                "--remotes",
+            )
+        else:
+            lines = git_lines(
+                "diff", "--name-only", "--relative", remote_sha, local_sha
+            )
+        trees.append((local_sha, sorted(set(lines))))
+    return trees
+
+
+class GitSnapshot:
+    """A checkout of ``tree`` (a commit, or None for the index) under ``scratch``.
+
+    Only the files asked for are checked out, so the cost follows the resources
+    being checked rather than the size of the repository. ``root`` is the
+    directory in the snapshot that corresponds to the current one, and paths
+    given to the methods are relative to the current directory.
+    """
+
+    def __init__(self, tree, scratch):
+        self.top = git_lines("rev-parse", "--show-toplevel")[0]
+        self.prefix = (git_lines("rev-parse", "--show-prefix") or [""])[0]
+        self.source = f"commit {tree[:12]}" if tree else "the index"
+        self.base = os.path.join(os.path.realpath(scratch), "tree")
+        self.root = os.path.join(self.base, self.prefix)
+        os.makedirs(self.root)
+        self.env = None  # The hook's own GIT_INDEX_FILE, if git set one, is the commit
+        if tree:
+            self.env = dict(os.environ, GIT_INDEX_FILE=os.path.join(scratch, "index"))
+            self.git("read-tree", tree)
+        self.tracked = set(self.git("ls-files", "-z").split("\0")) - {""}
+        self.checked_out = set()
+
+    def git(self, *args, input=None):
+        return subprocess.run(
+            ["git", *args],
+            cwd=self.top,
+            env=self.env,
+            input=input,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout
+
+    def top_path(self, path):
+        """Return ``path`` relative to the top of the repository, or None if
+        it is outside of it."""
+        path = os.path.normpath(os.path.join(self.prefix, path))
+        return None if path == ".." or path.startswith(f"..{os.sep}") else path
+
+    def checkout(self, paths, suffix=""):
+        """Check out ``paths``, and the files ending in ``suffix`` below them."""
+        exact = set()
+        below = set()
+        for path in paths:
+            path = self.top_path(path)
+            if path is None:
+                continue
+            exact.add(path)
+            below.add("" if path == "." else path + "/")
+        files = sorted(
+            path
+            for path in self.tracked - self.checked_out
+            if path in exact
+            or (path.startswith(tuple(below)) and path.endswith(suffix))
+        )
+        if files:
+            self.git(
+                "checkout-index",
+                f"--prefix={self.base}{os.sep}",
+                "-z",
+                "--stdin",
+                input="\0".join(files),
+            )
+            self.checked_out.update(files)
+
+    def checkout_includes(self, directories):
+        """Check out the fragments the templates in ``directories`` include,
+        transitively, and return messages for any that are not in the tree."""
+        pending = [
+            os.path.join(walk_root, filename)
+            for directory in directories
+            for walk_root, _, files in os.walk(os.path.join(self.root, directory))
+            for filename in files
+            if filename.endswith(".txt")
+        ]
+        seen = set(pending)
+        missing = []
+        while pending:
+            wanted = []
+            for template in pending:
+                for node in parse_template(template):
+                    if node[0] != "include" or node[1] in seen:
+                        continue
+                    seen.add(node[1])
+                    path = os.path.relpath(node[1], self.base)
+                    if path.startswith(f"..{os.sep}"):
+                        continue  # Outside the repository
+                    if path in self.tracked:
+                        wanted.append(node[1])
+                    elif os.path.exists(os.path.join(self.top, path)):
+                        missing.append(self.not_in_tree(path))
+            self.checkout(os.path.relpath(path, self.root) for path in wanted)
+            pending = [path for path in wanted if path.endswith(".txt")]
+        return missing
+
+    def checkout_resource(self, kind, directory):
+        """Check out ``directory`` and everything it includes, and return
+        messages for the files it needs that exist here but not in the tree."""
+        self.checkout([directory])
+        missing = self.checkout_includes([directory])
+        for filename in [RESOURCE_TYPES[kind]["config_file"], "metadata.json"]:
+            path = self.top_path(os.path.join(directory, filename))
+            if path not in self.tracked and os.path.exists(
+                os.path.join(self.top, path)
+            ):
+                missing.append(self.not_in_tree(path))
+        return missing
+
+    def not_in_tree(self, path):
+        return f"{path} is not in {self.source}; is it untracked or gitignored?"
+
+
+def configured_resource_directories(config):
+    """Return ``{directory: (kind, resource ID)}`` for every configured resource."""
+    directories = {}
+    for kind, spec in RESOURCE_TYPES.items():
+        mapping = config.get(spec["directories_key"], {})
+        for resource_id in get_resource_ids(config, kind):
+            directory = mapping.get(resource_id, resource_id)
+            directories[os.path.normpath(directory)] = (kind, resource_id)
+    return directories
+
+
+def owning_directory(path, directories):
+    """Return the resource directory ``path`` is in, or None."""
+    parts = os.path.normpath(path).split(os.sep)
+    return next(
+        (
+            os.path.join(*parts[:i])
+            for i in range(1, len(parts))
+            if os.path.join(*parts[:i]) in directories
+        ),
+        None,
+    )
+
+
+def affected_directories(paths, directories, root="."):
+    """Select the resource directories containing, or including, ``paths``.
+
+    Paths and directories are relative to ``root``. A resource whose includes
+    can't be resolved is selected, so that its check reports the error.
+    """
+    selected = set()
+    fragments = set()
+    for path in paths:
+        owner = owning_directory(path, directories)
+        if owner:
+            selected.add(owner)
+        elif os.path.exists(os.path.join(root, path)):
+            fragments.add(os.path.realpath(os.path.join(root, path)))
+
+    # Shared fragments only cost a look at the other resources' includes
+    if fragments:
+        for directory in directories:
+            if directory in selected or not os.path.isdir(
+                os.path.join(root, directory)
+            ):
+                continue
+            try:
+                for walk_root, _, files in os.walk(os.path.join(root, directory)):
+                    if any(
+                        fragments
+                        & template_dependencies(os.path.join(walk_root, filename))
+                        for filename in files
+                        if filename.endswith(".txt")
+                    ):
+                        selected.add(directory)
+                        break
+            except RecomposeError:
+                selected.add(directory)
+    return sorted(d for d in selected if os.path.isdir(os.path.join(root, d)))
+
+
+def check_round_trip(kind, directory, validate=True):
+    """Recompose ``directory`` and return ``(payload, errors)``."""
+    try:
+        payload = recompose_data(kind, directory)
+    except (OSError, ValueError) as e:
+        return None, [str(e)]
+
+    errors = []
+    if validate:
+        errors.extend(validate_assistant_data(payload, "update", kind))
+
+    with tempfile.TemporaryDirectory() as scratch:
+        write_decomposed(kind, copy.deepcopy(payload), scratch)
+        round_tripped = recompose_data(kind, scratch)
+    if round_tripped != payload:
+        changed = sorted(
+            key
+            for key in set(payload) | set(round_tripped)
+            if payload.get(key) != round_tripped.get(key)
+        )
+        errors.append(f"does not round-trip exactly (differs in: {', '.join(changed)})")
+    return payload, errors
+
+
+def install_hook(stage, config, push):
+    hooks_directory = git_lines("rev-parse", "--git-path", "hooks")[0]
+    hook_path = os.path.join(hooks_directory, stage)
+    marker = "# Installed by vapi_vct"
+    if os.path.exists(hook_path):
+        with open(hook_path, "r") as f:
+            if marker not in f.read():
+                click.echo(f"Error: {hook_path} already exists.", err=True)
+                raise SystemExit(1)
+
+    command = [sys.executable, os.path.realpath(__file__), "hook", stage]
+    command += ["--config", config] + (["--push"] if push else [])
+    os.makedirs(hooks_directory, exist_ok=True)
+    with open(hook_path, "w") as f:
+        f.write("#!/bin/sh\n")
+        f.write(f"{marker}\n")
+        f.write(f"cd {shlex.quote(os.getcwd())} || exit 1\n")
+        f.write(f'exec {shlex.join(command)} "$@"\n')
+    os.chmod(hook_path, 0o755)
+    return hook_path
+
+
+# Diffing
+# Payloads are compared as Merkle trees: every subtree is hashed once, bottom
+# up, and the comparison only descends into subtrees whose digests differ, so
+# identical branches are skipped after a single comparison. Long or multi-line
+# strings that differ (the prompts) are shown as line diffs.
+DIFF_INLINE_LENGTH = 80
+
+
+def merkle_tree(value):
+    """Return ``(digest, children)`` for ``value``, with children as subtrees."""
+    if isinstance(value, dict):
+        children = {key: merkle_tree(child) for key, child in value.items()}
+        h = hashlib.blake2b(b"d", digest_size=16)
+        for key in sorted(children):
+            h.update(json.dumps(key).encode("utf-8"))
+            h.update(children[key][0])
+        return h.digest(), children
+    if isinstance(value, list):
+        children = [merkle_tree(child) for child in value]
+        h = hashlib.blake2b(b"l", digest_size=16)
+        for child in children:
+            h.update(child[0])
+        return h.digest(), children
+    encoded = json.dumps(value, sort_keys=True).encode("utf-8")
+    return hashlib.blake2b(b"s" + encoded, digest_size=16).digest(), None
+
+
+def join_json_path(path, key):
+    if isinstance(key, int):
+        return f"{path}[{key}]"
+    return f"{path}.{key}" if path else key
+
+
+def diff_values(old, new, old_tree, new_tree, path=""):
+    """Yield the output lines describing how ``old`` became ``new``."""
+    if old_tree[0] == new_tree[0]:
+        return
+    if isinstance(old, dict) and isinstance(new, dict):
+        for key in list(old) + [key for key in new if key not in old]:
+            child_path = join_json_path(path, key)
+            if key not in new:
+                yield f"- {child_path}"
+            elif key not in old:
+                yield f"+ {child_path}: {json.dumps(new[key])}"
+            else:
+                yield from diff_values(
+                    old[key], new[key], old_tree[1][key], new_tree[1][key], child_path
+                )
+    elif isinstance(old, list) and isinstance(new, list):
+        for index in range(max(len(old), len(new))):
+            child_path = join_json_path(path, index)
+            if index >= len(new):
+                yield f"- {child_path}"
+            elif index >= len(old):
+                yield f"+ {child_path}: {json.dumps(new[index])}"
+            else:
+                yield from diff_values(
+                    old[index],
+                    new[index],
+                    old_tree[1][index],
+                    new_tree[1][index],
+                    child_path,
+                )
+    elif (
+        isinstance(old, str)
+        and isinstance(new, str)
+        and ("\n" in old + new or len(old + new) > 2 * DIFF_INLINE_LENGTH)
+    ):
+        yield f"~ {path}:"
+        yield from difflib.unified_diff(
+            old.splitlines(),
+            new.splitlines(),
+            fromfile=f"remote {path}",
+            tofile=f"local {path}",
+            lineterm="",
+        )
+    else:
+        yield f"~ {path}: {json.dumps(old)} → {json.dumps(new)}"
+
+
+def diff_payloads(remote, local):
+    """Return the differences between two payloads, ignoring read-only keys."""
+    remote = {k: v for k, v in remote.items() if k not in READ_ONLY_KEYS}
+    local = {k: v for k, v in local.items() if k not in READ_ONLY_KEYS}
+    return list(diff_values(remote, local, merkle_tree(remote), merkle_tree(local)))
+
+
+# Daemon
+# The daemon serves one project directory. It keeps a pooled HTTP session,
+# parsed configs, file hashes, parsed templates and compiled validators in
+# memory between commands, and re-hashes the project's resources in the
+# background so the next command finds its caches warm. Commands run one at a
+# time, each with its own working directory and captured output.
+DAEMON_PID_FILE = os.path.join(STATE_DIR, "daemon.pid")
+DAEMON_LOG_FILE = os.path.join(STATE_DIR, "daemon.log")
+DAEMON_REFRESH_INTERVAL = 300
+
+_daemon_lock = threading.Lock()
+
+
+def run_daemon_command(argv, cwd):
+    stdout = io.StringIO()
+    stderr = io.StringIO()
+    with _daemon_lock:
+        previous_directory = os.getcwd()
+        transport = get_transport()
+        rate_limiters = dict(_rate_limiters)
+        try:
+            os.chdir(cwd)
+            with redirect_stdout(stdout), redirect_stderr(stderr):
+                try:
+                    cli.main(args=argv, prog_name="vapi_vct")
+                    exit_code = 0
+                except SystemExit as e:
+                    exit_code = e.code if isinstance(e.code, int) else int(bool(e.code))
+                except Exception:
+                    traceback.print_exc()
+                    exit_code = 1
+        finally:
+            # Undo any --record, --replay or rate_limit of the command
+            set_transport(transport)
+            _rate_limiters.clear()
+            _rate_limiters.update(rate_limiters)
+            os.chdir(previous_directory)
+    return {
+        "stdout": stdout.getvalue(),
+        "stderr": stderr.getvalue(),
+        "exit_code": exit_code,
+    }
+
+
+def refresh_daemon_caches(directory, config_file="vapi_config.json"):
+    with _daemon_lock:
+        previous_directory = os.getcwd()
+        try:
+            os.chdir(directory)
+            with redirect_stdout(io.StringIO()), redirect_stderr(io.StringIO()):
+                config = load_config(config_file)
+                for kind in RESOURCE_TYPES:
+                    for resource_directory in get_resource_directories(config, kind):
+                        try:
+                            collect_inputs(resource_directory)
+                        except RecomposeError:
+                            pass  # Reported when a command reads the directory
+        finally:
+            os.chdir(previous_directory)
+
+
+class DaemonHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        request = json.loads(self.rfile.read())
+        server = self.server
+        if request.get("control") == "stop":
+            reply = {"stopping": True}
+            threading.Thread(target=server.shutdown).start()
+        elif request.get("control") == "status":
+            reply = {
+                "pid": os.getpid(),
+                "uptime": time.monotonic() - server.started,
+                "commands": server.commands,
+            }
+        else:
+            server.commands += 1
+            reply = run_daemon_command(request["argv"], request["cwd"])
+        self.wfile.write(json.dumps(reply).encode("utf-8"))
+
+
+class DaemonServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+def create_daemon_server(socket_path=DAEMON_SOCKET):
+    """Bind the daemon's socket and enable its in-memory caches."""
+    global _config_cache
+    if os.path.exists(socket_path):
+        os.remove(socket_path)
+    os.makedirs(os.path.dirname(socket_path) or ".", exist_ok=True)
+    server = DaemonServer(socket_path, DaemonHandler)
+    server.started = time.monotonic()
+    server.commands = 0
+
+    # Commands that set these run locally; the daemon's own are ignored
+    for name in DAEMON_LOCAL_ENV:
+        os.environ.pop(name, None)
+
+    set_transport(PooledTransport())
+    _config_cache = {}
+    return server
+
+
+def serve_daemon(server, refresh_interval=DAEMON_REFRESH_INTERVAL):
+    directory = os.getcwd()
+    socket_path = os.path.abspath(server.server_address)
+    stopped = threading.Event()
+
+    def refresh():
+        while not stopped.wait(refresh_interval):
+            refresh_daemon_caches(directory)
+
+    threading.Thread(target=refresh, daemon=True).start()
+    refresh_daemon_caches(directory)
+    try:
+        server.serve_forever()
+    finally:
+        stopped.set()
+        server.server_close()
+        for path in [socket_path, os.path.join(directory, DAEMON_PID_FILE)]:
+            if os.path.exists(path):
+                os.remove(path)
+
+
+# Workspaces
+# A workspace file lists several projects, each with its own config and often
+# its own API key. A command is run for every project at once, each in a
+# subprocess in the project's directory. Projects sharing an API key split
+# that key's rate_limit between them, so the whole run respects every budget.
+WORKSPACE_COMMANDS = ["fetch", "update", "status"]
+
+
+def load_workspace(workspace_file):
+    """Return the workspace and ``{project name: config path}`` for its projects."""
+    try:
+        with open(workspace_file, "r") as f:
+            workspace = json.load(f)
+    except FileNotFoundError:
+        click.echo(f"Error: Workspace file '{workspace_file}' not found.", err=True)
+        raise SystemExit(1)
+    except json.JSONDecodeError:
+        click.echo(
+            f"Error: Invalid JSON in workspace file '{workspace_file}'.", err=True
+        )
+        raise SystemExit(1)
+
+    base_directory = os.path.dirname(os.path.abspath(workspace_file))
+    projects = workspace.get("projects", {})
+    if isinstance(projects, list):
+        projects = {os.path.dirname(path) or path: path for path in projects}
+    return workspace, {
+        name: os.path.join(base_directory, path) for name, path in projects.items()
+    }
+
+
+def plan_rate_limits(workspace, projects):
+    """Split each API key's rate limit evenly between the projects using it."""
+    by_key = {}
+    limits = {}
+    for name, config_path in projects.items():
+        try:
+            with open(config_path, "r") as f:
+                config = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            # Reported by the project's own run
+            config = {}
+        by_key.setdefault(config.get("api_key"), []).append(name)
+        limits[name] = config.get("rate_limit", workspace.get("rate_limit"))
+
+    shares = {}
+    for names in by_key.values():
+        for name in names:
+            limit = limits[name]
+            if not limit:
+                shares[name] = None
+                continue
+            share = {}
+            if limit.get("requests_per_second"):
+                share["requests_per_second"] = limit["requests_per_second"] / len(names)
+            if limit.get("concurrency"):
+                share["concurrency"] = max(1, limit["concurrency"] // len(names))
+            shares[name] = share
+    return shares
+
+
+def run_workspace_project(name, config_path, command, args, rate_limit):
+    environment = dict(os.environ)
+    environment.pop(RATE_LIMIT_ENV, None)
+    if rate_limit:
+        environment[RATE_LIMIT_ENV] = json.dumps(rate_limit)
+
+    started = time.monotonic()
+    result = subprocess.run(
+        [sys.executable, os.path.realpath(__file__), command]
+        + ["--config", os.path.basename(config_path)]
+        + list(args),
+        cwd=os.path.dirname(config_path),
+        env=environment,
+        capture_output=True,
+        text=True,
+    )
+    return {
+        "project": name,
+        "ok": result.returncode == 0,
+        "output": result.stdout + result.stderr,
+        "seconds": time.monotonic() - started,
+    }
+
+
+# CLI
+@click.group(name="vapi_vct")
+@click.option(
+    "--record",
+    metavar="CASSETTE",
+    envvar="VAPI_VCT_RECORD",
+    help="Save every API request and response, with timings, to a cassette file",
+)
+@click.option(
+    "--replay",
+    metavar="CASSETTE",
+    envvar="VAPI_VCT_REPLAY",
+    type=click.Path(exists=True, dir_okay=False),
+    help="Answer API requests from a cassette file instead of the API",
+)
+@click.option(
+    "--replay-speed",
+    type=click.Choice(["recorded", "instant"]),
+    default="recorded",
+    help="Whether replayed responses take as long as recorded",
+)
+@click.pass_context
+def cli(ctx, record, replay, replay_speed):
+    """Vapi Version Control Tools CLI"""
+    if record and replay:
+        raise click.UsageError("--record and --replay cannot be used together.")
+    if replay:
+        set_transport(ReplayTransport(replay, realtime=replay_speed == "recorded"))
+    elif record:
+        recorder = RecordingTransport(record, get_transport())
+        set_transport(recorder)
+        # Written once the command finishes, whether or not it succeeds
+        ctx.call_on_close(recorder.save)
+
+
+@cli.group(name="config")
+def config():
+    """Configuration commands"""
+    pass
+
+
+@cli.group(name="calls")
+def calls():
+    """Call log commands"""
+    pass
+
+
+@config.group(name="assistants")
+def assistants():
+    """Assistant commands"""
+    pass
+
+
+@config.group(name="resources")
+def resources():
+    """Manage the IDs of other Vapi resources (tools, squads, ...)"""
+    pass
+
+
+@config.group(name="api_key")
+def api_key():
+    """API key commands"""
+    pass
+
+
+@cli.command(name="fetch")
+@click.option(
+    "--config", default="vapi_config.json", help="Project-specific configuration file"
+)
+@click.option(
+    "--no-decompose", is_flag=True, help="Skip decomposing fetched assistants"
+)
+def fetch(config: str, no_decompose: bool):
+    """Fetch and optionally decompose Vapi assistants"""
+    config_data = load_config(config)
+    try:
+        api_key = get_api_key(config_data)
+    except SystemExit:
+        raise click.Abort()
+
+    assistant_ids = get_assistant_ids(config_data)
+
+    if not assistant_ids:
+        click.echo("No assistants to fetch. Exiting.", err=True)
+        raise click.Abort()
+
+    fetched_files = fetch_assistant_and_save(
+        assistant_ids, api_key, get_api_base_url(config_data)
+    )
+
+    if not no_decompose:
+        for file in fetched_files:
+            decompose_assistant(file, config)
+            click.echo(f"Decomposed {file}")
+
+
+@cli.command(name="update")
+@click.option(
+    "--config", default="vapi_config.json", help="Project-specific configuration file"
+)
+@click.option(
+    "--no-recompose", is_flag=True, help="Skip recomposing assistants before updating"
+)
+@click.option(
+    "--no-validate", is_flag=True, help="Skip validating payloads before updating"
+)
+@click.option(
+    "--changed-only",
+    is_flag=True,
+    help="Only update assistants whose files or included fragments changed since the last update",
+)
+@report_recompose_errors
+def update(config: str, no_recompose: bool, no_validate: bool, changed_only: bool):
+    """Update Vapi assistants, optionally recomposing first"""
+    config_data = load_config(config)
+    try:
+        api_key = get_api_key(config_data)
+    except SystemExit:
+        raise click.Abort()
+    assistant_ids = get_assistant_ids(config_data)
+    assistant_directories = config_data.get("assistant_directories", {})
+
+    if not assistant_ids:
+        click.echo("No assistants to update. Exiting.", err=True)
+        raise click.Abort()
+
+    files = []
+    directories = []
+    if no_recompose:
+        for assistant_id in assistant_ids:
+            directory_name = assistant_directories.get(assistant_id, assistant_id)
+            files.append(f"{directory_name}_recomposed.json")
+    else:
+        for assistant_id in assistant_ids:
+            directory_name = assistant_directories.get(assistant_id, assistant_id)
+            if os.path.isdir(directory_name):
+                directories.append(directory_name)
+            else:
+                click.echo(f"Skipping {directory_name} as it's not a directory")
+
+        if changed_only:
+            directories = get_dirty_directories(directories)
+            if not directories:
+                click.echo("No assistants have changed since the last update.")
+                return
+
+        for directory_name in directories:
+            output_file = recompose_assistant(directory_name)
+            files.append(output_file)
+
+    if not no_validate and not validate_recomposed_files(files, "update"):
+        click.echo("Validation failed. No assistants were updated.", err=True)
+        raise click.Abort()
+
+    update_assistants_from_files(
+        files,
+        api_key,
+        base_url=get_api_base_url(config_data),
+        **get_body_options(config_data),
+    )
+    mark_clean(directories)
+
+
+@cli.command(name="publish")
+@click.option(
+    "--config", default="vapi_config.json", help="Project-specific configuration file"
+)
+@click.option(
+    "--no-validate", is_flag=True, help="Skip validating the payload before publishing"
+)
+@click.argument(
+    "directory", type=click.Path(exists=True, file_okay=False, dir_okay=True)
+)
+@report_recompose_errors
+def publish(config: str, no_validate: bool, directory: str):
+    """Publish a new assistant from a decomposed directory"""
+    config_data = load_config(config)
+    try:
+        api_key = get_api_key(config_data)
+    except SystemExit:
+        raise click.Abort()
+
+    # Recompose the assistant
+    recomposed_file = recompose_assistant(directory)
+
+    # Load the recomposed data
+    with open(recomposed_file, "r", encoding="utf-8") as f:
+        assistant_data = json.load(f)
+
+    # Check if name exists, if not, prompt user or generate random name
+    if "name" not in assistant_data or not assistant_data["name"]:
+        while True:
+            try:
+                name = click.prompt(
+                    "Enter a name for the assistant (or 'random' for a random name)",
+                    type=str,
+                )
+                if name.lower() == "random":
+                    name = f"Assistant_{generate_random_string(6)}"
+                    click.echo(f"Generated random name: {name}")
+                break
+            except click.exceptions.Abort:
+                if click.confirm("Do you want to exit?", default=True):
+                    click.echo("Operation cancelled.")
+                    return
+                click.echo("Continuing with name input...")
+        assistant_data["name"] = name
+
+    # Remove properties that should not be included in the create request
+    for key in READ_ONLY_KEYS:
+        assistant_data.pop(key, None)
+
+    if not no_validate:
+        errors = validate_assistant_data(assistant_data, "create")
+        if not report_validation_errors(recomposed_file, errors):
+            click.echo("Validation failed. Assistant was not published.", err=True)
+            raise click.Abort()
+
+    # Create the new assistant
+    body_options = get_body_options(config_data)
+    created_assistant = create_assistant(
+        assistant_data,
+        api_key,
+        get_api_base_url(config_data),
+        stream=is_large_payload(recomposed_file, body_options["stream_threshold"]),
+        compress=body_options["compress"],
+    )
+
+    if created_assistant:
+        click.echo(f"New assistant created successfully:")
+        click.echo(f"Name: {created_assistant['name']}")
+        click.echo(f"ID: {created_assistant['id']}")
+
+        # Update the configuration with the new assistant
+        config_data.setdefault("assistant_ids", []).append(created_assistant["id"])
+        update_config(config, config_data)
+        update_index("assistant", created_assistant, directory)
+        mark_clean([directory])
+        click.echo("Configuration updated with the new assistant.")
+
+
+def create_resource(
+    kind, data, api_key, base_url=API_BASE_URL, stream=False, compress=False
+):
+    url = f"{base_url}{RESOURCE_TYPES[kind]['endpoint']}"
+    try:
+        return vapi_request(
+            "POST", url, api_key, **body_kwargs(data, stream, compress)
+        ).json()
+    except requests.exceptions.RequestException as e:
+        click.echo(
+            f"Error creating {kind}: {e}\nResponse details: {error_details(e)}",
+            err=True,
+        )
+        return None
+
+
+def create_assistant(
+    assistant_data, api_key, base_url=API_BASE_URL, stream=False, compress=False
+):
+    return create_resource(
+        "assistant", assistant_data, api_key, base_url, stream, compress
+    )
+
+
+def generate_random_string(length):
+    return "".join(random.choices(string.ascii_letters + string.digits, k=length))
+
+
+def update_config(config_file, updated_config):
+    """Write ``updated_config`` back to ``config_file``.
+
+    If the config was obtained from load_config, only the changes made since
+    loading are applied to the current file content, under a lock, and
+    ``updated_config`` is refreshed in place with the merged result.
+    Otherwise the file is overwritten.
+    """
+    base = find_config_base(config_file, updated_config)
+    with config_lock(config_file):
+        merged = updated_config
+        if base is not None:
+            try:
+                with open(config_file, "r") as f:
+                    current = json.load(f)
+            except FileNotFoundError:
+                current = {}
+            merged = merge_config(base, updated_config, current)
+
+        temporary_path = f"{config_file}.{os.getpid()}.tmp"
+        with open(temporary_path, "w") as f:
+            json.dump(merged, f, indent=2)
+        os.replace(temporary_path, config_file)
+
+    if base is not None:
+        updated_config.clear()
+        updated_config.update(merged)
+        remember_config_base(config_file, updated_config)
+
+
+@cli.command(name="sync")
+@click.option(
+    "--config", default="vapi_config.json", help="Project-specific configuration file"
+)
+@click.option(
+    "--type",
+    "kinds",
+    multiple=True,
+    type=click.Choice(list(RESOURCE_TYPES)),
+    help="Resource type to sync (repeatable, default: all)",
+)
+@click.option("--push", is_flag=True, help="Recompose and update instead of fetching")
+@click.option("--no-decompose", is_flag=True, help="Skip decomposing fetched resources")
+@click.option(
+    "--no-validate", is_flag=True, help="Skip validating payloads before pushing"
+)
+@click.option("--concurrency", default=8, help="Requests made in parallel")
+@report_recompose_errors
+def sync(config, kinds, push, no_decompose, no_validate, concurrency):
+    """Fetch or push every configured resource, of every type, in one pass"""
+    config_data = load_config(config)
+    try:
+        api_key = get_api_key(config_data)
+    except SystemExit:
+        raise click.Abort()
+    base_url = get_api_base_url(config_data)
+    kinds = kinds or list(RESOURCE_TYPES)
+
+    if push:
+        files = []
+        directories = []
+        for kind in kinds:
+            kind_directories = get_resource_directories(config_data, kind)
+            kind_files = [
+                recompose_resource(kind, directory) for directory in kind_directories
+            ]
+            if not no_validate and not validate_recomposed_files(
+                kind_files, "update", kind
+            ):
+                click.echo("Validation failed. No resources were updated.", err=True)
+                raise click.Abort()
+            files.extend((kind, kind_file) for kind_file in kind_files)
+            directories.extend(kind_directories)
+
+        if not files:
+            click.echo("No decomposed resources to push.")
+            return
+        update_resources_from_files(
+            files, api_key, concurrency, base_url, **get_body_options(config_data)
+        )
+        mark_clean(directories)
+        return
+
+    tasks = [
+        (kind, resource_id)
+        for kind in kinds
+        for resource_id in get_resource_ids(config_data, kind)
+    ]
+    if not tasks:
+        click.echo("No resources to sync. Exiting.", err=True)
+        raise click.Abort()
+
+    for kind, data in fetch_resources(tasks, api_key, base_url, concurrency):
+        filename = save_fetched_resource(kind, data)
+        if not no_decompose:
+            decompose_resource(kind, filename, config)
+            click.echo(f"Decomposed {filename}")
+
+
+@cli.command(name="status")
+@click.option(
+    "--config", default="vapi_config.json", help="Project-specific configuration file"
+)
+@report_recompose_errors
+def status(config):
+    """Show which resources have local changes since they were last updated"""
+    config_data = load_config(config)
+    counts = {"changed": 0, "unchanged": 0, "not decomposed": 0}
+    for kind, spec in RESOURCE_TYPES.items():
+        resource_directories = config_data.get(spec["directories_key"], {})
+        rows = []
+        for resource_id in get_resource_ids(config_data, kind):
+            directory = resource_directories.get(resource_id, resource_id)
+            rows.append((resource_id, directory))
+        existing = [directory for _, directory in rows if os.path.isdir(directory)]
+        dirty = set(get_dirty_directories(existing))
+        for resource_id, directory in rows:
+            if not os.path.isdir(directory):
+                state = "not decomposed"
+            elif directory in dirty:
+                state = "changed"
+            else:
+                state = "unchanged"
+            counts[state] += 1
+            click.echo(f"{state:<15} {kind:<13} {directory} ({resource_id})")
+    click.echo(", ".join(f"{count} {state}" for state, count in counts.items()))
+
+
+@cli.command(
+    name="workspace",
+    context_settings={"ignore_unknown_options": True},
+)
+@click.option(
+    "--workspace",
+    "workspace_file",
+    default="vapi_workspace.json",
+    help="Workspace file listing the project configurations",
+)
+@click.option(
+    "--jobs", type=int, help="Projects run at the same time (default: all of them)"
+)
+@click.argument("command", type=click.Choice(WORKSPACE_COMMANDS))
+@click.argument("args", nargs=-1, type=click.UNPROCESSED)
+def workspace(workspace_file, jobs, command, args):
+    """Run fetch, update or status for every project in a workspace"""
+    try:
+        workspace_data, projects = load_workspace(workspace_file)
+    except SystemExit:
+        raise click.Abort()
+    if not projects:
+        click.echo("No projects found in the workspace. Exiting.", err=True)
+        raise click.Abort()
+    rate_limits = plan_rate_limits(workspace_data, projects)
+
+    started = time.monotonic()
+    results = []
+    with ThreadPoolExecutor(max_workers=jobs or len(projects)) as executor:
+        futures = [
+            executor.submit(
+                run_workspace_project,
+                name,
+                config_path,
+                command,
+                args,
+                rate_limits[name],
+            )
+            for name, config_path in projects.items()
+        ]
+        for future in as_completed(futures):
+            result = future.result()
+            results.append(result)
+            outcome = "ok" if result["ok"] else "failed"
+            click.echo(f"== {result['project']} ({outcome}, {result['seconds']:.1f}s)")
+            for line in result["output"].splitlines():
+                click.echo(f"   {line}")
+
+    failed = [result["project"] for result in results if not result["ok"]]
+    slowest = max(results, key=lambda result: result["seconds"])
+    click.echo(
+        f"{command}: {len(results) - len(failed)} of {len(results)} project(s) "
+        f"succeeded in {time.monotonic() - started:.1f}s "
+        f"(slowest: {slowest['project']}, {slowest['seconds']:.1f}s)"
     )
-    data["firstMessage"] = first_message_content
+    if failed:
+        click.echo(f"Failed: {', '.join(sorted(failed))}", err=True)
+        raise SystemExit(1)
+
+
+@cli.command(name="hook")
+@click.option(
+    "--config", default="vapi_config.json", help="Project-specific configuration file"
+)
+@click.option(
+    "--push", is_flag=True, help="On pre-push, also update the checked resources"
+)
+@click.option("--no-validate", is_flag=True, help="Skip validating the payloads")
+@click.option(
+    "--install", is_flag=True, help="Install the hook in the repository's git hooks"
+)
+@click.option("--concurrency", default=8, help="Resources checked in parallel")
+@click.argument("stage", type=click.Choice(HOOK_STAGES))
+@click.argument("hook_args", nargs=-1)
+def hook(config, push, no_validate, install, concurrency, stage, hook_args):
+    """Check the resources changed by a commit or push, as a git hook"""
+    try:
+        if install:
+            click.echo(f"Installed {install_hook(stage, config, push)}")
+            return
+        push_refs = []
+        if stage == "pre-push":
+            push_refs = click.get_text_stream("stdin").read().splitlines()
+        trees = hook_changed_files(stage, push_refs)
+    except (OSError, subprocess.CalledProcessError) as e:
+        click.echo(f"Error: Could not read the changes from git: {e}", err=True)
+        raise click.Abort()
+
+    config_data = load_config(config)
+    directories = configured_resource_directories(config_data)
+    # The payload checked for each directory, as committed
+    checked = {}
+    failed = False
+    for tree, paths in trees:
+        with tempfile.TemporaryDirectory() as scratch:
+            try:
+                snapshot = GitSnapshot(tree, scratch)
+                owners = {owning_directory(path, directories) for path in paths}
+                snapshot.checkout(paths + sorted(owners - {None}))
+                if None in owners:
+                    # A shared fragment changed: find the templates including it
+                    snapshot.checkout(directories, ".txt")
+                    snapshot.checkout_includes(directories)
+                selected = affected_directories(paths, directories, snapshot.root)
+                missing = [
+                    snapshot.checkout_resource(directories[directory][0], directory)
+                    for directory in selected
+                ]
+            except (OSError, subprocess.CalledProcessError) as e:
+                click.echo(
+                    f"Error: Could not check out {tree or 'the index'}: {e}", err=True
+                )
+                raise click.Abort()
+            with ThreadPoolExecutor(max_workers=concurrency) as executor:
+                results = list(
+                    executor.map(
+                        lambda directory: check_round_trip(
+                            directories[directory][0],
+                            os.path.join(snapshot.root, directory),
+                            not no_validate,
+                        ),
+                        selected,
+                    )
+                )
+        for directory, (payload, errors), not_in_tree in zip(
+            selected, results, missing
+        ):
+            if report_validation_errors(directory, not_in_tree + errors):
+                click.echo(f"ok {directory}")
+                checked[directory] = payload
+            else:
+                failed = True
+
+    if not checked and not failed:
+        click.echo("No Vapi resources changed.")
+        return
+    if failed:
+        click.echo(
+            "Check failed. Fix the errors above, or skip the hook with --no-verify.",
+            err=True,
+        )
+        raise SystemExit(1)
+
+    if push and stage == "pre-push":
+        try:
+            api_key = get_api_key(config_data)
+        except SystemExit:
+            raise click.Abort()
+        base_url = get_api_base_url(config_data)
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            futures = []
+            for directory, payload in checked.items():
+                kind, resource_id = directories[directory]
+                futures.append(
+                    executor.submit(
+                        update_resource,
+                        kind,
+                        resource_id,
+                        {k: v for k, v in payload.items() if k not in READ_ONLY_KEYS},
+                        api_key,
+                        base_url,
+                    )
+                )
+            for future in futures:
+                future.result()
+
+        # Only directories whose working tree matches what was pushed are clean
+        clean = []
+        for directory, payload in checked.items():
+            try:
+                if recompose_data(directories[directory][0], directory) == payload:
+                    clean.append(directory)
+            except (OSError, ValueError):
+                pass
+        mark_clean(clean)
+
+
+@cli.command(name="diff")
+@click.option(
+    "--config", default="vapi_config.json", help="Project-specific configuration file"
+)
+@click.option(
+    "--type",
+    "kind",
+    default="assistant",
+    type=click.Choice(list(RESOURCE_TYPES)),
+    help="Type of the resources to compare",
+)
+@click.option(
+    "--cached",
+    is_flag=True,
+    help="Compare with the last fetched version instead of the API",
+)
+@click.option(
+    "--exit-code", is_flag=True, help="Exit with status 1 if there are differences"
+)
+@click.option("--concurrency", default=8, help="Resources fetched in parallel")
+@click.argument("resource_ids", nargs=-1, shell_complete=complete_resource_ref)
+@report_recompose_errors
+def diff(config, kind, cached, exit_code, concurrency, resource_ids):
+    """Show what `update` would change on the server"""
+    config_data = load_config(config)
+    resource_ids = [resolve_resource_ref(ref, kind) for ref in resource_ids]
+    resource_ids = resource_ids or get_resource_ids(config_data, kind)
+    resource_directories = config_data.get(RESOURCE_TYPES[kind]["directories_key"], {})
+
+    local = {}
+    for resource_id in resource_ids:
+        directory = resource_directories.get(resource_id, resource_id)
+        if os.path.isdir(directory):
+            local[resource_id] = recompose_data(kind, directory)
+        else:
+            click.echo(f"Skipping {directory} as it's not a directory")
+    if not local:
+        click.echo("No decomposed resources to compare. Exiting.", err=True)
+        raise click.Abort()
+
+    if cached:
+        remote = {}
+        for resource_id in local:
+            if not load_history_index(resource_id):
+                click.echo(f"No local history for {resource_id}, skipping.")
+                continue
+            remote[resource_id] = load_history_version(resource_id)[1]
+    else:
+        try:
+            api_key = get_api_key(config_data)
+        except SystemExit:
+            raise click.Abort()
+        tasks = [(kind, resource_id) for resource_id in local]
+        fetched = fetch_resources(
+            tasks, api_key, get_api_base_url(config_data), concurrency
+        )
+        remote = {data["id"]: data for _, data in fetched}
+
+    changed = 0
+    for resource_id, remote_data in remote.items():
+        differences = diff_payloads(remote_data, local[resource_id])
+        directory = resource_directories.get(resource_id, resource_id)
+        if not differences:
+            click.echo(f"unchanged {directory} ({resource_id})")
+            continue
+        changed += 1
+        click.echo(f"changed   {directory} ({resource_id})")
+        for line in differences:
+            click.echo(f"    {line}")
+
+    click.echo(f"{changed} of {len(remote)} {kind}(s) would change.")
+    if exit_code and changed:
+        raise SystemExit(1)
+
+
+@cli.group(name="daemon")
+def daemon():
+    """Run a background daemon that keeps this project's caches warm"""
+    pass
+
+
+@daemon.command(name="start")
+@click.option(
+    "--foreground", is_flag=True, help="Run in the foreground instead of detaching"
+)
+@click.option(
+    "--refresh-interval",
+    default=DAEMON_REFRESH_INTERVAL,
+    help="Seconds between background cache refreshes",
+)
+def start_daemon(foreground, refresh_interval):
+    """Start the daemon for the project in the current directory"""
+    if not hasattr(socketserver, "UnixStreamServer"):
+        click.echo("Error: The daemon is not supported on this platform.", err=True)
+        raise click.Abort()
+    if daemon_call({"control": "status"}):
+        click.echo("The daemon is already running.")
+        return
+
+    if foreground:
+        server = create_daemon_server()
+        with open(DAEMON_PID_FILE, "w") as f:
+            f.write(str(os.getpid()))
+        click.echo(f"Daemon listening on {DAEMON_SOCKET}")
+        serve_daemon(server, refresh_interval)
+        return
+
+    os.makedirs(STATE_DIR, exist_ok=True)
+    with open(DAEMON_LOG_FILE, "a") as log:
+        subprocess.Popen(
+            [sys.executable, os.path.realpath(__file__), "daemon", "start"]
+            + ["--foreground", "--refresh-interval", str(refresh_interval)],
+            stdin=subprocess.DEVNULL,
+            stdout=log,
+            stderr=log,
+            start_new_session=True,
+        )
+    for _ in range(100):
+        status = daemon_call({"control": "status"})
+        if status:
+            click.echo(f"Daemon started (pid {status['pid']}).")
+            return
+        time.sleep(0.05)
+    click.echo(f"Error: The daemon did not start, see {DAEMON_LOG_FILE}.", err=True)
+    raise click.Abort()
+
+
+@daemon.command(name="stop")
+def stop_daemon():
+    """Stop the daemon for the project in the current directory"""
+    if daemon_call({"control": "stop"}):
+        for _ in range(100):
+            if not os.path.exists(DAEMON_SOCKET):
+                break
+            time.sleep(0.05)
+        click.echo("Daemon stopped.")
+    else:
+        click.echo("The daemon is not running.")
+
+
+@daemon.command(name="status")
+def daemon_status():
+    """Show whether the daemon is running"""
+    status = daemon_call({"control": "status"})
+    if status:
+        click.echo(
+            f"Daemon running (pid {status['pid']}, up {status['uptime']:.0f}s, "
+            f"{status['commands']} command(s) served)."
+        )
+    else:
+        click.echo("The daemon is not running.")
+
+
+@cli.command(name="validate")
+@click.option(
+    "--config", default="vapi_config.json", help="Project-specific configuration file"
+)
+@click.option(
+    "--refresh-schema",
+    is_flag=True,
+    help="Download the latest Vapi API schema before validating",
+)
+@click.option(
+    "--type",
+    "kind",
+    default="assistant",
+    type=click.Choice(list(RESOURCE_TYPES)),
+    help="Type of the resources to validate",
+)
+@click.argument(
+    "directories",
+    nargs=-1,
+    type=click.Path(exists=True, file_okay=False, dir_okay=True),
+)
+@report_recompose_errors
+def validate(config: str, refresh_schema: bool, kind: str, directories):
+    """Validate decomposed resources against the Vapi API schema"""
+    if refresh_schema:
+        refresh_api_schema()
+
+    if not directories:
+        directories = get_resource_directories(load_config(config), kind)
+
+    if not directories:
+        if refresh_schema:
+            return
+        click.echo(f"No {kind}s to validate. Exiting.", err=True)
+        raise click.Abort()
+
+    all_valid = True
+    for directory in directories:
+        recomposed_file = recompose_resource(kind, directory)
+        with open(recomposed_file, "r", encoding="utf-8") as f:
+            assistant_data = json.load(f)
+        operation = "update" if assistant_data.get("id") else "create"
+        errors = validate_assistant_data(assistant_data, operation, kind)
+        all_valid = report_validation_errors(directory, errors) and all_valid
+
+    if not all_valid:
+        raise SystemExit(1)
+    click.echo(f"All {len(directories)} {kind}(s) are valid.")
+
+
+@cli.command(name="stats")
+@click.option(
+    "--config", default="vapi_config.json", help="Project-specific configuration file"
+)
+@click.option(
+    "--sort",
+    type=click.Choice(["tokens", "chars", "delta", "name"]),
+    default="tokens",
+    help="Sort order of the report",
+)
+@click.option(
+    "--tokenizer",
+    default=None,
+    help="Tokenizer as module:callable (default: built-in estimator)",
+)
+@click.option(
+    "--outlier-threshold",
+    default=2.0,
+    help="Standard deviations above the mean at which a prompt is flagged",
+)
+@click.option(
+    "--no-snapshot", is_flag=True, help="Don't record this run as the new snapshot"
+)
+@click.argument(
+    "directories",
+    nargs=-1,
+    type=click.Path(exists=True, file_okay=False, dir_okay=True),
+)
+@report_recompose_errors
+def stats(config, sort, tokenizer, outlier_threshold, no_snapshot, directories):
+    """Report prompt sizes and approximate token counts"""
+    if not directories:
+        directories = get_assistant_directories(load_config(config))
 
-    # Recompose analysisPlan components
-    analysis_plan = {}
+    if not directories:
+        click.echo("No assistants to analyse. Exiting.", err=True)
+        raise click.Abort()
 
-    for key, filename in [
-        ("summaryPrompt", "summary_prompt.txt"),
-        ("structuredDataPrompt", "structured_data_prompt.txt"),
-        ("successEvaluationPrompt", "success_evaluation_prompt.txt"),
-    ]:
-        content = read_file_if_exists(
-            resolve_file_path(f"file:///{filename}", directory)
-        )
-        analysis_plan[key] = content
+    rows, cache = collect_prompt_stats(directories, tokenizer)
+    flag_outliers(rows, outlier_threshold)
 
-    empty_schema = {"type": "object", "properties": {}}
-    schema_path = resolve_file_path("file:///structured_data_schema.json", directory)
-    if os.path.exists(schema_path):
-        with open(schema_path, "r", encoding="utf-8") as f:
-            schema_content = json.load(f)
-            analysis_plan["structuredDataSchema"] = schema_content or empty_schema
+    if sort == "name":
+        rows.sort(key=lambda row: row["path"])
+    elif sort == "delta":
+        rows.sort(key=lambda row: abs(row["delta"] or 0), reverse=True)
     else:
-        analysis_plan["structuredDataSchema"] = empty_schema
-
-    # Update or add analysisPlan if any components were found
-    data["analysisPlan"] = analysis_plan
-
-    # Save the recomposed JSON
-    directory_name = os.path.basename(os.path.normpath(directory))
-    output_filename = f"{directory_name}_recomposed.json"
-
-    with open(output_filename, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2)
+        rows.sort(key=lambda row: row[sort], reverse=True)
 
-    print(f"Recomposition complete for {directory}. Output saved as: {output_filename}")
-    return output_filename
+    width = max(len(row["directory"]) for row in rows) if rows else 0
+    click.echo(
+        f"{'ASSISTANT':<{width}}  {'FILE':<29}  {'CHARS':>8}  {'TOKENS':>7}  {'DELTA':>7}"
+    )
+    for row in rows:
+        delta = "new" if row["delta"] is None else f"{row['delta']:+d}"
+        flag = "  outlier" if row.get("outlier") else ""
+        click.echo(
+            f"{row['directory']:<{width}}  {row['file']:<29}  {row['chars']:>8}  "
+            f"{row['tokens']:>7}  {delta:>7}{flag}"
+        )
 
+    total_chars = sum(row["chars"] for row in rows)
+    total_tokens = sum(row["tokens"] for row in rows)
+    outliers = sum(1 for row in rows if row.get("outlier"))
+    click.echo(
+        f"Total: {len(rows)} prompt(s), {total_chars} characters, "
+        f"~{total_tokens} tokens, {outliers} outlier(s)"
+    )
 
-# Updating
-def load_assistant_data(filename):
-    try:
-        with open(filename, "r") as f:
-            data = json.load(f)
-            assistant_id = data.get("id")
-            if not assistant_id:
-                print(f"Error: No 'id' field found in {filename}")
-                return None, None
-            return assistant_id, data
-    except FileNotFoundError:
-        print(f"File {filename} not found. Skipping this file.")
-        return None, None
-    except json.JSONDecodeError:
-        print(f"Error decoding JSON from {filename}. Skipping this file.")
-        return None, None
+    if not no_snapshot:
+        # Other assistants keep the baseline from the last run that measured them
+        cache["snapshot"].update(
+            {
+                row["path"]: {"chars": row["chars"], "tokens": row["tokens"]}
+                for row in rows
+            }
+        )
+    save_stats_cache(cache)
 
 
-def update_assistant(assistant_id, assistant_data, api_key):
-    url = f"https://api.vapi.ai/assistant/{assistant_id}"
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+@cli.command(name="history")
+@click.argument("assistant_id", shell_complete=complete_resource_ref)
+def history(assistant_id):
+    """List the locally stored versions of an assistant"""
+    assistant_id = resolve_resource_ref(assistant_id)
+    index = load_history_index(assistant_id)
+    if not index:
+        click.echo(f"No local history for assistant {assistant_id}.")
+        return
 
-    try:
-        response = requests.patch(url, headers=headers, json=assistant_data)
-        response.raise_for_status()
-        print(f"Assistant {assistant_id} updated successfully")
-        return response.json()
-    except requests.exceptions.RequestException as e:
-        print(
-            f"Error updating assistant {assistant_id}: {e}\nResponse details: {e.response.text}"
+    _, data_path = history_paths(assistant_id)
+    click.echo(f"{'VERSION':>7}  {'UPDATED AT':<24}  {'SHA256':<12}  STORED")
+    for entry in index:
+        click.echo(
+            f"{entry['version']:>7}  {entry['updatedAt'] or '-':<24}  "
+            f"{entry['sha256'][:12]}  {entry['type']}, {entry['length']} bytes"
         )
-        raise SystemExit(1)
-
+    click.echo(f"{len(index)} version(s), {os.path.getsize(data_path)} bytes on disk")
 
-def update_assistants_from_files(json_files, api_key):
-    for json_file in json_files:
-        assistant_id, assistant_data = load_assistant_data(json_file)
-        if assistant_id and assistant_data:
-            # Remove properties that should not be included in the update
-            keys_to_remove = [
-                "id",
-                "orgId",
-                "createdAt",
-                "updatedAt",
-                "isServerUrlSecretSet",
-            ]
-            for key in keys_to_remove:
-                assistant_data.pop(key, None)
 
-            update_assistant(assistant_id, assistant_data, api_key)
+@cli.command(name="show")
+@click.argument("assistant_id", shell_complete=complete_resource_ref)
+@click.argument("version", type=int, required=False)
+@click.option(
+    "--at", default=None, help="Show the version that was current at this timestamp"
+)
+def show(assistant_id, version, at):
+    """Print a stored version of an assistant (default: latest)"""
+    assistant_id = resolve_resource_ref(assistant_id)
+    _, assistant_data = load_history_version(assistant_id, version, at)
+    click.echo(json.dumps(assistant_data, indent=2))
 
 
-# CLI
-@click.group(name="vapi_vct")
-def cli():
-    """Vapi Version Control Tools CLI"""
-    pass
+@cli.command(name="restore")
+@click.option(
+    "--config", default="vapi_config.json", help="Project-specific configuration file"
+)
+@click.option(
+    "--no-decompose", is_flag=True, help="Skip decomposing the restored assistant"
+)
+@click.option(
+    "--at", default=None, help="Restore the version that was current at this timestamp"
+)
+@click.argument("assistant_id", shell_complete=complete_resource_ref)
+@click.argument("version", type=int, required=False)
+def restore(config, no_decompose, at, assistant_id, version):
+    """Restore a stored version of an assistant to the working directory"""
+    assistant_id = resolve_resource_ref(assistant_id)
+    selected, assistant_data = load_history_version(assistant_id, version, at)
 
+    assistant_name = sanitize_assistant_name(assistant_data.get("name", assistant_id))
+    filename = f"{assistant_name}--{assistant_id[:8]}_fetched.json"
+    with open(filename, "w") as f:
+        json.dump(assistant_data, f, indent=2)
+    click.echo(f"Version {selected} of {assistant_id} restored to {filename}")
 
-@cli.group(name="config")
-def config():
-    """Configuration commands"""
-    pass
+    if not no_decompose:
+        decompose_assistant(filename, config)
+        click.echo(f"Decomposed {filename}")
 
 
-@config.group(name="assistants")
-def assistants():
-    """Assistant commands"""
-    pass
+@cli.command(name="export")
+@click.option(
+    "--config", default="vapi_config.json", help="Project-specific configuration file"
+)
+@click.argument("archive", type=click.Path(dir_okay=False))
+@report_recompose_errors
+def export_archive(config, archive):
+    """Pack all decomposed assistants into a single archive file"""
+    config_data = load_config(config, project_specific=True)
+    assistant_directories = config_data.get("assistant_directories", {})
+    directories = {
+        assistant_id: assistant_directories.get(assistant_id, assistant_id)
+        for assistant_id in get_assistant_ids(config_data)
+    }
+    directories = {
+        assistant_id: directory
+        for assistant_id, directory in directories.items()
+        if os.path.isdir(directory)
+    }
 
+    if not directories:
+        click.echo("No assistants to export. Exiting.", err=True)
+        raise click.Abort()
 
-@config.group(name="api_key")
-def api_key():
-    """API key commands"""
-    pass
+    index = write_archive(archive, config_data, directories)
+    file_count = sum(len(m["files"]) for m in index["assistants"].values())
+    click.echo(
+        f"Exported {len(directories)} assistant(s) ({file_count} files) to {archive}"
+    )
 
 
-@cli.command(name="fetch")
+@cli.command(name="import")
 @click.option(
     "--config", default="vapi_config.json", help="Project-specific configuration file"
 )
 @click.option(
-    "--no-decompose", is_flag=True, help="Skip decomposing fetched assistants"
+    "--assistant",
+    "assistant_ids",
+    multiple=True,
+    help="Only import this assistant ID (may be repeated)",
 )
-def fetch(config: str, no_decompose: bool):
-    """Fetch and optionally decompose Vapi assistants"""
-    config_data = load_config(config)
+@click.option("--force", is_flag=True, help="Overwrite existing directories")
+@click.option("--list", "list_only", is_flag=True, help="List the archive contents")
+@click.argument("archive", type=click.Path(exists=True, dir_okay=False))
+def import_archive(config, assistant_ids, force, list_only, archive):
+    """Restore decomposed assistants from an archive file"""
+    mapping, index = open_archive(archive)
     try:
-        api_key = get_api_key(config_data)
-    except SystemExit:
-        raise click.Abort()
+        assistants = index["assistants"]
+        if list_only:
+            for assistant_id, member in assistants.items():
+                click.echo(
+                    f"- {assistant_id} → {member['directory']} ({len(member['files'])} files)"
+                )
+            return
 
-    assistant_ids = get_assistant_ids(config_data)
+        unknown = [a for a in assistant_ids if a not in assistants]
+        if unknown:
+            click.echo(f"Error: Not in archive: {', '.join(unknown)}", err=True)
+            raise SystemExit(1)
+        selected = {
+            assistant_id: member
+            for assistant_id, member in assistants.items()
+            if not assistant_ids or assistant_id in assistant_ids
+        }
 
-    if not assistant_ids:
-        click.echo("No assistants to fetch. Exiting.", err=True)
-        raise click.Abort()
+        # Archive indexes aren't trusted to stay inside the project
+        unsafe = unsafe_archive_paths(
+            [(member, member["directory"]) for member in selected.values()]
+            + [(index["shared"], ".")]
+        )
+        if unsafe:
+            click.echo(
+                f"Error: {archive} has paths outside the project: {', '.join(unsafe)}",
+                err=True,
+            )
+            raise SystemExit(1)
 
-    fetched_files = fetch_assistant_and_save(assistant_ids, api_key)
+        imported = {}
+        # Members are visited in file order, so the archive is read sequentially
+        for assistant_id, member in sorted(
+            selected.items(), key=lambda item: item[1]["offset"]
+        ):
+            directory = member["directory"]
+            if os.path.exists(directory) and not force:
+                click.echo(
+                    f"Skipping {directory} as it already exists (use --force to overwrite)"
+                )
+                continue
+            unpack_member(mapping, member, directory)
+            imported[assistant_id] = directory
+            click.echo(f"Imported {assistant_id} into {directory}")
+        if imported and index["shared"]["files"]:
+            unpack_member(mapping, index["shared"], ".", overwrite=force)
+    finally:
+        mapping.close()
 
-    if not no_decompose:
-        for file in fetched_files:
-            decompose_assistant(file, config)
-            click.echo(f"Decomposed {file}")
+    if imported:
+        current_config = load_config(config, project_specific=True)
+        current_ids = current_config.setdefault("assistant_ids", [])
+        for assistant_id, directory in imported.items():
+            if assistant_id not in current_ids:
+                current_ids.append(assistant_id)
+            current_config["assistant_directories"][assistant_id] = directory
+        update_config(config, current_config)
+        click.echo("Configuration updated with the imported assistants.")
 
 
-@cli.command(name="update")
+@calls.command(name="export")
 @click.option(
     "--config", default="vapi_config.json", help="Project-specific configuration file"
 )
 @click.option(
-    "--no-recompose", is_flag=True, help="Skip recomposing assistants before updating"
+    "--output",
+    default=None,
+    help="Output file (default: calls.jsonl.gz or calls.columnar.gz)",
 )
-def update(config: str, no_recompose: bool):
-    """Update Vapi assistants, optionally recomposing first"""
+@click.option(
+    "--format",
+    "output_format",
+    type=click.Choice(["jsonl", "columnar"]),
+    default="jsonl",
+    help="Full call records as JSON lines, or selected fields as columns",
+)
+@click.option(
+    "--since", default=None, help="Only export calls created at or after this time"
+)
+@click.option(
+    "--until", default=None, help="Only export calls created before this time"
+)
+@click.option("--page-size", default=100, help="Calls requested per page")
+@click.option("--concurrency", default=4, help="Pages fetched in parallel")
+@click.option(
+    "--restart", is_flag=True, help="Discard any previous progress and start over"
+)
+@click.argument("assistant_ids", nargs=-1, shell_complete=complete_resource_ref)
+def export_call_logs(
+    config,
+    output,
+    output_format,
+    since,
+    until,
+    page_size,
+    concurrency,
+    restart,
+    assistant_ids,
+):
+    """Export calls of the configured assistants to a compressed file"""
     config_data = load_config(config)
     try:
         api_key = get_api_key(config_data)
     except SystemExit:
         raise click.Abort()
-    assistant_ids = get_assistant_ids(config_data)
-    assistant_directories = config_data.get("assistant_directories", {})
 
+    assistant_ids = [resolve_resource_ref(ref) for ref in assistant_ids]
+    assistant_ids = assistant_ids or get_assistant_ids(config_data)
     if not assistant_ids:
-        click.echo("No assistants to update. Exiting.", err=True)
+        click.echo("No assistants to export calls for. Exiting.", err=True)
         raise click.Abort()
 
-    files = []
-    if no_recompose:
-        for assistant_id in assistant_ids:
-            directory_name = assistant_directories.get(assistant_id, assistant_id)
-            files.append(f"{directory_name}_recomposed.json")
-    else:
-        for assistant_id in assistant_ids:
-            directory_name = assistant_directories.get(assistant_id, assistant_id)
-            if os.path.isdir(directory_name):
-                output_file = recompose_assistant(directory_name)
-                files.append(output_file)
-            else:
-                click.echo(f"Skipping {directory_name} as it's not a directory")
+    output = output or f"calls.{output_format}.gz"
+    cursor_path = f"{output}.cursor.json"
+    if restart:
+        for path in [output, cursor_path]:
+            if os.path.exists(path):
+                os.remove(path)
+    elif os.path.exists(cursor_path):
+        click.echo(f"Resuming export into {output}")
 
-    update_assistants_from_files(files, api_key)
+    tasks = plan_call_tasks(assistant_ids, since, until)
+    written = export_calls(
+        get_api_base_url(config_data),
+        api_key,
+        tasks,
+        output,
+        output_format,
+        page_size=page_size,
+        concurrency=concurrency,
+    )
+    click.echo(f"Exported {written} call(s) to {output}")
 
 
-@cli.command(name="publish")
+@calls.command(name="stats")
 @click.option(
     "--config", default="vapi_config.json", help="Project-specific configuration file"
 )
-@click.argument(
-    "directory", type=click.Path(exists=True, file_okay=False, dir_okay=True)
+@click.option(
+    "--input",
+    "input_file",
+    default=None,
+    type=click.Path(exists=True, dir_okay=False),
+    help="Call export to analyse (default: the newest of calls.jsonl.gz and calls.columnar.gz)",
 )
-def publish(config: str, directory: str):
-    """Publish a new assistant from a decomposed directory"""
-    config_data = load_config(config)
-    try:
-        api_key = get_api_key(config_data)
-    except SystemExit:
-        raise click.Abort()
+def call_stats(config, input_file):
+    """Summarise exported calls per assistant and prompt version"""
+    if np is None:
+        click.echo(
+            "Error: calls stats requires NumPy. Install it with 'pip install numpy'.",
+            err=True,
+        )
+        raise SystemExit(1)
 
-    # Recompose the assistant
-    recomposed_file = recompose_assistant(directory)
+    if input_file is None:
+        # The default outputs of `calls export`, in either format
+        exports = [f"calls.{f}.gz" for f in ["jsonl", "columnar"]]
+        exports = [path for path in exports if os.path.exists(path)]
+        if not exports:
+            click.echo(
+                "Error: No call export found. Run 'vapi_vct calls export' first.",
+                err=True,
+            )
+            raise SystemExit(1)
+        input_file = max(exports, key=os.path.getmtime)
 
-    # Load the recomposed data
-    with open(recomposed_file, "r", encoding="utf-8") as f:
-        assistant_data = json.load(f)
+    assistant_directories = load_config(config, project_specific=True).get(
+        "assistant_directories", {}
+    )
+    summaries = summarise_calls(load_call_arrays(input_file))
+    if not summaries:
+        click.echo(f"No calls found in {input_file}.")
+        return
 
-    # Check if name exists, if not, prompt user or generate random name
-    if "name" not in assistant_data or not assistant_data["name"]:
-        while True:
-            try:
-                name = click.prompt(
-                    "Enter a name for the assistant (or 'random' for a random name)",
-                    type=str,
+    current_assistant = None
+    for summary in summaries:
+        assistant_id = summary["assistant_id"]
+        if assistant_id != current_assistant:
+            current_assistant = assistant_id
+            directory = assistant_directories.get(assistant_id)
+            click.echo(f"{assistant_id}{f' ({directory})' if directory else ''}")
+        version = summary["prompt_version"] or "unknown"
+        since = f" since {summary['since']}" if summary["since"] else ""
+        click.echo(f"  Prompt version {version}{since}")
+        click.echo(
+            f"    Calls: {summary['calls']}  "
+            f"Duration p50/p90/p99: {summary['duration_p50']:.1f}s / "
+            f"{summary['duration_p90']:.1f}s / {summary['duration_p99']:.1f}s  "
+            f"Cost: {summary['total_cost']:.2f} total, {summary['mean_cost']:.4f} per call"
+        )
+        for label, counts in [
+            ("Ended reasons", summary["ended_reasons"]),
+            ("Success evaluations", summary["success_evaluations"]),
+        ]:
+            click.echo(
+                f"    {label}: "
+                + ", ".join(
+                    f"{value or 'none'} {count}" for value, count in counts.items()
                 )
-                if name.lower() == "random":
-                    name = f"Assistant_{generate_random_string(6)}"
-                    click.echo(f"Generated random name: {name}")
-                break
-            except click.exceptions.Abort:
-                if click.confirm("Do you want to exit?", default=True):
-                    click.echo("Operation cancelled.")
-                    return
-                click.echo("Continuing with name input...")
-        assistant_data["name"] = name
-
-    # Remove properties that should not be included in the create request
-    keys_to_remove = ["id", "orgId", "createdAt", "updatedAt", "isServerUrlSecretSet"]
-    for key in keys_to_remove:
-        assistant_data.pop(key, None)
+            )
 
-    # Create the new assistant
-    created_assistant = create_assistant(assistant_data, api_key)
 
-    if created_assistant:
-        click.echo(f"New assistant created successfully:")
-        click.echo(f"Name: {created_assistant['name']}")
-        click.echo(f"ID: {created_assistant['id']}")
+@cli.command(name="bulk-edit")
+@click.option(
+    "--config", default="vapi_config.json", help="Project-specific configuration file"
+)
+@click.option(
+    "--replace",
+    "replacements",
+    nargs=2,
+    multiple=True,
+    metavar="PATTERN REPLACEMENT",
+    help="Regex replacement to apply to matching files (may be repeated)",
+)
+@click.option(
+    "--set",
+    "assignments",
+    nargs=2,
+    multiple=True,
+    metavar="PATH VALUE",
+    help="Set a JSON path in assistant_config.json, e.g. model.temperature 0.5 (may be repeated)",
+)
+@click.option(
+    "--file",
+    "file_patterns",
+    multiple=True,
+    default=["*.txt", "messages/*.txt"],
+    show_default=True,
+    help="Files to apply replacements to, as globs relative to each assistant directory",
+)
+@click.option("--dry-run", is_flag=True, help="Show the changes without applying them")
+@click.option("--yes", is_flag=True, help="Apply the changes without asking")
+@click.option("--no-push", is_flag=True, help="Don't update the affected assistants")
+@click.option(
+    "--no-validate", is_flag=True, help="Skip validating payloads before updating"
+)
+@click.option("--concurrency", default=8, help="Assistants updated in parallel")
+@click.argument(
+    "directories",
+    nargs=-1,
+    type=click.Path(exists=True, file_okay=False, dir_okay=True),
+)
+@report_recompose_errors
+def bulk_edit(
+    config,
+    replacements,
+    assignments,
+    file_patterns,
+    dry_run,
+    yes,
+    no_push,
+    no_validate,
+    concurrency,
+    directories,
+):
+    """Edit many assistants at once, then update the affected ones"""
+    if not replacements and not assignments:
+        click.echo("Nothing to do: give at least one --replace or --set.", err=True)
+        raise click.Abort()
 
-        # Update the configuration with the new assistant
-        config_data.setdefault("assistant_ids", []).append(created_assistant["id"])
-        update_config(config, config_data)
-        click.echo("Configuration updated with the new assistant.")
+    config_data = load_config(config)
+    if not directories:
+        directories = get_assistant_directories(config_data)
+    if not directories:
+        click.echo("No assistants to edit. Exiting.", err=True)
+        raise click.Abort()
 
+    try:
+        edits = plan_bulk_edit(
+            directories,
+            replacements,
+            [(path, parse_json_value(value)) for path, value in assignments],
+            file_patterns,
+            concurrency,
+        )
+    except (re.error, ValueError, KeyError, IndexError, TypeError) as e:
+        click.echo(f"Error: {e}", err=True)
+        raise SystemExit(1)
 
-def create_assistant(assistant_data, api_key):
-    url = "https://api.vapi.ai/assistant"
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    if not edits:
+        click.echo("No files would change.")
+        return
 
-    try:
-        response = requests.post(url, headers=headers, json=assistant_data)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+    for path, original, content in edits:
         click.echo(
-            f"Error creating assistant: {e}\nResponse details: {e.response.text}",
-            err=True,
+            "".join(
+                difflib.unified_diff(
+                    original.splitlines(keepends=True),
+                    content.splitlines(keepends=True),
+                    fromfile=f"a/{path}",
+                    tofile=f"b/{path}",
+                )
+            ),
+            nl=False,
         )
-        return None
+        if not content.endswith("\n"):
+            click.echo()
 
+    affected = sorted(
+        {
+            d
+            for d in directories
+            for path, _, _ in edits
+            if path.startswith(os.path.join(d, ""))
+        }
+    )
+    click.echo(f"{len(edits)} file(s) in {len(affected)} assistant(s) would change.")
+    if dry_run:
+        return
+    if not yes and not click.confirm("Apply these changes?", default=False):
+        click.echo("Operation cancelled.")
+        return
 
-def generate_random_string(length):
-    return "".join(random.choices(string.ascii_letters + string.digits, k=length))
+    for path, _, content in edits:
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(content)
+    click.echo(f"Updated {len(edits)} file(s).")
 
+    if no_push:
+        return
 
-def update_config(config_file, updated_config):
-    with open(config_file, "w") as f:
-        json.dump(updated_config, f, indent=2)
+    try:
+        api_key = get_api_key(config_data)
+    except SystemExit:
+        raise click.Abort()
+
+    files = [recompose_assistant(directory) for directory in affected]
+    if not no_validate and not validate_recomposed_files(files, "update"):
+        click.echo("Validation failed. No assistants were updated.", err=True)
+        raise click.Abort()
+    update_assistants_from_files(
+        files,
+        api_key,
+        concurrency=concurrency,
+        base_url=get_api_base_url(config_data),
+        **get_body_options(config_data),
+    )
+    mark_clean(affected)
 
 
 # Config commands
 @assistants.command(name="add")
-@click.argument("assistant_ids", nargs=-1, required=True)
+@click.argument(
+    "assistant_ids", nargs=-1, required=True, shell_complete=complete_resource_ref
+)
 @click.option(
     "--config", default="vapi_config.json", help="Project-specific configuration file"
 )
 def add_assistant(assistant_ids, config):
-    """Add one or more assistant IDs to the configuration"""
+    """Add one or more assistants, by ID or by name, to the configuration"""
+    assistant_ids = [resolve_resource_ref(ref) for ref in assistant_ids]
     current_config = load_config(config, project_specific=True)
     current_assistants = set(current_config.get("assistant_ids", []))
     for assistant_id in assistant_ids:
@@ -532,12 +4740,15 @@ def add_assistant(assistant_ids, config):
 
 
 @assistants.command(name="del")
-@click.argument("assistant_ids", nargs=-1, required=True)
+@click.argument(
+    "assistant_ids", nargs=-1, required=True, shell_complete=complete_resource_ref
+)
 @click.option(
     "--config", default="vapi_config.json", help="Project-specific configuration file"
 )
 def del_assistant(assistant_ids, config):
-    """Remove one or more assistant IDs from the configuration"""
+    """Remove one or more assistants, by ID or by name, from the configuration"""
+    assistant_ids = [resolve_resource_ref(ref) for ref in assistant_ids]
     current_config = load_config(config, project_specific=True)
     current_assistants = set(current_config.get("assistant_ids", []))
     assistant_directories = current_config.get("assistant_directories", {})
@@ -590,6 +4801,70 @@ def list_assistant_directories(config):
         click.echo("No assistant ID to directory mappings found in the configuration.")
 
 
+@resources.command(name="add")
+@click.argument("kind", type=click.Choice(list(RESOURCE_TYPES)))
+@click.argument("resource_ids", nargs=-1, required=True)
+@click.option(
+    "--config", default="vapi_config.json", help="Project-specific configuration file"
+)
+def add_resource(kind, resource_ids, config):
+    """Add one or more resource IDs of a given type to the configuration"""
+    current_config = load_config(config, project_specific=True)
+    current_ids = current_config.setdefault(RESOURCE_TYPES[kind]["ids_key"], [])
+    for resource_id in resource_ids:
+        if resource_id in current_ids:
+            click.echo(
+                f"{resource_label(kind)} ID {resource_id} already exists. Skipping."
+            )
+        else:
+            current_ids.append(resource_id)
+            click.echo(f"Added {kind} ID {resource_id}")
+    update_config(config, current_config)
+
+
+@resources.command(name="del")
+@click.argument("kind", type=click.Choice(list(RESOURCE_TYPES)))
+@click.argument("resource_ids", nargs=-1, required=True)
+@click.option(
+    "--config", default="vapi_config.json", help="Project-specific configuration file"
+)
+def del_resource(kind, resource_ids, config):
+    """Remove one or more resource IDs of a given type from the configuration"""
+    spec = RESOURCE_TYPES[kind]
+    current_config = load_config(config, project_specific=True)
+    current_ids = current_config.get(spec["ids_key"], [])
+    directories = current_config.get(spec["directories_key"], {})
+
+    for resource_id in resource_ids:
+        if resource_id in current_ids:
+            current_ids.remove(resource_id)
+            directories.pop(resource_id, None)
+            click.echo(f"Removed {kind} ID {resource_id}")
+        else:
+            click.echo(f"{resource_label(kind)} ID {resource_id} not found. Skipping.")
+    update_config(config, current_config)
+
+
+@resources.command(name="ids")
+@click.argument("kind", type=click.Choice(list(RESOURCE_TYPES)), required=False)
+@click.option(
+    "--config", default="vapi_config.json", help="Project-specific configuration file"
+)
+def list_resources(kind, config):
+    """List the resource IDs in the configuration, by type"""
+    current_config = load_config(config, project_specific=True)
+    found = False
+    for resource_kind in [kind] if kind else list(RESOURCE_TYPES):
+        resource_ids = get_resource_ids(current_config, resource_kind)
+        if resource_ids:
+            found = True
+            click.echo(f"{resource_label(resource_kind)} IDs in the configuration:")
+            for resource_id in resource_ids:
+                click.echo(f"- {resource_id}")
+    if not found:
+        click.echo("No resource IDs found in the configuration.")
+
+
 @api_key.command(name="add")
 @click.argument("api_key")
 @click.option(
@@ -619,4 +4894,4 @@ def del_api_key(config):
 
 
 if __name__ == "__main__":
-    cli()
+    cli(complete_var=COMPLETE_VAR)